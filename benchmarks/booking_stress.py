@@ -0,0 +1,138 @@
+"""Стресс-тест одновременной записи на один слот.
+
+В новой SQLite во временном каталоге (или в БД из DATABASE_URL - только
+копия данных!) --clients пользователей одновременно вызывают
+create_appointment на одно и то же время. Запись должна получить ровно
+один из них, остальные - отказ (None) без ошибок блокировок БД.
+
+Затем проверяется, что отмененную запись нельзя вернуть, когда ее время
+уже занял другой клиент: после отмены победителя время снова занимается,
+и повторное подтверждение отмененной записи должно быть отклонено.
+
+Наконец, истекшие временные брони (своя и чужая) не должны мешать записи
+на время, которое показано свободным: брони на все посты переводятся в
+прошлое, и запись создают сначала сам владелец брони, затем другой клиент.
+
+Использование:
+    python benchmarks/booking_stress.py [--clients 200] [--bays 1]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from harness import setup_environment
+
+FIRST_USER_ID = 700000000
+
+
+class ErrorCollector(logging.Handler):
+    """Собирает сообщения об ошибках, которые Database пишет в лог"""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.errors = []
+
+    def emit(self, record):
+        self.errors.append(record.getMessage())
+
+
+def book(async_db, user_id, date, time_slot):
+    return async_db.create_appointment(
+        user_id, 1, 'Диагностика', date, time_slot, 'Lada', 'Vesta', 2020, '+79160000000'
+    )
+
+
+async def book_over_expired_holds(db, async_db, date, time_slot, holders, user_id):
+    """Брони holders на все посты истекают, затем на это время записывается user_id.
+
+    Возвращает (время показано свободным, id записи или None).
+    """
+    from database import to_db_timestamp
+
+    for holder in holders:
+        db.hold_slot(holder, date, time_slot)
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            db.dialect.sql("UPDATE slot_reservations SET expires_at = ? WHERE appointment_id IS NULL"),
+            (to_db_timestamp(datetime.now() - timedelta(minutes=1)),)
+        )
+        conn.commit()
+        cursor.close()
+    # Карты занятости перечитываются из БД, а не берутся из кэша
+    db.slots.ttl = 0
+    shown_free = time_slot in db.get_available_time_slots(date)
+    return shown_free, await book(async_db, user_id, date, time_slot)
+
+
+async def run(args):
+    from database import db, async_db
+
+    errors = ErrorCollector()
+    logging.getLogger().addHandler(errors)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    # Первое свободное время в ближайшие две недели
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    date, time_slot = next(
+        (date, times[0]) for date, times in db.get_free_slots(tomorrow, 14).items() if times
+    )
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        book(async_db, FIRST_USER_ID + index, date, time_slot) for index in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - started
+    booked = [appointment_id for appointment_id in results if appointment_id is not None]
+    lock_errors = [message for message in errors.errors if 'lock' in message.lower()]
+
+    print(f"Слот {date} {time_slot}, постов: {args.bays}, одновременных записей: {args.clients}")
+    print(f"Успешно: {len(booked)}, отказов: {args.clients - len(booked)}, за {elapsed:.2f} с")
+    print(f"Ошибок в логе: {len(errors.errors)} (блокировок: {len(lock_errors)})")
+    for message in errors.errors[:5]:
+        print(f"  {message}")
+
+    # Отмененную запись нельзя вернуть поверх новой
+    first = booked[0]
+    await async_db.update_appointment_status(first, 'cancelled')
+    rebooked = await book(async_db, FIRST_USER_ID + args.clients, date, time_slot)
+    restored = await async_db.update_appointment_status(first, 'confirmed')
+    print(f"После отмены время занято снова: {rebooked is not None}, "
+          f"отмененная запись возвращена: {restored}")
+
+    # Истекшие брони на все посты: записывается их владелец, затем другой клиент
+    free = db.get_available_time_slots(date)
+    next_user = FIRST_USER_ID + args.clients + 1
+    holders = range(next_user, next_user + args.bays)
+    own_free, own_booked = await book_over_expired_holds(db, async_db, date, free[0], holders, next_user)
+    holders = range(next_user + args.bays, next_user + 2 * args.bays)
+    other_free, other_booked = await book_over_expired_holds(
+        db, async_db, date, free[1], holders, next_user + 2 * args.bays
+    )
+    print(f"Истекшая своя бронь: время свободно {own_free}, запись создана {own_booked is not None}; "
+          f"чужая: время свободно {other_free}, запись создана {other_booked is not None}")
+
+    ok = (len(booked) == args.bays and not errors.errors and rebooked is not None and not restored
+          and own_free and own_booked is not None and other_free and other_booked is not None)
+    print("OK" if ok else "ОШИБКА")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стресс-тест одновременной записи на один слот")
+    parser.add_argument('--clients', type=int, default=200, help="одновременных записей на слот")
+    parser.add_argument('--bays', type=int, default=1, help="постов (SERVICE_BAYS) - столько записей должно пройти")
+    args = parser.parse_args()
+
+    os.environ['SERVICE_BAYS'] = str(args.bays)
+    setup_environment('booking_stress_', temp_database=not os.getenv('DATABASE_URL'))
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Проверка ограничителя исходящих запросов на фейковом Bot API с 429.
+
+Фейковый Bot API (заглушка BaseRequest, без сети) ведет себя как
+Telegram при флуде: если чат получает больше --chat-limit сообщений за
+секунду или бот - больше --global-limit за секунду, запрос отклоняется
+с 429 и retry_after. Тест рассылает всплеск сообщений по нескольким
+чатам и серии правок одного сообщения и сравнивает бота без ограничителя
+и с FloodControlRateLimiter: сколько запросов дошло, сколько получили
+429, сколько правок было склеено и сколько заняла отправка.
+
+Использование:
+    python benchmarks/flood_test.py [--chats 20] [--messages 5] [--edits 10]
+        [--chat-limit 3] [--global-limit 30] [--retry-after 1]
+"""
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from harness import BOT_USER, FAKE_TOKEN, setup_environment
+
+
+class FloodingRequest(BaseRequest):
+    """Фейковый Bot API с лимитами на чат и на бота (скользящее окно в 1 с)"""
+
+    def __init__(self, chat_limit, global_limit, retry_after):
+        self.chat_limit = chat_limit
+        self.global_limit = global_limit
+        self.retry_after = retry_after
+        self.accepted = 0
+        self.rejected = 0
+        self.edits = 0
+        self._global = deque()
+        self._chats = {}
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @staticmethod
+    def _over_limit(window, limit, now):
+        while window and window[0] <= now - 1:
+            window.popleft()
+        return len(window) >= limit
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data else {}
+        if api_method == 'getMe':
+            return 200, json.dumps({'ok': True, 'result': BOT_USER}).encode()
+
+        now = time.monotonic()
+        chat_window = self._chats.setdefault(params.get('chat_id'), deque())
+        if self._over_limit(self._global, self.global_limit, now) or \
+                self._over_limit(chat_window, self.chat_limit, now):
+            self.rejected += 1
+            return 429, json.dumps({
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {self.retry_after}",
+                'parameters': {'retry_after': self.retry_after},
+            }).encode()
+
+        self._global.append(now)
+        chat_window.append(now)
+        self.accepted += 1
+        if api_method.startswith('edit'):
+            self.edits += 1
+            message_id = params.get('message_id')
+        else:
+            self._message_id += 1
+            message_id = self._message_id
+
+        result = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': params.get('chat_id', 0), 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+async def run_case(args, rate_limiter):
+    api = FloodingRequest(args.chat_limit, args.global_limit, args.retry_after)
+    bot = ExtBot(FAKE_TOKEN, request=api, get_updates_request=FloodingRequest(1000, 1000, 1),
+                 rate_limiter=rate_limiter)
+
+    delivered = 0
+    failed = 0
+
+    async def call(coroutine):
+        nonlocal delivered, failed
+        try:
+            await coroutine
+            delivered += 1
+        except RetryAfter:
+            failed += 1
+
+    async with bot:
+        started = time.perf_counter()
+        tasks = [
+            call(bot.send_message(chat_id=1000 + chat, text=f"Сообщение {index}"))
+            for index in range(args.messages) for chat in range(args.chats)
+        ]
+        # Серия правок одного сообщения (как при быстром листании страниц)
+        tasks += [
+            call(bot.edit_message_text(chat_id=999, message_id=1, text=f"Страница {page}"))
+            for page in range(args.edits)
+        ]
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    name = 'без ограничителя' if rate_limiter is None else 'FloodControlRateLimiter'
+    print(f"{name}:")
+    print(f"  вызовов: {len(tasks)}, успешно: {delivered}, ошибок 429 у вызывающих: {failed}")
+    print(f"  запросов принято API: {api.accepted} (из них правок: {api.edits}), отклонено с 429: {api.rejected}")
+    if rate_limiter is not None:
+        print(f"  статистика ограничителя: {rate_limiter.stats}")
+    print(f"  время: {elapsed:.2f} с")
+
+
+async def run(args):
+    from rate_limiter import FloodControlRateLimiter
+
+    await run_case(args, None)
+    await run_case(args, FloodControlRateLimiter(
+        global_rate=args.global_limit, chat_rate=args.chat_limit, chat_burst=1,
+        max_retries=args.max_retries, jitter=args.jitter
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка ограничителя запросов к Bot API")
+    parser.add_argument('--chats', type=int, default=20, help="чатов во всплеске")
+    parser.add_argument('--messages', type=int, default=5, help="сообщений в каждый чат")
+    parser.add_argument('--edits', type=int, default=10, help="правок одного сообщения подряд")
+    parser.add_argument('--chat-limit', type=int, default=3, help="сообщений в чат за секунду до 429")
+    parser.add_argument('--global-limit', type=int, default=30, help="сообщений от бота за секунду до 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="retry_after в ответе 429, с")
+    parser.add_argument('--max-retries', type=int, default=5, help="повторов после 429 в ограничителе")
+    parser.add_argument('--jitter', type=float, default=0.5, help="случайная добавка к паузе, с")
+    args = parser.parse_args()
+
+    setup_environment('flood_test_', temp_database=False)
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
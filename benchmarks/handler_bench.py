@@ -0,0 +1,170 @@
+"""Бенчмарк обработчиков бота на синтетических обновлениях.
+
+Каждый виртуальный пользователь проходит запись целиком: "Записаться на
+услугу" -> услуга -> дата -> время -> марка, модель, год, телефон,
+комментарий -> подтверждение. Параллельно администратор листает
+админ-панель. Обновления передаются прямо в Application.process_update,
+а Bot API заменен заглушкой без сети (с необязательной задержкой).
+
+По умолчанию бот работает с новой SQLite во временном каталоге; с
+--use-env-db - с БД из окружения (DATABASE_URL или car_service.db в
+текущем каталоге). Записи создаются на даты далеко в будущем.
+
+Для каждого обработчика выводятся p50/p95/p99 задержки и обновлений/с.
+
+Использование:
+    python benchmarks/handler_bench.py [--users 200] [--concurrency 20]
+        [--admin-rounds 20] [--api-latency 0] [--use-env-db]
+"""
+import logging
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from harness import FAKE_TOKEN, StubRequest, UpdateFactory, percentile, setup_environment
+
+ADMIN_STEPS = ['admin_today', 'admin_all', 'admin_stats', 'admin_today_manage', 'admin_back']
+SLOTS_PER_DAY = 8
+
+
+def booking_flow(factory, user_id, service_id, date_str, time_slot):
+    """Шаги записи: [(имя обработчика, обновление), ...]"""
+    return [
+        ('start_appointment', factory.message(user_id, "✅ Записаться на услугу")),
+        ('select_service', factory.callback(user_id, f"select_service_{service_id}")),
+        ('select_date', factory.callback(user_id, f"select_date_{date_str}")),
+        ('select_time', factory.callback(user_id, f"select_time_{time_slot}")),
+        ('get_car_brand', factory.message(user_id, "Toyota")),
+        ('get_car_model', factory.message(user_id, "Camry")),
+        ('get_car_year', factory.message(user_id, "2018")),
+        ('get_phone', factory.message(user_id, "+79161234567")),
+        ('get_comment', factory.message(user_id, "-")),
+        ('confirm_appointment', factory.callback(user_id, "confirm_appointment")),
+    ]
+
+
+def working_days(grid, first_day):
+    """Рабочие дни начиная с first_day"""
+    day = first_day
+    while True:
+        if grid.is_working_day(day):
+            yield day
+        day += timedelta(days=1)
+
+
+def report(timings, elapsed):
+    print(f"{'обработчик':<22}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'upd/s':>9}")
+    rows = list(timings.items()) + [('ВСЕГО', [t for values in timings.values() for t in values])]
+    for name, values in rows:
+        values_ms = [value * 1000 for value in values]
+        print(
+            f"{name:<22}{len(values):>6}"
+            f"{statistics.median(values_ms):>9.2f}{percentile(values_ms, 0.95):>9.2f}"
+            f"{percentile(values_ms, 0.99):>9.2f}{max(values_ms):>9.2f}"
+            f"{len(values) / elapsed:>9.1f}"
+        )
+    print("(задержки в мс)")
+
+
+async def run(args):
+    from telegram import Update
+    from telegram.ext import Application
+    from config import ADMIN_IDS
+    import bot
+    from database import db
+    from bot_webhook import create_application
+    from service_catalog import service_catalog
+
+    # Логи каждого запроса искажают замеры
+    logging.getLogger().setLevel(logging.WARNING)
+
+    stub = StubRequest(args.api_latency / 1000)
+    # Те же обработчики, что и в боевом приложении, но с заглушкой вместо Bot API
+    application = create_application()
+    bench_app = (
+        Application.builder().token(FAKE_TOKEN)
+        .request(stub).get_updates_request(StubRequest())
+        .persistence(application.persistence)
+        .build()
+    )
+    for group, handlers in application.handlers.items():
+        for handler in handlers:
+            bench_app.add_handler(handler, group=group)
+
+    services = service_catalog.load()
+    service_id = services[0]['id']
+    start_date = datetime.now().date() + timedelta(days=args.days_ahead)
+
+    factory = UpdateFactory()
+    timings = {}
+    failed = 0
+    users = asyncio.Semaphore(args.concurrency)
+
+    async def play(steps):
+        nonlocal failed
+        async with users:
+            for name, data in steps:
+                update = Update.de_json(data, bench_app.bot)
+                started = time.perf_counter()
+                try:
+                    await bench_app.process_update(update)
+                except Exception:
+                    failed += 1
+                timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    # По SLOTS_PER_DAY пользователей на рабочий день - в выходные свободного времени нет
+    days = working_days(db.slots.grid, start_date)
+    flows = []
+    skipped = 0
+    for index in range(args.users):
+        if index % SLOTS_PER_DAY == 0:
+            day = next(days)
+        slots = await bot.async_db.get_available_time_slots(day.strftime("%d.%m.%Y"))
+        if not slots:
+            skipped += 1
+            continue
+        flows.append(booking_flow(
+            factory, args.first_user_id + index, service_id,
+            day.strftime("%d.%m.%Y"), slots[index % len(slots)]
+        ))
+
+    admin_id = ADMIN_IDS[0]
+    for _ in range(args.admin_rounds):
+        flows.append([(step, factory.callback(admin_id, step)) for step in ADMIN_STEPS])
+
+    async with bench_app:
+        started = time.perf_counter()
+        await asyncio.gather(*(play(steps) for steps in flows))
+        elapsed = time.perf_counter() - started
+
+    await bot.user_writes.flush()
+
+    if skipped:
+        print(f"Пропущено пользователей без свободного времени: {skipped}")
+    print(f"Пользователей: {args.users - skipped}, раундов админки: {args.admin_rounds}, "
+          f"параллельность: {args.concurrency}, задержка API: {args.api_latency} мс")
+    print(f"Время: {elapsed:.2f} с, ошибок: {failed}")
+    report(timings, elapsed)
+    print(f"Вызовы Bot API: {dict(sorted(stub.calls.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк обработчиков бота")
+    parser.add_argument('--users', type=int, default=200, help="виртуальных пользователей (записей)")
+    parser.add_argument('--concurrency', type=int, default=20, help="одновременно активных пользователей")
+    parser.add_argument('--admin-rounds', type=int, default=20, help="проходов по админ-панели")
+    parser.add_argument('--api-latency', type=float, default=0, help="задержка заглушки Bot API, мс")
+    parser.add_argument('--days-ahead', type=int, default=400, help="с какого дня от сегодня создавать записи")
+    parser.add_argument('--first-user-id', type=int, default=900000000)
+    parser.add_argument('--use-env-db', action='store_true', help="работать с БД из окружения")
+    args = parser.parse_args()
+
+    setup_environment('handler_bench_', temp_database=not args.use_env_db)
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""Общие заглушки и подготовка окружения для скриптов из benchmarks/.
+
+Скрипты запускаются как `python benchmarks/<скрипт>.py`, поэтому этот
+модуль импортируется как `harness`; при импорте он добавляет корень
+репозитория в sys.path, чтобы были доступны модули бота.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import tempfile
+
+from telegram.error import NetworkError
+from telegram.request import BaseRequest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FAKE_TOKEN = '123456:benchmark'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+
+def setup_environment(prefix, temp_database=True):
+    """Готовит окружение до импорта модулей бота (config читает его при импорте).
+
+    Без BOT_TOKEN подставляется FAKE_TOKEN. С temp_database бот работает с
+    новой SQLite: database.py открывает car_service.db в текущем каталоге,
+    поэтому скрипт переходит во временный каталог с префиксом prefix.
+    """
+    os.environ.setdefault('BOT_TOKEN', FAKE_TOKEN)
+    if temp_database:
+        os.environ.pop('DATABASE_URL', None)
+        os.chdir(tempfile.mkdtemp(prefix=prefix))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class FakeClock:
+    """Часы, которые идут только по команде.
+
+    now - datetime или число секунд; advance прибавляет к нему шаг того же
+    вида (timedelta или секунды).
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, step):
+        self.now += step
+
+
+class FakeBot:
+    """Заглушка Bot API для фоновых обработчиков.
+
+    Запоминает отправленные сообщения как (chat_id, текст, время по clock
+    или None); с fail_rate доля отправок падает с сетевой ошибкой.
+    """
+
+    def __init__(self, clock=None, fail_rate=0):
+        self.clock = clock
+        self.fail_rate = fail_rate
+        self.messages = []
+        self.failures = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.failures += 1
+            raise NetworkError("fake network error")
+        self.messages.append((chat_id, text, self.clock() if self.clock else None))
+
+
+class StubRequest(BaseRequest):
+    """Заглушка Bot API: отвечает на любой метод без сетевых запросов"""
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.calls = {}
+        self._message_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        params = request_data.parameters if request_data else {}
+        if api_method == 'getMe':
+            result = BOT_USER
+        elif api_method in ('sendMessage', 'editMessageText'):
+            self._message_id += 1
+            result = {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': params.get('chat_id', 0), 'type': 'private'},
+                'from': BOT_USER,
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+
+class UpdateFactory:
+    """Собирает словари обновлений Telegram от имени пользователя"""
+
+    def __init__(self):
+        self._update_id = 0
+
+    def _next_id(self):
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(user_id):
+        return {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}', 'username': f'user{user_id}'}
+
+    def message(self, user_id, text):
+        update_id = self._next_id()
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': self._user(user_id),
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return {'update_id': update_id, 'message': message}
+
+    def callback(self, user_id, data):
+        update_id = self._next_id()
+        return {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': self._user(user_id),
+                'chat_instance': str(user_id),
+                'data': data,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': BOT_USER,
+                    'text': '...',
+                },
+            },
+        }
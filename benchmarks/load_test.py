@@ -0,0 +1,206 @@
+"""Нагрузочный тест вебхука.
+
+Поднимает фейковый Bot API (отвечает на sendMessage, editMessageText и
+т.д. с заданной задержкой), запускает бота в режиме вебхука против него и
+отправляет в вебхук поток обновлений из JSONL-файла (по одному Update на
+строку). Без файла генерирует синтетический поток: /start, "Мои записи",
+"Об услугах" и /id от нескольких чатов.
+
+По умолчанию бот работает с новой SQLite во временном каталоге; с
+--use-env-db - с БД из окружения (DATABASE_URL или car_service.db в
+текущем каталоге), тогда запускайте на копии данных.
+
+Использование:
+    python benchmarks/load_test.py [--updates FILE] [--count 500] [--chats 50]
+        [--concurrency 32] [--api-latency 50] [--connections 40] [--use-env-db]
+    python benchmarks/load_test.py --record FILE --count 500 --chats 50
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+import httpx
+import tornado.web
+
+from harness import FAKE_TOKEN, percentile, setup_environment
+
+SECRET_TOKEN = 'load-test-secret'
+
+# Синтетический поток: (текст, это команда)
+MESSAGES = [
+    ("/start", True),
+    ("📋 Мои записи", False),
+    ("ℹ️ Об услугах", False),
+    ("📞 Контакты", False),
+    ("/id", True),
+]
+
+
+def generate_updates(count, chats):
+    """Генерирует поток обновлений-сообщений от chats пользователей"""
+    updates = []
+    for update_id in range(1, count + 1):
+        chat_id = 100000 + random.randrange(chats)
+        text, is_command = random.choice(MESSAGES)
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': f'User{chat_id}'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': f'User{chat_id}'},
+            'text': text,
+        }
+        if is_command:
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        updates.append({'update_id': update_id, 'message': message})
+    return updates
+
+
+def load_updates(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeBotApi(tornado.web.RequestHandler):
+    """Фейковый метод Bot API: /bot<token>/<method>"""
+
+    def initialize(self, latency, calls):
+        self.latency = latency
+        self.calls = calls
+
+    async def post(self, token, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        params = {key: self.get_body_argument(key) for key in self.request.body_arguments}
+        if self.request.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(self.request.body or b'{}')
+
+        method = method.lower()
+        if method == 'getme':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'LoadTest', 'username': 'load_test_bot'}
+        elif method in ('sendmessage', 'editmessagetext'):
+            result = {
+                'message_id': random.randrange(1, 2 ** 31),
+                'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+                'text': params.get('text', ''),
+            }
+        else:
+            result = True
+
+        self.write({'ok': True, 'result': result})
+
+    get = post
+
+
+async def run(args, updates):
+    api_calls = {}
+    api = tornado.web.Application([
+        (r"/bot([^/]+)/(\w+)", FakeBotApi, dict(latency=args.api_latency / 1000, calls=api_calls)),
+    ])
+    api_server = api.listen(args.api_port, address='127.0.0.1')
+
+    # Настройки читаются при импорте config, поэтому задаем их до импорта бота
+    os.environ['BOT_TOKEN'] = FAKE_TOKEN
+    os.environ['TELEGRAM_BASE_URL'] = f"http://127.0.0.1:{args.api_port}/bot"
+    os.environ['UPDATE_CONCURRENCY'] = str(args.concurrency)
+
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from bot_webhook import create_application
+
+    posted = {}
+    done = {}
+    finished = asyncio.Event()
+
+    async def mark_done(update, context):
+        done[update.update_id] = time.perf_counter()
+        if len(done) >= len(updates):
+            finished.set()
+
+    application = create_application()
+    # Отдельная группа: выполняется после основных обработчиков
+    application.add_handler(TypeHandler(Update, mark_done), group=1)
+
+    await application.initialize()
+    await application.start()
+    await application.updater.start_webhook(
+        listen='127.0.0.1',
+        port=args.webhook_port,
+        url_path='webhook',
+        webhook_url=f"http://127.0.0.1:{args.webhook_port}/webhook",
+        max_connections=args.connections,
+        secret_token=SECRET_TOKEN
+    )
+
+    url = f"http://127.0.0.1:{args.webhook_port}/webhook"
+    headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET_TOKEN}
+    connections = asyncio.Semaphore(args.connections)
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def send(update):
+            async with connections:
+                posted[update['update_id']] = time.perf_counter()
+                response = await client.post(url, json=update, headers=headers)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(update) for update in updates))
+        try:
+            await asyncio.wait_for(finished.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            print(f"Таймаут: обработано {len(done)} из {len(updates)}")
+        elapsed = time.perf_counter() - started
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    api_server.stop()
+
+    latencies = [(done[update_id] - posted[update_id]) * 1000 for update_id in done]
+    print(f"Обновлений: {len(done)}/{len(updates)}, чатов: {len({u['message']['chat']['id'] for u in updates if 'message' in u})}")
+    print(f"Параллельность: {args.concurrency}, задержка API: {args.api_latency} мс")
+    print(f"Время: {elapsed:.2f} с, {len(done) / elapsed:.1f} обновлений/с")
+    if latencies:
+        print(
+            f"Задержка, мс: p50={statistics.median(latencies):.1f} "
+            f"p95={percentile(latencies, 0.95):.1f} p99={percentile(latencies, 0.99):.1f} "
+            f"max={max(latencies):.1f}"
+        )
+    print(f"Вызовы Bot API: {dict(sorted(api_calls.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест вебхука")
+    parser.add_argument('--updates', help="JSONL-файл с обновлениями")
+    parser.add_argument('--record', help="сгенерировать поток в JSONL-файл и выйти")
+    parser.add_argument('--count', type=int, default=500, help="число синтетических обновлений")
+    parser.add_argument('--chats', type=int, default=50, help="число чатов в синтетическом потоке")
+    parser.add_argument('--concurrency', type=int, default=32, help="UPDATE_CONCURRENCY бота")
+    parser.add_argument('--api-latency', type=float, default=50, help="задержка фейкового API, мс")
+    parser.add_argument('--connections', type=int, default=40, help="одновременных запросов к вебхуку")
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--webhook-port', type=int, default=8082)
+    parser.add_argument('--timeout', type=float, default=120, help="ожидание обработки, с")
+    parser.add_argument('--use-env-db', action='store_true', help="работать с БД из окружения")
+    args = parser.parse_args()
+
+    if args.record:
+        with open(args.record, 'w', encoding='utf-8') as f:
+            for update in generate_updates(args.count, args.chats):
+                f.write(json.dumps(update, ensure_ascii=False) + '\n')
+        return
+
+    updates = load_updates(args.updates) if args.updates else generate_updates(args.count, args.chats)
+    # После чтения --updates: относительный путь считается от исходного каталога
+    setup_environment('load_test_', temp_database=not args.use_env_db)
+    asyncio.run(run(args, updates))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Проверка автоотмены неподтвержденных записей на управляемых часах.
+
+В новой SQLite во временном каталоге через Database.create_appointment
+занимаются все свободные слоты на ближайшие --days дней, каждая третья
+запись подтверждается, остальные остаются pending. Кроме того, вставляются
+"исторические" pending-записи прошлых дней (вчера и год назад). Затем часы
+сдвигаются шагами по --step-minutes на --hours часов вперед; на каждом шаге
+сначала ReminderWorker рассылает напоминания (Bot API заменен заглушкой),
+потом PendingSweeper отменяет просроченные записи.
+
+Проверяется, что:
+- отменены ровно pending-записи, начинающиеся не позже часов + срока,
+  подтвержденные и более поздние не тронуты;
+- записи прошлых дней остались pending, клиентам о них ничего не ушло;
+- слоты отмененных записей освобождены, а в stats как освобожденные
+  посчитаны только еще не наступившие слоты;
+- клиенту каждой отмененной записи поставлено ровно одно уведомление;
+- напоминание о неподтвержденной записи не ушло в пределах срока
+  автоотмены (чтобы "визит через 2 часа" не совпал с отменой).
+
+Использование:
+    python benchmarks/pending_check.py [--days 5] [--bays 3] [--hours 72]
+        [--step-minutes 10] [--expire-hours 2]
+"""
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from harness import FakeBot, FakeClock, setup_environment
+
+FIRST_USER_ID = 800000000
+HISTORY_USER_ID = 799000000
+
+
+def create_bookings(db, start, days):
+    """Занимает все свободные слоты; возвращает {id записи: (user_id, начало)}"""
+    from database import DATE_FORMAT
+
+    bookings = {}
+    user_id = FIRST_USER_ID
+    for date, times in db.get_free_slots(start.date(), days).items():
+        for time in times:
+            starts_at = datetime.strptime(f"{date} {time}", f"{DATE_FORMAT} %H:%M")
+            if starts_at <= start:
+                continue
+            # Несколько постов - несколько записей на одно время
+            while True:
+                appointment_id = db.create_appointment(
+                    user_id, 1, 'Диагностика', date, time, 'Lada', 'Vesta', 2020, '+79160000000'
+                )
+                if appointment_id is None:
+                    break
+                bookings[appointment_id] = (user_id, starts_at)
+                user_id += 1
+    return bookings
+
+
+def create_history(db, start):
+    """Pending-записи прошлых дней: их автоотмена трогать не должна"""
+    ids = []
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        for index, days_ago in enumerate((1, 365)):
+            db._execute(cursor, """
+                INSERT INTO appointments (user_id, service_id, service_name, appointment_date,
+                    appointment_time, car_brand, car_model, car_year, phone, comment)
+                VALUES (?, 1, 'Диагностика', ?, '10:00', 'Lada', 'Vesta', 2020, '+79160000000', '')
+                RETURNING id
+            """, (HISTORY_USER_ID + index, (start.date() - timedelta(days=days_ago)).isoformat()))
+            ids.append(cursor.fetchone()[0])
+        conn.commit()
+        cursor.close()
+    return ids
+
+
+def fetch_statuses(db, ids):
+    placeholders = ', '.join('?' * len(ids))
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, status FROM appointments WHERE id IN ({placeholders})", ids)
+        statuses = dict(cursor.fetchall())
+        cursor.execute(
+            f"SELECT COUNT(*) FROM slot_reservations WHERE appointment_id IN ({placeholders})"
+            f" AND appointment_id IN (SELECT id FROM appointments WHERE status = 'cancelled')", ids
+        )
+        cancelled_slots = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT chat_id, COUNT(*) FROM notification_outbox WHERE kind = 'client_expired' GROUP BY chat_id
+        """)
+        client_notices = dict(cursor.fetchall())
+        cursor.close()
+    return statuses, cancelled_slots, client_notices
+
+
+async def run(args):
+    from config import PENDING_EXPIRE_HOURS
+    from database import db
+    from reminders import ReminderWorker
+    from pending_sweeper import PendingSweeper
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    clock = FakeClock(start)
+    expire_after = timedelta(hours=PENDING_EXPIRE_HOURS)
+
+    bookings = create_bookings(db, start, args.days)
+    history = create_history(db, start)
+    confirmed = set(list(bookings)[::3])
+    for appointment_id in confirmed:
+        db.update_appointment_status(appointment_id, 'confirmed')
+    print(f"Записей: {len(bookings)} (подтверждено {len(confirmed)}), прошлых дней: {len(history)}")
+
+    bot = FakeBot(clock)
+    worker = ReminderWorker(clock=clock, worker_id='check')
+    worker._bot = bot
+    sweeper = PendingSweeper(clock=clock)
+
+    # Момент отмены каждой записи по часам проверки
+    expired_at = {}
+    for _ in range(args.hours * 60 // args.step_minutes):
+        clock.advance(timedelta(minutes=args.step_minutes))
+        await worker.run_pending()
+        before = sweeper.stats['expired']
+        await sweeper.sweep()
+        if sweeper.stats['expired'] > before:
+            statuses, _, _ = fetch_statuses(db, list(bookings))
+            for appointment_id, status in statuses.items():
+                if status == 'cancelled':
+                    expired_at.setdefault(appointment_id, clock())
+
+    statuses, cancelled_slots, client_notices = fetch_statuses(db, list(bookings) + history)
+    deadline = clock() + expire_after
+    expected = {
+        appointment_id for appointment_id, (_, starts_at) in bookings.items()
+        if appointment_id not in confirmed and starts_at <= deadline
+    }
+    cancelled = {appointment_id for appointment_id, status in statuses.items() if status == 'cancelled'}
+    # Все записи создавались в будущем, и каждая отменялась до начала
+    expected_slots = sum(
+        1 for appointment_id in expected if bookings[appointment_id][1] > expired_at.get(appointment_id, clock())
+    )
+    users = {user_id: (appointment_id, starts_at) for appointment_id, (user_id, starts_at) in bookings.items()}
+    late_reminders = [
+        (chat_id, sent_at) for chat_id, _, sent_at in bot.messages
+        if chat_id in users and users[chat_id][0] not in confirmed
+        and sent_at >= users[chat_id][1] - expire_after
+    ]
+    history_touched = [appointment_id for appointment_id in history if statuses[appointment_id] != 'pending']
+    history_notices = sum(client_notices.get(HISTORY_USER_ID + index, 0) for index in range(len(history)))
+    expired_users = {bookings[appointment_id][0] for appointment_id in expected}
+    wrong_notices = sum(
+        1 for chat_id, count in client_notices.items() if count != 1 or chat_id not in expired_users
+    ) + len(expired_users - set(client_notices))
+
+    print(f"Смоделировано: {args.hours} ч шагами по {args.step_minutes} мин, срок автоотмены {expire_after}")
+    print(f"Отменено: {len(cancelled)}, ожидалось: {len(expected)}; статистика автоотмены: {sweeper.stats}")
+    print(f"Освобождено будущих слотов: {sweeper.stats['slots']}, ожидалось: {expected_slots}; "
+          f"занятых слотов у отмененных: {cancelled_slots}")
+    print(f"Записи прошлых дней изменены: {len(history_touched)}, уведомлений их клиентам: {history_notices}")
+    print(f"Неверных уведомлений об отмене: {wrong_notices}; "
+          f"напоминаний о неподтвержденных в пределах срока: {len(late_reminders)}, "
+          f"всего напоминаний: {len(bot.messages)}")
+
+    ok = (
+        cancelled == expected and sweeper.stats['slots'] == expected_slots and cancelled_slots == 0
+        and not history_touched and not history_notices and not wrong_notices and not late_reminders
+    )
+    print("OK" if ok else "ОШИБКА")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка автоотмены неподтвержденных записей")
+    parser.add_argument('--days', type=int, default=5, help="на сколько дней вперед занять слоты")
+    parser.add_argument('--bays', type=int, default=3, help="постов (SERVICE_BAYS)")
+    parser.add_argument('--hours', type=int, default=72, help="сколько часов моделировать")
+    parser.add_argument('--step-minutes', type=int, default=10, help="шаг часов, мин")
+    parser.add_argument('--expire-hours', type=float, help="срок автоотмены (по умолчанию PENDING_EXPIRE_HOURS)")
+    args = parser.parse_args()
+
+    os.environ['SERVICE_BAYS'] = str(args.bays)
+    if args.expire_hours is not None:
+        os.environ['PENDING_EXPIRE_HOURS'] = str(args.expire_hours)
+    setup_environment('pending_check_')
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
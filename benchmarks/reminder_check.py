@@ -0,0 +1,194 @@
+"""Проверка рассылки напоминаний на управляемых часах.
+
+В новой SQLite во временном каталоге создается --bookings записей на
+ближайшие --days дней (с напоминаниями за REMINDER_OFFSETS минут), часть
+записей отменяется. Затем часы сдвигаются шагами по --step-minutes на
+--hours часов вперед, и на каждом шаге два обработчика ReminderWorker
+одновременно разбирают очередь; Bot API заменен заглушкой, которая
+иногда отвечает сетевой ошибкой. Третий "упавший" обработчик захватывает
+пачку и не завершает ее - эти напоминания должен подобрать кто-то другой
+после REMINDER_CLAIM_TIMEOUT.
+
+Проверяется, что каждое наступившее напоминание об активной записи
+отправлено ровно один раз, об отмененных - ни одного, а о неподтвержденных
+в последние PENDING_EXPIRE_HOURS до начала - пропущено. Выводится время
+захвата пачки и план запроса очереди.
+
+Использование:
+    python benchmarks/reminder_check.py [--bookings 20000] [--days 60]
+        [--hours 48] [--step-minutes 10] [--fail-rate 0.05]
+"""
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from harness import FakeBot, FakeClock, percentile, setup_environment
+
+FIRST_USER_ID = 900000000
+
+
+def create_bookings(db, start, args):
+    """Записи и их напоминания одним пакетом (как если бы их создали через бота)"""
+    from config import REMINDER_OFFSETS
+    from database import SQL_INSERT_REMINDER, to_db_timestamp
+
+    appointments = []
+    reminders = []
+    for index in range(args.bookings):
+        starts_at = (start + timedelta(days=1 + index * args.days // args.bookings)).replace(
+            hour=random.randint(9, 17), minute=0, second=0, microsecond=0
+        )
+        appointments.append(starts_at)
+
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        for index, starts_at in enumerate(appointments):
+            db._execute(cursor, """
+                INSERT INTO appointments (user_id, service_id, service_name, appointment_date,
+                    appointment_time, car_brand, car_model, car_year, phone, comment)
+                VALUES (?, 1, 'Диагностика', ?, ?, 'Lada', 'Vesta', 2020, '+79160000000', '')
+                RETURNING id
+            """, (FIRST_USER_ID + index, starts_at.date().isoformat(), starts_at.strftime("%H:%M")))
+            appointment_id = cursor.fetchone()[0]
+            for offset in REMINDER_OFFSETS:
+                remind_at = starts_at - timedelta(minutes=offset)
+                if remind_at > start:
+                    reminders.append((appointment_id, FIRST_USER_ID + index, offset, to_db_timestamp(remind_at)))
+        db._executemany(cursor, SQL_INSERT_REMINDER, reminders)
+        conn.commit()
+        cursor.close()
+
+
+async def run(args):
+    from config import PENDING_EXPIRE_HOURS
+    from database import db, async_db, SQL_CLAIM_REMINDERS
+    from reminders import ReminderWorker
+
+    logging.getLogger().setLevel(logging.ERROR)
+    random.seed(args.seed)
+
+    start = datetime.now().replace(second=0, microsecond=0)
+    clock = FakeClock(start)
+    bot = FakeBot(fail_rate=args.fail_rate)
+
+    started = time.perf_counter()
+    create_bookings(db, start, args)
+    print(f"Создано записей: {args.bookings} за {time.perf_counter() - started:.1f} с")
+
+    # Отменяем каждую сотую запись - их напоминания не должны уйти
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM appointments WHERE user_id >= ? ORDER BY id", (FIRST_USER_ID,))
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    cancelled = ids[::100]
+    for chunk in range(0, len(cancelled), 500):
+        await async_db.update_appointments_status(cancelled[chunk:chunk + 500], 'cancelled')
+
+    workers = [ReminderWorker(batch_size=args.batch_size, clock=clock, worker_id=f"w{i}") for i in (1, 2)]
+    for worker in workers:
+        worker._bot = bot
+
+    claim_times = []
+    original_claim = db.claim_due_reminders
+
+    def timed_claim(*claim_args, **claim_kwargs):
+        claim_started = time.perf_counter()
+        try:
+            return original_claim(*claim_args, **claim_kwargs)
+        finally:
+            claim_times.append(time.perf_counter() - claim_started)
+
+    db.claim_due_reminders = timed_claim
+
+    crashed = []
+    totals = {}
+    steps = args.hours * 60 // args.step_minutes
+    for step in range(steps):
+        clock.advance(timedelta(minutes=args.step_minutes))
+        if not crashed and step >= steps // 3:
+            # "Упавший" обработчик: захватил пачку и пропал
+            crashed = await async_db.claim_due_reminders('crashed', clock(), args.batch_size)
+        results = await asyncio.gather(*(worker.run_pending() for worker in workers))
+        for counts in results:
+            for status, count in counts.items():
+                totals[status] = totals.get(status, 0) + count
+
+    # Ожидаемый результат по данным БД
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM appointment_reminders r JOIN appointments a ON a.id = r.appointment_id
+            WHERE r.remind_at <= ? AND a.status != 'cancelled'
+        """, (clock().strftime("%Y-%m-%d %H:%M:%S"),))
+        due = cursor.fetchone()[0]
+        # Неподтвержденные записи отменяются за PENDING_EXPIRE_HOURS до начала -
+        # их более поздние напоминания пропускаются, а не отправляются
+        cursor.execute("""
+            SELECT COUNT(*) FROM appointment_reminders r JOIN appointments a ON a.id = r.appointment_id
+            WHERE r.remind_at <= ? AND a.status = 'pending'
+              AND r.remind_at >= datetime(a.appointment_date || ' ' || a.appointment_time, ?)
+        """, (clock().strftime("%Y-%m-%d %H:%M:%S"), f"-{PENDING_EXPIRE_HOURS} hours"))
+        pending_skipped = cursor.fetchone()[0]
+        cursor.execute("SELECT status, COUNT(*) FROM appointment_reminders GROUP BY status ORDER BY status")
+        by_status = dict(cursor.fetchall())
+        placeholders = ', '.join('?' * len(cancelled))
+        cursor.execute(f"SELECT COUNT(*) FROM appointment_reminders WHERE appointment_id IN ({placeholders})", cancelled)
+        cancelled_left = cursor.fetchone()[0]
+        plan = db.dialect.explain(
+            conn, db.dialect.sql(SQL_CLAIM_REMINDERS.format(skip_locked=db.dialect.skip_locked)),
+            ('x', clock().strftime("%Y-%m-%d %H:%M:%S"), clock().strftime("%Y-%m-%d %H:%M:%S"), args.batch_size)
+        )
+        conn.rollback()
+        cursor.close()
+
+    sent_to = [chat_id for chat_id, _, _ in bot.messages]
+    duplicates = len(bot.messages) - len(set(bot.messages))
+    cancelled_users = {FIRST_USER_ID + ids.index(appointment_id) for appointment_id in cancelled}
+
+    print(f"Смоделировано: {args.hours} ч шагами по {args.step_minutes} мин, обработчиков: {len(workers)}")
+    print(f"Наступило напоминаний об активных записях: {due}, отправлено сообщений: {len(bot.messages)}")
+    print(f"Итоги обработчиков: {totals}, сетевых ошибок заглушки: {bot.failures}")
+    print(f"Пропущено напоминаний о неподтвержденных записях: {by_status.get('skipped', 0)} "
+          f"(ожидалось {pending_skipped})")
+    print(f"Статусы в БД: {by_status}")
+    print(f"Захвачено упавшим обработчиком и подобрано другими: {len(crashed)}")
+    print(f"Повторных отправок: {duplicates}, напоминаний отмененным: "
+          f"{sum(chat_id in cancelled_users for chat_id in sent_to)}, "
+          f"осталось строк у отмененных записей: {cancelled_left}")
+    claim_ms = sorted(t * 1000 for t in claim_times)
+    print(f"Захват пачки: {len(claim_ms)} раз, p50 {statistics.median(claim_ms):.2f} мс, "
+          f"p95 {percentile(claim_ms, 0.95):.2f} мс, max {claim_ms[-1]:.2f} мс")
+    print(f"План запроса очереди: {plan}")
+
+    # Исчерпавшие попытки (заглушка падала каждый раз) не отправлены честно
+    expected = due - by_status.get('failed', 0) - pending_skipped
+    ok = (duplicates == 0 and len(bot.messages) == expected and by_status.get('skipped', 0) == pending_skipped
+          and not any(chat_id in cancelled_users for chat_id in sent_to))
+    print("OK" if ok else "ОШИБКА")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка рассылки напоминаний")
+    parser.add_argument('--bookings', type=int, default=20000, help="предстоящих записей")
+    parser.add_argument('--days', type=int, default=60, help="на сколько дней вперед распределить записи")
+    parser.add_argument('--hours', type=int, default=48, help="сколько часов моделировать")
+    parser.add_argument('--step-minutes', type=int, default=10, help="шаг часов, мин")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--fail-rate', type=float, default=0.05, help="доля отправок с сетевой ошибкой")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_environment('reminder_check_')
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Микробенчмарк построения объектов из строк запроса (--rows записей).
+
+В новой SQLite во временном каталоге создается --rows записей, и список
+записей (колонки SQL_APPOINTMENT_COLUMNS + имя из users, 15 полей)
+превращается в объекты разными способами:
+
+- кортежи драйвера как есть (нижняя граница);
+- dict(row) по sqlite3.Row - прежний путь для SQLite;
+- словарь по позициям кортежа - прежний путь для PostgreSQL;
+- Dialect.fetch_records(cursor, Appointment) - общий путь для обоих бэкендов.
+
+Для каждого способа выводится лучшее время из --repeats (вместе с
+чтением из курсора и отдельно - только построение из готовых кортежей)
+и память, которую занимает полученный список (tracemalloc; для кортежей
+драйвера - только сам список, кортежи уже созданы).
+
+Использование:
+    python benchmarks/row_materialize.py [--rows 100000] [--repeats 5]
+"""
+import time
+import sqlite3
+import argparse
+import tracemalloc
+
+from harness import setup_environment
+
+
+def populate(db, rows):
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO users (user_id, username, first_name) VALUES (?, ?, ?)",
+            [(500000000 + user, f"user{user}", f"User{user}") for user in range(1000)]
+        )
+        cursor.executemany("""
+            INSERT INTO appointments (user_id, service_id, service_name, appointment_date,
+                appointment_time, car_brand, car_model, car_year, phone, comment, status)
+            VALUES (?, 1, 'Диагностика', ?, '10:00', 'Lada', 'Vesta', 2020, '+79160000000', 'Стук в подвеске', 'confirmed')
+        """, [(500000000 + index % 1000, f"2026-{index % 12 + 1:02d}-{index % 28 + 1:02d}") for index in range(rows)])
+        conn.commit()
+        cursor.close()
+
+
+def best_of(repeats, call):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def retained_mib(call):
+    """Память, занятая результатом call(), МиБ"""
+    tracemalloc.start()
+    result = call()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size / 2 ** 20
+
+
+def run(args):
+    from database import db, SQL_APPOINTMENT_COLUMNS
+    from models import Appointment
+
+    populate(db, args.rows)
+    query = f'''
+        SELECT {SQL_APPOINTMENT_COLUMNS}, u.first_name, u.username
+        FROM appointments a LEFT JOIN users u ON a.user_id = u.user_id
+    '''
+    fields = Appointment.__slots__
+
+    tuple_conn = sqlite3.connect('car_service.db')
+    row_conn = sqlite3.connect('car_service.db')
+    row_conn.row_factory = sqlite3.Row
+
+    def from_cursor(conn, build):
+        return lambda: build(conn.execute(query))
+
+    variants = [
+        ('кортежи драйвера', tuple_conn, lambda cursor: cursor.fetchall(), lambda rows: list(rows)),
+        ('dict(sqlite3.Row)', row_conn, lambda cursor: [dict(row) for row in cursor.fetchall()],
+         lambda rows: [dict(row) for row in rows]),
+        ('словарь по позициям', tuple_conn, lambda cursor: [dict(zip(fields, row)) for row in cursor.fetchall()],
+         lambda rows: [dict(zip(fields, row)) for row in rows]),
+        ('fetch_records', tuple_conn, lambda cursor: db.dialect.fetch_records(cursor, Appointment),
+         lambda rows: [Appointment(*row) for row in rows]),
+    ]
+
+    print(f"Строк: {args.rows}, полей: {len(fields)}, лучшее из {args.repeats}")
+    print(f"{'способ':<24}{'с курсором, с':>16}{'из кортежей, с':>16}{'память, МиБ':>14}")
+    for name, conn, build, convert in variants:
+        ready = conn.execute(query).fetchall()
+        with_cursor = best_of(args.repeats, from_cursor(conn, build))
+        only_build = best_of(args.repeats, lambda: convert(ready))
+        memory = retained_mib(lambda: convert(ready))
+        print(f"{name:<24}{with_cursor:>16.3f}{only_build:>16.3f}{memory:>14.1f}")
+
+    tuple_conn.close()
+    row_conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк построения объектов из строк")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_environment('row_materialize_')
+
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Бенчмарк поиска свободного времени при 10k, 100k и 1M записей.
+
+В новой SQLite во временном каталоге таблица appointments (и занятые ими
+слоты в slot_reservations) наполняется до каждого из --sizes: сначала
+ближайшие BOOKING_DAYS_AHEAD дней, затем все более давняя история - как
+растет база работающего сервиса. На каждом размере измеряется:
+
+- get_free_slots на один день без кэша (запрос к БД + карта занятости);
+- get_free_slots на 14 дней без кэша (одним запросом, как календарь);
+- get_free_slots на один день из кэша SlotEngine;
+- SlotEngine.free_starts (только битовые операции);
+- get_appointments_by_date (список записей на день для администратора).
+
+"Без кэша" - SlotEngine.ttl = 0, каждый вызов перечитывает дни из БД.
+Выводятся p50/p95 в мс и планы запросов.
+
+Использование:
+    python benchmarks/slot_lookup.py [--sizes 10000,100000,1000000]
+        [--lookups 200] [--bays 4] [--fill 0.8]
+"""
+import os
+import time
+import random
+import logging
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from harness import percentile, setup_environment
+
+SERVICES = ['Диагностика', 'Замена масла', 'Шиномонтаж', 'Ремонт подвески']
+STATUSES = ['confirmed'] * 6 + ['pending'] * 2 + ['completed', 'cancelled']
+
+
+def booking_days(grid, first_day, days_ahead):
+    """Рабочие дни: сначала окно записи, затем история в прошлое"""
+    for offset in range(days_ahead):
+        day = first_day + timedelta(days=offset)
+        if grid.is_working_day(day):
+            yield day
+    day = first_day
+    while True:
+        day -= timedelta(days=1)
+        if grid.is_working_day(day):
+            yield day
+
+
+def generate_rows(grid, bays, fill, days):
+    """Строки (id, дата, время, пост, статус) записей по дням days"""
+    appointment_id = 0
+    for day in days:
+        for slot_time in grid.times:
+            for bay in range(1, bays + 1):
+                if random.random() < fill:
+                    appointment_id += 1
+                    yield appointment_id, day.isoformat(), slot_time, bay, random.choice(STATUSES)
+
+
+def populate(db, rows, count):
+    """Добавляет count записей и их занятые слоты пачками"""
+    from database import to_db_timestamp
+
+    created = to_db_timestamp(datetime.now())
+    with db.pool.connection() as conn:
+        cursor = conn.cursor()
+        while count > 0:
+            batch = [next(rows) for _ in range(min(count, 10000))]
+            count -= len(batch)
+            cursor.executemany("""
+                INSERT INTO appointments (id, user_id, service_id, service_name, appointment_date,
+                    appointment_time, car_brand, car_model, car_year, phone, comment, status, created_at)
+                VALUES (?, ?, 1, ?, ?, ?, 'Lada', 'Vesta', 2020, '+79160000000', '', ?, ?)
+            """, [
+                (appointment_id, 500000000 + appointment_id % 50000, SERVICES[appointment_id % len(SERVICES)],
+                 slot_date, slot_time, status, created)
+                for appointment_id, slot_date, slot_time, bay, status in batch
+            ])
+            cursor.executemany("""
+                INSERT INTO slot_reservations (slot_date, slot_time, bay, user_id, appointment_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (slot_date, slot_time, bay, 500000000 + appointment_id % 50000, appointment_id)
+                for appointment_id, slot_date, slot_time, bay, status in batch if status != 'cancelled'
+            ])
+        conn.commit()
+        cursor.close()
+
+
+def measure(call, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(args):
+    from config import BOOKING_DAYS_AHEAD, SLOT_CACHE_TTL
+    from database import db, DATE_FORMAT, SQL_GET_RESERVATIONS, SQL_GET_APPOINTMENTS_BY_DATE
+
+    logging.getLogger().setLevel(logging.WARNING)
+    random.seed(args.seed)
+
+    grid = db.slots.grid
+    first_day = datetime.now().date() + timedelta(days=1)
+    window = [day for day in (first_day + timedelta(days=offset) for offset in range(BOOKING_DAYS_AHEAD))
+              if grid.is_working_day(day)]
+    rows = generate_rows(grid, args.bays, args.fill, booking_days(grid, first_day, BOOKING_DAYS_AHEAD))
+
+    columns = ['1 день из БД', '14 дней из БД', '1 день из кэша', 'free_starts', 'записи на день']
+    print(f"Постов: {args.bays}, заполненность: {args.fill:.0%}, замеров на размер: {args.lookups}")
+    print(f"{'записей':>10}" + ''.join(f"{name:>22}" for name in columns))
+
+    total = 0
+    plans = {}
+    for size in args.sizes:
+        started = time.perf_counter()
+        populate(db, rows, size - total)
+        total = size
+        filled_in = time.perf_counter() - started
+
+        days = [random.choice(window) for _ in range(args.lookups)]
+        lookup = iter(days * 5)
+
+        db.slots.ttl = 0
+        cold_day = measure(lambda: db.get_free_slots(next(lookup), 1), args.lookups)
+        cold_calendar = measure(lambda: db.get_free_slots(next(lookup), 14), args.lookups)
+
+        db.slots.ttl = SLOT_CACHE_TTL
+        db.get_free_slots(first_day, BOOKING_DAYS_AHEAD)
+        warm_day = measure(lambda: db.get_free_slots(next(lookup), 1), args.lookups)
+        now = datetime.now()
+        engine = measure(lambda: db.slots.free_starts(next(lookup).isoformat(), None, now), args.lookups)
+        day_list = measure(lambda: db.get_appointments_by_date(next(lookup).strftime(DATE_FORMAT)), args.lookups)
+
+        cells = [
+            f"{statistics.median(values):.3f} / {percentile(values, 0.95):.3f}"
+            for values in (cold_day, cold_calendar, warm_day, engine, day_list)
+        ]
+        print(f"{size:>10}" + ''.join(f"{cell:>22}" for cell in cells) + f"   (наполнение {filled_in:.1f} с)")
+
+        day = window[0].isoformat()
+        with db.pool.connection() as conn:
+            plans = {
+                'slot_reservations по дням': db.dialect.explain(
+                    conn, db.dialect.sql(SQL_GET_RESERVATIONS), (day, day, day)
+                ),
+                'записи на день': db.dialect.explain(
+                    conn, db.dialect.sql(SQL_GET_APPOINTMENTS_BY_DATE.format(filters='', order='ASC')), (day, 100)
+                ),
+            }
+            conn.rollback()
+
+    print("(p50 / p95, мс)")
+    for name, plan in plans.items():
+        print(f"План запроса '{name}': {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска свободного времени")
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        type=lambda value: sorted(int(size) for size in value.split(',')),
+                        help="размеры таблицы записей через запятую")
+    parser.add_argument('--lookups', type=int, default=200, help="замеров каждого вида на размер")
+    parser.add_argument('--bays', type=int, default=4, help="постов (SERVICE_BAYS)")
+    parser.add_argument('--fill', type=float, default=0.8, help="доля занятых слотов в день")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ['SERVICE_BAYS'] = str(args.bays)
+    setup_environment('slot_lookup_')
+
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Проверка хранилища состояний записи и сохранения шага диалога.
+
+1. RedisStateStore на заглушке клиента Redis (get/set с ex/expire/delete/
+   scan_iter/mget, время - управляемые часы): данные и шаги диалога живут
+   STATE_TTL секунд с последнего сохранения, удаляются и продлеваются.
+2. Перезапуск бота: пользователь начинает запись и выбирает услугу в
+   одном экземпляре Application, тот останавливается, и выбор даты
+   приходит уже в новый экземпляр. Шаг диалога должен восстановиться из
+   StatePersistence - иначе обновление не попадет в диалог записи.
+   Проверяется с шагами в таблице БД (STATE_BACKEND=db) и в заглушке Redis;
+   данные записи - в SQLite во временном каталоге, Bot API - заглушка.
+
+Использование:
+    python benchmarks/state_store_check.py [--ttl 60]
+"""
+import os
+import sys
+import time
+import fnmatch
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+from harness import FAKE_TOKEN, FakeClock, StubRequest, UpdateFactory, setup_environment
+
+USER_ID = 600000001
+
+
+class FakeRedis:
+    """Заглушка асинхронного клиента Redis: строки с временем жизни"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._values = {}  # ключ -> (значение, истекает в или None)
+
+    @staticmethod
+    def _key(key):
+        # Как и настоящий клиент, принимает ключи и строкой, и байтами
+        return key.decode() if isinstance(key, bytes) else key
+
+    def _alive(self, key):
+        key = self._key(key)
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= self.clock():
+            del self._values[key]
+            return None
+        return entry
+
+    async def get(self, key):
+        entry = self._alive(key)
+        return entry[0].encode() if entry else None
+
+    async def set(self, key, value, ex=None):
+        self._values[self._key(key)] = (value, self.clock() + ex if ex else None)
+        return True
+
+    async def expire(self, key, seconds):
+        entry = self._alive(key)
+        if entry is None:
+            return False
+        self._values[self._key(key)] = (entry[0], self.clock() + seconds)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self._values.pop(self._key(key), None) is not None for key in keys)
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def scan_iter(self, match='*'):
+        for key in list(self._values):
+            if fnmatch.fnmatchcase(key, match) and self._alive(key):
+                yield key.encode()
+
+
+def check(results, name, condition):
+    results.append((name, bool(condition)))
+    print(f"  {'ok ' if condition else 'FAIL'} {name}")
+
+
+async def check_redis_store(ttl, results):
+    from state_store import RedisStateStore, StatePersistence
+    from states import AppointmentState
+
+    print("RedisStateStore на заглушке Redis:")
+    clock = FakeClock()
+    client = FakeRedis(clock)
+    store = RedisStateStore(ttl=ttl, client=client)
+
+    await store.set(USER_ID, {'step': 'CAR_BRAND', 'phone': '+7 916'})
+    check(results, "get возвращает сохраненные данные", await store.get(USER_ID) == {'step': 'CAR_BRAND', 'phone': '+7 916'})
+    clock.advance(ttl - 1)
+    await store.set(USER_ID, {'step': 'CAR_MODEL'})
+    clock.advance(ttl - 1)
+    check(results, "set продлевает срок жизни", await store.get(USER_ID) == {'step': 'CAR_MODEL'})
+    clock.advance(1)
+    check(results, "через STATE_TTL без шагов данные истекают", await store.get(USER_ID) is None)
+    await store.set(USER_ID, {'step': 'PHONE'})
+    await client.expire(f"{store.key_prefix}{USER_ID}", 1)
+    clock.advance(1)
+    check(results, "срок, измененный через EXPIRE, тоже соблюдается", await store.get(USER_ID) is None)
+    await store.set(USER_ID, {'step': 'PHONE'})
+    await store.delete(USER_ID)
+    check(results, "delete удаляет данные", await store.get(USER_ID) is None)
+
+    await store.set_handler_state('appointment', f'{USER_ID}:{USER_ID}', 'SELECT_DATE')
+    await store.set_handler_state('appointment', '1:1', 'PHONE')
+    await store.set_handler_state('other', '2:2', 'PHONE')
+    check(results, "шаги диалога читаются по имени диалога",
+          await store.get_handler_states('appointment') == {f'{USER_ID}:{USER_ID}': 'SELECT_DATE', '1:1': 'PHONE'})
+    await store.set_handler_state('appointment', '1:1', None)
+    check(results, "завершенный диалог удаляется", '1:1' not in await store.get_handler_states('appointment'))
+    clock.advance(ttl)
+    check(results, "шаги диалога истекают вместе с данными", await store.get_handler_states('appointment') == {})
+
+    persistence = StatePersistence(store, AppointmentState)
+    await persistence.update_conversation('appointment', (USER_ID, USER_ID), AppointmentState.CAR_YEAR)
+    await store.set_handler_state('appointment', '3:3', 'NO_SUCH_STATE')
+    check(results, "StatePersistence восстанавливает ключи и состояния, пропуская неизвестные",
+          await persistence.get_conversations('appointment') == {(USER_ID, USER_ID): AppointmentState.CAR_YEAR})
+
+
+async def check_restart(persistence, label, results):
+    from telegram import Update
+    from telegram.ext import Application
+    from bot_webhook import create_application
+    from states import state_store
+    from service_catalog import service_catalog
+
+    print(f"Перезапуск бота, шаги диалога - {label}:")
+    await state_store.delete(USER_ID)
+    service_id = service_catalog.load()[0]['id']
+    date_str = (datetime.now() + timedelta(days=7)).strftime("%d.%m.%Y")
+
+    factory = UpdateFactory()
+
+    def new_application():
+        # Те же обработчики, что и в боевом приложении, но с заглушкой вместо Bot API
+        application = create_application()
+        check_app = (
+            Application.builder().token(FAKE_TOKEN)
+            .request(StubRequest()).get_updates_request(StubRequest())
+            .persistence(persistence)
+            .build()
+        )
+        for group, handlers in application.handlers.items():
+            for handler in handlers:
+                check_app.add_handler(handler, group=group)
+        return check_app
+
+    first = new_application()
+    async with first:
+        await first.process_update(Update.de_json(factory.message(USER_ID, "✅ Записаться на услугу"), first.bot))
+        await first.process_update(Update.de_json(factory.callback(USER_ID, f"select_service_{service_id}"), first.bot))
+    data = await state_store.get(USER_ID)
+    check(results, "до перезапуска выбрана услуга", data and data.get('step') == 'SELECT_DATE')
+
+    second = new_application()
+    async with second:
+        await second.process_update(Update.de_json(factory.callback(USER_ID, f"select_date_{date_str}"), second.bot))
+    data = await state_store.get(USER_ID)
+    check(results, "после перезапуска выбор даты попал в диалог записи",
+          data and data.get('appointment_date') == date_str and data.get('step') == 'SELECT_TIME')
+
+
+async def run(args):
+    from state_store import RedisStateStore, StatePersistence
+    from states import AppointmentState, persistence
+
+    logging.getLogger().setLevel(logging.ERROR)
+    results = []
+
+    await check_redis_store(args.ttl, results)
+    await check_restart(persistence, "таблица БД (STATE_BACKEND=db)", results)
+    redis_persistence = StatePersistence(
+        RedisStateStore(ttl=args.ttl, client=FakeRedis(time.monotonic)), AppointmentState
+    )
+    await check_restart(redis_persistence, "заглушка Redis", results)
+
+    failed = [name for name, ok in results if not ok]
+    print(f"Проверок: {len(results)}, не прошло: {len(failed)}")
+    print("OK" if not failed else "ОШИБКА")
+    return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка хранилища состояний записи")
+    parser.add_argument('--ttl', type=int, default=60, help="STATE_TTL для проверки истечения, с")
+    args = parser.parse_args()
+
+    os.environ['STATE_BACKEND'] = 'db'
+    setup_environment('state_store_check_')
+
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,20 @@
 import logging
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
 from telegram import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import re
 import sqlite3
 
-from config import BOT_TOKEN
-from database import db
-from states import AppointmentState, user_data_store
+from config import BOT_TOKEN, TELEGRAM_BASE_URL, BOOKING_DAYS_AHEAD
+from database import async_db
+from service_catalog import service_catalog
+from states import AppointmentState, state_store, persistence
+from user_writer import user_writes
+from notifier import notifications
+from reminders import reminders
+from pending_sweeper import pending_sweeper
+from update_processor import create_update_processor
+from rate_limiter import create_rate_limiter
 
 # Настройка логирования
 logging.basicConfig(
@@ -56,17 +63,30 @@ async def handle_message(update, context):
 
 
 async def show_my_appointments(update, context):
-    """Показывает записи пользователя"""
-    user_id = update.message.from_user.id
-    appointments = db.get_user_appointments(user_id)
+    """Показывает записи пользователя (постранично, начиная с последних)"""
+    query = update.callback_query
+    if query:
+        user_id = query.from_user.id
+        after, before = parse_page_callback(query.data, 'my_appointments')
+    else:
+        user_id = update.message.from_user.id
+        after, before = None, None
+
+    appointments = await async_db.get_user_appointments(
+        user_id, limit=USER_PAGE_SIZE + 1, after=after, before=before
+    )
+    appointments, has_prev, has_next = split_page(appointments, after, before, USER_PAGE_SIZE)
 
     if not appointments:
-        await update.message.reply_text("📋 У вас пока нет активных записей.")
+        if query:
+            await query.edit_message_text("📋 У вас пока нет активных записей.")
+        else:
+            await update.message.reply_text("📋 У вас пока нет активных записей.")
         return
 
     text = "📋 **Ваши записи:**\n\n"
 
-    for appt in appointments[:5]:  # Показываем последние 5 записей
+    for appt in appointments:
         status_icon = "✅" if appt['status'] == 'confirmed' else "⏳"
         status_icon = "❌" if appt['status'] == 'cancelled' else status_icon
 
@@ -87,10 +107,17 @@ async def show_my_appointments(update, context):
 
         text += "\n" + "─" * 30 + "\n\n"
 
-    if len(appointments) > 5:
-        text += f"📄 Показано 5 из {len(appointments)} записей"
+    # Общее количество считаем только когда записей больше одной страницы
+    keyboard = page_buttons('my_appointments', appointments, has_prev, has_next, list_cursor)
+    if keyboard:
+        total = await async_db.count_user_appointments(user_id)
+        text += f"📄 Показано {len(appointments)} из {total} записей"
 
-    await update.message.reply_text(text, parse_mode='Markdown')
+    reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
+    if query:
+        await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+    else:
+        await update.message.reply_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 
 async def show_services_info(update, context):
@@ -142,39 +169,53 @@ async def show_contacts(update, context):
 
 # ==================== СИСТЕМА ЗАПИСИ ====================
 
+async def update_booking(user_id, step, **fields):
+    """Сохраняет данные шага записи в хранилище состояний.
+
+    Возвращает обновленные данные или None, если данные записи
+    истекли (пользователь долго не отвечал) или были вытеснены.
+    """
+    data = await state_store.get(user_id)
+    if data is None:
+        return None
+
+    data.update(fields)
+    data['step'] = step.name
+    await state_store.set(user_id, data)
+    return data
+
+
+async def booking_expired(message):
+    """Сообщает, что данные записи потеряны, и завершает диалог"""
+    await message.reply_text(
+        "⌛ Время оформления записи истекло. Пожалуйста, начните запись заново.",
+        reply_markup=main_menu_keyboard()
+    )
+    return ConversationHandler.END
+
+
 async def start_appointment(update, context):
     """Начинает процесс записи"""
     user = update.message.from_user
     user_id = user.id
 
     # Инициализируем данные пользователя
-    user_data_store[user_id] = {
-        'step': AppointmentState.SELECT_SERVICE,
+    await state_store.set(user_id, {
+        'step': AppointmentState.SELECT_SERVICE.name,
         'user_info': {
             'user_id': user_id,
             'username': user.username,
             'first_name': user.first_name
         }
-    }
+    })
 
-    # Добавляем пользователя в БД
-    db.add_user(user_id, user.username, user.first_name)
+    # Профиль сохранится в фоне, не задерживая ответ
+    user_writes.add(user_id, user.username, user.first_name)
 
-    # Показываем выбор услуги
-    services = db.get_services()
-    keyboard = []
-    for service in services:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{service['name']} ({service['price_range']})",
-                callback_data=f"select_service_{service['id']}"
-            )
-        ])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    # Показываем выбор услуги (клавиатура берется из кэша)
     await update.message.reply_text(
         "🚗 Выберите услугу:",
-        reply_markup=reply_markup
+        reply_markup=await service_catalog.keyboard()
     )
 
     return AppointmentState.SELECT_SERVICE
@@ -189,46 +230,107 @@ async def select_service(update, context):
     service_id = int(query.data.replace("select_service_", ""))
 
     # Получаем информацию об услуге
-    services = db.get_services()
-    selected_service = next((s for s in services if s['id'] == service_id), None)
+    selected_service = await service_catalog.get(service_id)
 
     if selected_service:
-        user_data_store[user_id]['service'] = selected_service
-        user_data_store[user_id]['step'] = AppointmentState.SELECT_DATE
+        if not await update_booking(user_id, AppointmentState.SELECT_DATE, service=dict(selected_service)):
+            return await booking_expired(query.message)
 
         await query.edit_message_text(
             f"✅ Выбрана услуга: {selected_service['name']}\n"
             f"📝 {selected_service['description']}\n\n"
             "Теперь выберите дату:"
         )
-        await show_date_selection(query.message, user_id)
+        await show_date_selection(query.message, user_id, selected_service['duration_minutes'])
 
     return AppointmentState.SELECT_DATE
 
 
-async def show_date_selection(message, user_id):
-    """Показывает выбор даты"""
-    # Генерируем даты на ближайшие 7 дней
-    dates = []
-    keyboard = []
+MONTH_NAMES = ["Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+               "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"]
+CALENDAR_TEXT = "📅 Выберите дату:\n❌ - свободного времени нет"
 
-    for i in range(1, 8):
-        date = datetime.now() + timedelta(days=i)
-        if date.weekday() < 5:  # Только будни (0-4 = Пн-Пт)
-            date_str = date.strftime("%d.%m.%Y")
-            weekday = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"][date.weekday()]
-            dates.append((date_str, f"{date_str} ({weekday})"))
 
-    for i in range(0, len(dates), 2):
-        row = []
-        for j in range(2):
-            if i + j < len(dates):
-                date_str, display_text = dates[i + j]
-                row.append(InlineKeyboardButton(display_text, callback_data=f"select_date_{date_str}"))
-        keyboard.append(row)
+def booking_window():
+    """Первый и последний день, на которые можно записаться"""
+    first_day = datetime.now().date() + timedelta(days=1)
+    return first_day, first_day + timedelta(days=BOOKING_DAYS_AHEAD - 1)
 
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await message.reply_text("📅 Выберите дату:", reply_markup=reply_markup)
+
+async def calendar_keyboard(year, month, duration_minutes=None):
+    """Календарь месяца: свободные дни - кнопки выбора, занятые помечены ❌.
+
+    Свободное время всех дней месяца берется одним запросом к БД.
+    """
+    first_day, last_day = booking_window()
+    month_start = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+
+    start = max(month_start, first_day)
+    end = min(next_month - timedelta(days=1), last_day)
+    counts = {}
+    if start <= end:
+        counts = await async_db.get_free_slot_counts(start, (end - start).days + 1, duration_minutes)
+
+    keyboard = [
+        [InlineKeyboardButton(f"{MONTH_NAMES[month - 1]} {year}", callback_data="calendar_ignore")],
+        [InlineKeyboardButton(day, callback_data="calendar_ignore") for day in ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]],
+    ]
+    # Пустые клетки до первого числа
+    row = [InlineKeyboardButton(" ", callback_data="calendar_ignore")] * month_start.weekday()
+    day = month_start
+    while day < next_month:
+        date_str = day.strftime("%d.%m.%Y")
+        if date_str not in counts:
+            # Прошедший, выходной или слишком далекий день
+            row.append(InlineKeyboardButton("·", callback_data="calendar_ignore"))
+        elif counts[date_str]:
+            row.append(InlineKeyboardButton(str(day.day), callback_data=f"select_date_{date_str}"))
+        else:
+            row.append(InlineKeyboardButton("❌", callback_data="calendar_ignore"))
+        if len(row) == 7:
+            keyboard.append(row)
+            row = []
+        day += timedelta(days=1)
+    if row:
+        keyboard.append(row + [InlineKeyboardButton(" ", callback_data="calendar_ignore")] * (7 - len(row)))
+
+    paging = []
+    if month_start > first_day:
+        previous_month = month_start - timedelta(days=1)
+        paging.append(InlineKeyboardButton("◀️", callback_data=f"calendar_{previous_month:%Y-%m}"))
+    if next_month <= last_day:
+        paging.append(InlineKeyboardButton("▶️", callback_data=f"calendar_{next_month:%Y-%m}"))
+    if paging:
+        keyboard.append(paging)
+
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def show_date_selection(message, user_id, duration_minutes=None):
+    """Показывает календарь выбора даты с ближайшего дня записи"""
+    first_day, _ = booking_window()
+    reply_markup = await calendar_keyboard(first_day.year, first_day.month, duration_minutes)
+    await message.reply_text(CALENDAR_TEXT, reply_markup=reply_markup)
+
+
+async def calendar_page(update, context):
+    """Листает календарь выбора даты по месяцам"""
+    query = update.callback_query
+    await query.answer()
+
+    page = query.data.replace("calendar_", "")
+    if page == "ignore":
+        return AppointmentState.SELECT_DATE
+
+    data = await state_store.get(query.from_user.id)
+    if data is None:
+        return await booking_expired(query.message)
+
+    year, month = map(int, page.split("-"))
+    reply_markup = await calendar_keyboard(year, month, data['service'].get('duration_minutes'))
+    await query.edit_message_text(CALENDAR_TEXT, reply_markup=reply_markup)
+    return AppointmentState.SELECT_DATE
 
 
 async def select_date(update, context):
@@ -239,24 +341,23 @@ async def select_date(update, context):
     user_id = query.from_user.id
     date_str = query.data.replace("select_date_", "")
 
-    user_data_store[user_id]['appointment_date'] = date_str
-    user_data_store[user_id]['step'] = AppointmentState.SELECT_TIME
+    data = await update_booking(user_id, AppointmentState.SELECT_TIME, appointment_date=date_str)
+    if data is None:
+        return await booking_expired(query.message)
 
     await query.edit_message_text(f"📅 Выбрана дата: {date_str}")
-    await show_time_selection(query.message, user_id, date_str)
-
-    return AppointmentState.SELECT_TIME
+    return await show_time_selection(query.message, user_id, date_str, data['service'].get('duration_minutes'))
 
 
-async def show_time_selection(message, user_id, date_str):
-    """Показывает выбор времени"""
-    available_slots = db.get_available_time_slots(date_str)
+async def show_time_selection(message, user_id, date_str, duration_minutes=None):
+    """Показывает выбор времени начала услуги; возвращает следующее состояние диалога"""
+    available_slots = await async_db.get_available_time_slots(date_str, duration_minutes)
 
     if not available_slots:
         await message.reply_text(
             "❌ На эту дату нет свободных слотов. Пожалуйста, выберите другую дату."
         )
-        await show_date_selection(message, user_id)
+        await show_date_selection(message, user_id, duration_minutes)
         return AppointmentState.SELECT_DATE
 
     keyboard = []
@@ -270,6 +371,7 @@ async def show_time_selection(message, user_id, date_str):
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await message.reply_text("🕒 Выберите время:", reply_markup=reply_markup)
+    return AppointmentState.SELECT_TIME
 
 
 async def select_time(update, context):
@@ -280,8 +382,20 @@ async def select_time(update, context):
     user_id = query.from_user.id
     time_slot = query.data.replace("select_time_", "")
 
-    user_data_store[user_id]['appointment_time'] = time_slot
-    user_data_store[user_id]['step'] = AppointmentState.CAR_BRAND
+    data = await state_store.get(user_id)
+    if data is None:
+        return await booking_expired(query.message)
+    date_str = data['appointment_date']
+    duration_minutes = data['service'].get('duration_minutes')
+
+    # Держим слоты услуги за пользователем, пока он заполняет данные
+    if not await async_db.hold_slot(user_id, date_str, time_slot, duration_minutes):
+        await query.edit_message_text(f"❌ Время {time_slot} уже занято.")
+        return await show_time_selection(query.message, user_id, date_str, duration_minutes)
+
+    if not await update_booking(user_id, AppointmentState.CAR_BRAND, appointment_time=time_slot):
+        await async_db.release_hold(user_id)
+        return await booking_expired(query.message)
 
     await query.edit_message_text(f"🕒 Выбрано время: {time_slot}")
     await query.message.reply_text("🚗 Введите марку вашего автомобиля:\n(Например: Toyota, BMW, Lada)")
@@ -294,8 +408,8 @@ async def get_car_brand(update, context):
     user_id = update.message.from_user.id
     car_brand = update.message.text
 
-    user_data_store[user_id]['car_brand'] = car_brand
-    user_data_store[user_id]['step'] = AppointmentState.CAR_MODEL
+    if not await update_booking(user_id, AppointmentState.CAR_MODEL, car_brand=car_brand):
+        return await booking_expired(update.message)
 
     await update.message.reply_text("📝 Введите модель автомобиля:\n(Например: Camry, X5, Vesta)")
 
@@ -307,8 +421,8 @@ async def get_car_model(update, context):
     user_id = update.message.from_user.id
     car_model = update.message.text
 
-    user_data_store[user_id]['car_model'] = car_model
-    user_data_store[user_id]['step'] = AppointmentState.CAR_YEAR
+    if not await update_booking(user_id, AppointmentState.CAR_YEAR, car_model=car_model):
+        return await booking_expired(update.message)
 
     await update.message.reply_text("📅 Введите год выпуска автомобиля:\n(Например: 2018)")
 
@@ -325,8 +439,8 @@ async def get_car_year(update, context):
         await update.message.reply_text("❌ Пожалуйста, введите корректный год (4 цифры, например: 2018)")
         return AppointmentState.CAR_YEAR
 
-    user_data_store[user_id]['car_year'] = int(car_year)
-    user_data_store[user_id]['step'] = AppointmentState.PHONE
+    if not await update_booking(user_id, AppointmentState.PHONE, car_year=int(car_year)):
+        return await booking_expired(update.message)
 
     await update.message.reply_text(
         "📱 Введите ваш номер телефона для связи:\n"
@@ -347,8 +461,8 @@ async def get_phone(update, context):
         await update.message.reply_text("❌ Пожалуйста, введите корректный номер телефона")
         return AppointmentState.PHONE
 
-    user_data_store[user_id]['phone'] = phone_clean
-    user_data_store[user_id]['step'] = AppointmentState.COMMENT
+    if not await update_booking(user_id, AppointmentState.COMMENT, phone=phone_clean):
+        return await booking_expired(update.message)
 
     await update.message.reply_text(
         "💬 Если есть дополнительные пожелания или комментарии, введите их:\n"
@@ -366,11 +480,11 @@ async def get_comment(update, context):
     if comment == '-':
         comment = ""
 
-    user_data_store[user_id]['comment'] = comment
-    user_data_store[user_id]['step'] = AppointmentState.CONFIRM
+    data = await update_booking(user_id, AppointmentState.CONFIRM, comment=comment)
+    if data is None:
+        return await booking_expired(update.message)
 
     # Формируем сводку для подтверждения
-    data = user_data_store[user_id]
     summary = f"""
 📋 **Проверьте данные записи:**
 
@@ -400,14 +514,14 @@ async def confirm_appointment(update, context):
     await query.answer()
 
     user_id = query.from_user.id
-    data = user_data_store.get(user_id)
+    data = await state_store.get(user_id)
 
     if not data:
         await query.edit_message_text("❌ Произошла ошибка. Начните запись заново.")
         return ConversationHandler.END
 
     # Сохраняем запись в БД
-    appointment_id = db.create_appointment(
+    appointment_id = await async_db.create_appointment(
         user_id=user_id,
         service_id=data['service']['id'],
         service_name=data['service']['name'],
@@ -417,18 +531,17 @@ async def confirm_appointment(update, context):
         car_model=data['car_model'],
         car_year=data['car_year'],
         phone=data['phone'],
-        comment=data.get('comment', '')
+        comment=data.get('comment', ''),
+        username=data['user_info']['username'],
+        first_name=data['user_info']['first_name'],
+        duration_minutes=data['service'].get('duration_minutes')
     )
 
     if appointment_id:
-        # Обновляем информацию об авто пользователя
-        db.update_user_car_info(
-            user_id, data['car_brand'], data['car_model'], data['car_year'], data['phone']
-        )
-
+        # Уведомление администраторам уже в outbox - отправляем, не дожидаясь опроса
+        notifications.wake()
         # Очищаем временные данные
-        if user_id in user_data_store:
-            del user_data_store[user_id]
+        await state_store.delete(user_id)
 
         success_text = f"""
 ✅ **Запись успешно создана!**
@@ -444,7 +557,12 @@ async def confirm_appointment(update, context):
 
         await query.edit_message_text(success_text, parse_mode='Markdown')
     else:
-        await query.edit_message_text("❌ Произошла ошибка при создании записи. Попробуйте позже.")
+        await async_db.release_hold(user_id)
+        await state_store.delete(user_id)
+        await query.edit_message_text(
+            "❌ Не удалось создать запись: выбранное время уже занято или произошла ошибка.\n"
+            "Пожалуйста, начните запись заново."
+        )
 
     return ConversationHandler.END
 
@@ -455,8 +573,8 @@ async def cancel_appointment(update, context):
     await query.answer()
 
     user_id = query.from_user.id
-    if user_id in user_data_store:
-        del user_data_store[user_id]
+    await state_store.delete(user_id)
+    await async_db.release_hold(user_id)
 
     await query.edit_message_text("❌ Запись отменена.")
     return ConversationHandler.END
@@ -465,8 +583,8 @@ async def cancel_appointment(update, context):
 async def cancel_conversation(update, context):
     """Отменяет диалог по команде /cancel"""
     user_id = update.message.from_user.id
-    if user_id in user_data_store:
-        del user_data_store[user_id]
+    await state_store.delete(user_id)
+    await async_db.release_hold(user_id)
 
     await update.message.reply_text(
         "Диалог прерван.",
@@ -481,7 +599,10 @@ def create_appointment_handler():
         entry_points=[MessageHandler(filters.Regex("^✅ Записаться на услугу$"), start_appointment)],
         states={
             AppointmentState.SELECT_SERVICE: [CallbackQueryHandler(select_service, pattern="^select_service_")],
-            AppointmentState.SELECT_DATE: [CallbackQueryHandler(select_date, pattern="^select_date_")],
+            AppointmentState.SELECT_DATE: [
+                CallbackQueryHandler(select_date, pattern="^select_date_"),
+                CallbackQueryHandler(calendar_page, pattern="^calendar_")
+            ],
             AppointmentState.SELECT_TIME: [CallbackQueryHandler(select_time, pattern="^select_time_")],
             AppointmentState.CAR_BRAND: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_car_brand)],
             AppointmentState.CAR_MODEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_car_model)],
@@ -496,15 +617,17 @@ def create_appointment_handler():
         fallbacks=[CommandHandler("cancel", cancel_conversation)],
         map_to_parent={
             ConversationHandler.END: ConversationHandler.END
-        }
+        },
+        name="appointment",
+        persistent=True
     )
 
 
 def test_database_connection():
     """Тестирует подключение к базе данных"""
     try:
-        # Просто обращаемся к базе - это вызовет инициализацию
-        services = db.get_services()
+        # Загружаем справочник услуг - заодно проверяем базу
+        services = service_catalog.load()
         logging.info(f"✅ Database test successful. Found {len(services)} services.")
         return True
     except Exception as e:
@@ -519,14 +642,25 @@ async def button_handler(update, context):
 
     # Игнорируем кнопки системы записи
     if query.data.startswith(
-            ('select_service_', 'select_date_', 'select_time_', 'confirm_appointment', 'cancel_appointment')):
+            ('select_service_', 'select_date_', 'select_time_', 'calendar_', 'confirm_appointment',
+             'cancel_appointment')):
+        return
+
+    # Листание списка "Мои записи"
+    if query.data.startswith('my_appointments'):
+        await show_my_appointments(update, context)
         return
 
     # Обработка админ-кнопок
     if query.data.startswith('admin_'):
-        if query.data == 'admin_today':
+        # Списки с постраничной навигацией: admin_today_manage проверяем раньше admin_today
+        if query.data.startswith('admin_bulk_'):
+            await admin_bulk(update, context)
+        elif query.data.startswith('admin_today_manage'):
+            await admin_today_manage(update, context)
+        elif query.data.startswith('admin_today'):
             await admin_today(update, context)
-        elif query.data == 'admin_all':
+        elif query.data.startswith('admin_all'):
             await admin_all(update, context)
         elif query.data == 'admin_stats':
             await admin_stats(update, context)
@@ -538,8 +672,6 @@ async def button_handler(update, context):
             await admin_manage(update, context)
         elif query.data == 'admin_manage_id':
             await admin_manage_id(update, context)
-        elif query.data == 'admin_today_manage':
-            await admin_today_manage(update, context)
         return
 
     # Обработка кнопок управления
@@ -563,11 +695,59 @@ async def get_id(update, context):
 
 # ==================== АДМИН-ПАНЕЛЬ ====================
 
-from config import ADMIN_IDS
+from config import ADMIN_IDS, ADMIN_PAGE_SIZE, USER_PAGE_SIZE, SLOW_QUERY_MS
 
 
 def is_admin(user_id):
     return user_id in ADMIN_IDS
+
+
+def parse_page_callback(data, prefix):
+    """Разбирает callback навигации по страницам.
+
+    '<prefix>_n_<курсор>' - следующая страница, '<prefix>_p_<курсор>' - предыдущая.
+    Возвращает (after, before): части курсора (id - последняя) или None.
+    """
+    rest = data[len(prefix):]
+    if rest[:3] not in ('_n_', '_p_'):
+        return None, None
+
+    *key, appointment_id = rest[3:].split('_')
+    cursor = (*key, int(appointment_id))
+    return (cursor, None) if rest[:3] == '_n_' else (None, cursor)
+
+
+def split_page(rows, after, before, page_size=ADMIN_PAGE_SIZE):
+    """Оставляет страницу из выборки в page_size + 1 строк.
+
+    Лишняя строка лишь показывает, что в этом направлении есть еще записи.
+    Возвращает (строки, есть_предыдущая, есть_следующая).
+    """
+    has_more = len(rows) > page_size
+    if before is not None:
+        return rows[-page_size:], has_more, True
+    return rows[:page_size], after is not None, has_more
+
+
+def page_buttons(prefix, rows, has_prev, has_next, cursor_of):
+    """Кнопки перехода между страницами (cursor_of строит курсор строки)"""
+    row = []
+    if has_prev:
+        row.append(InlineKeyboardButton("◀️ Пред.", callback_data=f"{prefix}_p_{cursor_of(rows[0])}"))
+    if has_next:
+        row.append(InlineKeyboardButton("След. ▶️", callback_data=f"{prefix}_n_{cursor_of(rows[-1])}"))
+    return [row] if row else []
+
+
+def day_cursor(appt):
+    """Курсор записи в списке за день: время и id"""
+    return f"{appt['appointment_time']}_{appt['id']}"
+
+
+def list_cursor(appt):
+    """Курсор записи в общем списке: дата, время и id"""
+    return f"{appt['appointment_date']}_{appt['appointment_time']}_{appt['id']}"
+
 async def safe_send_message(chat_id, text, context, reply_markup=None, parse_mode='Markdown'):
     """Безопасная отправка сообщений с обработкой ошибок форматирования"""
     try:
@@ -605,9 +785,7 @@ async def admin_panel(update, context):
         return
 
     # Статистика
-    today = datetime.now().strftime("%d.%m.%Y")
-    today_appointments = db.get_appointments_by_date(today)
-    today_count = len(today_appointments)
+    today_count = await async_db.count_appointments_by_date()
 
     keyboard = [
         [InlineKeyboardButton("📅 Записи на сегодня", callback_data="admin_today")],
@@ -637,10 +815,15 @@ async def admin_today(update, context):
         return
 
     today = datetime.now().strftime("%d.%m.%Y")
-    appointments = db.get_appointments_by_date(today)
+    after, before = parse_page_callback(query.data, 'admin_today')
+    appointments = await async_db.get_appointments_by_date(
+        today, limit=ADMIN_PAGE_SIZE + 1, after=after, before=before
+    )
+    appointments, has_prev, has_next = split_page(appointments, after, before)
 
     if not appointments:
         text = "📅 На сегодня записей нет."
+        keyboard = []
     else:
         text = f"📅 **Записи на сегодня ({today})**\n\n"
 
@@ -652,7 +835,9 @@ async def admin_today(update, context):
             text += f"   📞 {appt['phone']}\n"
             text += f"   📝 ID: #{appt['id']}\n\n"
 
-    keyboard = [
+        keyboard = page_buttons('admin_today', appointments, has_prev, has_next, day_cursor)
+
+    keyboard += [
         [InlineKeyboardButton("🔄 Обновить", callback_data="admin_today")],
         [InlineKeyboardButton("⬅️ Назад", callback_data="admin_back")]
     ]
@@ -669,8 +854,11 @@ async def admin_all(update, context):
         await query.edit_message_text("❌ У вас нет доступа.")
         return
 
-    appointments = db.get_all_appointments(days=7)
-    active_appointments = [a for a in appointments if a['status'] != 'cancelled']
+    after, before = parse_page_callback(query.data, 'admin_all')
+    active_appointments = await async_db.get_all_appointments(
+        days=7, limit=ADMIN_PAGE_SIZE + 1, after=after, before=before, active_only=True
+    )
+    active_appointments, has_prev, has_next = split_page(active_appointments, after, before)
 
     if not active_appointments:
         text = "📋 Активных записей нет."
@@ -703,7 +891,8 @@ async def admin_all(update, context):
 
             text += "\n"
 
-        keyboard = [
+        keyboard = page_buttons('admin_all', active_appointments, has_prev, has_next, list_cursor)
+        keyboard += [
             [
                 InlineKeyboardButton("🔄 Обновить", callback_data="admin_all"),
                 InlineKeyboardButton("📋 Управление", callback_data="admin_manage")
@@ -770,7 +959,11 @@ async def admin_today_manage(update, context):
         return
 
     today = datetime.now().strftime("%d.%m.%Y")
-    appointments = db.get_appointments_by_date(today)
+    after, before = parse_page_callback(query.data, 'admin_today_manage')
+    appointments = await async_db.get_appointments_by_date(
+        today, limit=ADMIN_PAGE_SIZE + 1, after=after, before=before
+    )
+    appointments, has_prev, has_next = split_page(appointments, after, before)
 
     if not appointments:
         text = "📅 На сегодня записей нет."
@@ -799,12 +992,124 @@ async def admin_today_manage(update, context):
                 InlineKeyboardButton(btn_text, callback_data=f"manage_{appt['id']}")
             ])
 
-        keyboard.append([InlineKeyboardButton("⬅️ Назад", callback_data="admin_manage")])
+        keyboard += page_buttons('admin_today_manage', appointments, has_prev, has_next, day_cursor)
+        keyboard += [
+            [
+                InlineKeyboardButton("✅ Подтвердить все", callback_data="admin_bulk_confirm_all"),
+                InlineKeyboardButton("❌ Отменить все", callback_data="admin_bulk_cancel_all")
+            ],
+            [InlineKeyboardButton("☑️ Выбрать несколько", callback_data="admin_bulk_select")],
+            [InlineKeyboardButton("⬅️ Назад", callback_data="admin_manage")]
+        ]
 
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 
+# Массовые действия: callback -> (новый статус, текст результата)
+BULK_ACTIONS = {
+    'confirm': ('confirmed', "✅ Подтверждено записей"),
+    'cancel': ('cancelled', "❌ Отменено записей"),
+}
+
+
+async def today_pending_appointments():
+    """Возвращает ожидающие подтверждения записи на сегодня"""
+    today = datetime.now().strftime("%d.%m.%Y")
+    appointments = await async_db.get_appointments_by_date(today)
+    return [appt for appt in appointments if appt['status'] == 'pending']
+
+
+async def admin_bulk(update, context):
+    """Массовое подтверждение/отмена записей на сегодня.
+
+    admin_bulk_<confirm|cancel>_all - все ожидающие, admin_bulk_<confirm|cancel>_sel -
+    выбранные в admin_bulk_select. Отмена всех требует подтверждения.
+    """
+    query = update.callback_query
+    await query.answer()
+
+    if not is_admin(query.from_user.id):
+        await query.edit_message_text("❌ У вас нет доступа.")
+        return
+
+    command = query.data[len('admin_bulk_'):]
+
+    if command == 'select':
+        context.user_data['bulk_selected'] = set()
+        await admin_bulk_select(query, context)
+        return
+
+    if command.startswith('toggle_'):
+        appointment_id = int(command.split('_')[-1])
+        selected = context.user_data.setdefault('bulk_selected', set())
+        selected ^= {appointment_id}
+        await admin_bulk_select(query, context)
+        return
+
+    if command == 'cancel_all':
+        keyboard = [
+            [InlineKeyboardButton("❌ Да, отменить все", callback_data="admin_bulk_cancel_all_yes")],
+            [InlineKeyboardButton("⬅️ Назад", callback_data="admin_today_manage")]
+        ]
+        await query.edit_message_text(
+            "⚠️ Отменить все ожидающие подтверждения записи на сегодня?",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return
+
+    action, target = command.split('_', 1)
+    status, result_text = BULK_ACTIONS[action]
+
+    if target == 'sel':
+        appointment_ids = sorted(context.user_data.pop('bulk_selected', set()))
+    else:
+        appointment_ids = [appt['id'] for appt in await today_pending_appointments()]
+
+    changed = await async_db.update_appointments_status(appointment_ids, status, actor_id=query.from_user.id)
+
+    text = f"{result_text}: {len(changed)}\n\n"
+    for appt in changed:
+        text += f"#{appt['id']} {appt['appointment_time']} - {appt['service_name']}\n"
+    if len(changed) < len(appointment_ids):
+        text += "\nЧасть записей пропущена: их статус уже изменен."
+
+    keyboard = [[InlineKeyboardButton("⬅️ Назад к записям", callback_data="admin_today_manage")]]
+    await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+
+async def admin_bulk_select(query, context):
+    """Выбор ожидающих записей на сегодня для массового действия"""
+    selected = context.user_data.get('bulk_selected', set())
+    appointments = await today_pending_appointments()
+
+    if not appointments:
+        keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data="admin_today_manage")]]
+        await query.edit_message_text(
+            "📅 На сегодня нет записей, ожидающих подтверждения.",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return
+
+    keyboard = []
+    for appt in appointments:
+        mark = "☑️" if appt['id'] in selected else "⬜"
+        btn_text = f"{mark} #{appt['id']} {appt['appointment_time']} - {appt['first_name']}"
+        keyboard.append([InlineKeyboardButton(btn_text, callback_data=f"admin_bulk_toggle_{appt['id']}")])
+
+    keyboard += [
+        [
+            InlineKeyboardButton(f"✅ Подтвердить ({len(selected)})", callback_data="admin_bulk_confirm_sel"),
+            InlineKeyboardButton(f"❌ Отменить ({len(selected)})", callback_data="admin_bulk_cancel_sel")
+        ],
+        [InlineKeyboardButton("⬅️ Назад", callback_data="admin_today_manage")]
+    ]
+    await query.edit_message_text(
+        "☑️ Выберите записи на сегодня, ожидающие подтверждения:",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+
 async def handle_manage_search(update, context):
     """Обработчик поиска записи для управления"""
     user_id = update.message.from_user.id
@@ -829,7 +1134,7 @@ async def handle_manage_search(update, context):
 
 async def show_appointment_management(message, appointment_id, admin_id):
     """Показывает управление конкретной записью"""
-    appointment = db.get_appointment(appointment_id)
+    appointment = await async_db.get_appointment(appointment_id)
 
     if not appointment:
         await message.reply_text("❌ Запись с таким ID не найдена.")
@@ -899,10 +1204,10 @@ async def handle_management_action(update, context):
     appointment_id = int(data.split('_')[-1])
 
     if data.startswith('confirm_'):
-        success = db.update_appointment_status(appointment_id, 'confirmed')
+        success = await async_db.update_appointment_status(appointment_id, 'confirmed', query.from_user.id)
         action_text = "✅ Запись подтверждена!"
     elif data.startswith('cancel_'):
-        success = db.update_appointment_status(appointment_id, 'cancelled')
+        success = await async_db.update_appointment_status(appointment_id, 'cancelled', query.from_user.id)
         action_text = "❌ Запись отменена!"
     elif data.startswith('manage_'):
         # Просто показываем управление записью
@@ -915,7 +1220,7 @@ async def handle_management_action(update, context):
         await query.answer(action_text)
 
         # Обновляем сообщение
-        appointment = db.get_appointment(appointment_id)
+        appointment = await async_db.get_appointment(appointment_id)
         if appointment:
             status_text = {
                 'pending': '⏳ Ожидает подтверждения',
@@ -957,17 +1262,10 @@ async def admin_stats(update, context):
         await query.edit_message_text("❌ У вас нет доступа.")
         return
 
-    # Получаем все записи за 30 дней для статистики
-    appointments = db.get_all_appointments(days=30)
-
-    # Считаем статистику вручную
-    service_stats = {}
-    status_stats = {'pending': 0, 'confirmed': 0, 'cancelled': 0}
-
-    for appt in appointments:
-        service_name = appt['service_name']
-        service_stats[service_name] = service_stats.get(service_name, 0) + 1
-        status_stats[appt['status']] = status_stats.get(appt['status'], 0) + 1
+    # Статистика за 30 дней из счетчиков
+    stats = await async_db.get_appointment_stats(days=30)
+    service_stats = stats['by_service']
+    status_stats = stats['by_status']
 
     text = "📊 **Статистика (30 дней)**\n\n"
 
@@ -980,13 +1278,44 @@ async def admin_stats(update, context):
     text += f"• ✅ Подтверждены: {status_stats['confirmed']}\n"
     text += f"• ❌ Отменены: {status_stats['cancelled']}\n"
 
-    text += f"\n📅 **Всего записей:** {len(appointments)}"
+    text += f"\n📅 **Всего записей:** {stats['total']}"
+
+    if pending_sweeper.stats['expired']:
+        text += (
+            f"\n\n⌛ **Автоотмена неподтвержденных** (с запуска бота): {pending_sweeper.stats['expired']}, "
+            f"освобождено {pending_sweeper.reclaimed_hours:g} ч работы постов"
+        )
 
     keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data="admin_back")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
     await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
 
 
+async def admin_slow_queries(update, context):
+    """Команда /slow: статистика медленных запросов к БД (/slow reset - сбросить)"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет доступа.")
+        return
+
+    if context.args and context.args[0] == 'reset':
+        await async_db.reset_slow_query_stats()
+        await update.message.reply_text("🐢 Статистика медленных запросов сброшена.")
+        return
+
+    stats = await async_db.get_slow_query_stats()
+    if not stats:
+        await update.message.reply_text(f"🐢 Медленных запросов (дольше {SLOW_QUERY_MS} мс) не было.")
+        return
+
+    text = f"🐢 Медленные запросы (дольше {SLOW_QUERY_MS} мс), всего {len(stats)}:\n\n"
+    for query, count, total, longest in stats[:10]:
+        text += f"{count} раз, всего {total * 1000:.0f} мс, макс. {longest * 1000:.0f} мс\n"
+        text += f"{query[:300]}\n\n"
+
+    # Текст запросов может содержать символы разметки - отправляем как есть
+    await update.message.reply_text(text)
+
+
 async def admin_back(update, context):
     """Возврат в главное меню админки"""
     query = update.callback_query
@@ -997,9 +1326,7 @@ async def admin_back(update, context):
         return
 
     # Показываем админ-панель
-    today = datetime.now().strftime("%d.%m.%Y")
-    today_appointments = db.get_appointments_by_date(today)
-    today_count = len(today_appointments)
+    today_count = await async_db.count_appointments_by_date()
 
     keyboard = [
         [InlineKeyboardButton("📅 Записи на сегодня", callback_data="admin_today")],
@@ -1028,6 +1355,37 @@ async def admin_close(update, context):
 
 # ==================== ЗАПУСК БОТА ====================
 
+async def on_startup(application):
+    """Запускает фоновые задачи после инициализации приложения"""
+    user_writes.start()
+    notifications.start(application.bot)
+    reminders.start(application.bot)
+    pending_sweeper.start()
+
+
+async def on_shutdown(application):
+    """Сохраняет отложенные записи перед остановкой"""
+    await pending_sweeper.stop()
+    await reminders.stop()
+    await notifications.stop()
+    await user_writes.stop()
+
+
+def build_application():
+    """Создает приложение с общими настройками (polling и вебхук)"""
+    builder = (
+        Application.builder().token(BOT_TOKEN)
+        .concurrent_updates(create_update_processor())
+        .rate_limiter(create_rate_limiter())
+        .persistence(persistence)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    if TELEGRAM_BASE_URL:
+        builder = builder.base_url(TELEGRAM_BASE_URL)
+    return builder.build()
+
+
 def main():
     """Основная функция запуска бота"""
     try:
@@ -1038,7 +1396,7 @@ def main():
             return
 
         # Создаем приложение
-        application = Application.builder().token(BOT_TOKEN).build()
+        application = build_application()
 
         # ... остальной код без изменений ...
 
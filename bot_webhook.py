@@ -1,8 +1,13 @@
 import os
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
-from config import BOT_TOKEN
+from telegram.ext import CommandHandler, MessageHandler, filters, CallbackQueryHandler, ConversationHandler
+from config import (
+    BOT_TOKEN, WEBHOOK_MAX_CONNECTIONS, WEBHOOK_SECRET_TOKEN,
+    METRICS_PORT, METRICS_FILE, METRICS_DUMP_INTERVAL
+)
 from database import db
+from metrics import instrument_application, instrument_database, start_metrics_server, start_metrics_dump
+from service_catalog import service_catalog
 
 # Настройка логирования
 logging.basicConfig(
@@ -14,23 +19,31 @@ logging.basicConfig(
 from bot import (
     start, get_id, admin_panel, handle_message, button_handler,
     handle_manage_search, create_appointment_handler,
-    main_menu_keyboard
+    main_menu_keyboard, build_application, admin_slow_queries
 )
 
 
 def create_application():
     """Создает и настраивает приложение"""
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = build_application()
+
+    # Справочник услуг загружаем сразу, чтобы первые записи не ходили в БД
+    service_catalog.load()
 
     # Добавляем обработчики (такой же порядок как в bot.py)
     application.add_handler(create_appointment_handler())
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("id", get_id))
     application.add_handler(CommandHandler("admin", admin_panel))
+    application.add_handler(CommandHandler("slow", admin_slow_queries))
     application.add_handler(CallbackQueryHandler(button_handler))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_manage_search))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
 
+    # Метрики по каждому обработчику и методу БД
+    instrument_application(application)
+    instrument_database(db)
+
     return application
 
 
@@ -47,16 +60,21 @@ def main():
             webhook_url = f"{railway_url}/webhook"
 
             print(f"Setting webhook to: {webhook_url}")
+            if METRICS_PORT:
+                start_metrics_server(METRICS_PORT)
             application.run_webhook(
                 listen="0.0.0.0",
                 port=port,
                 url_path=BOT_TOKEN,
                 webhook_url=f"{webhook_url}/{BOT_TOKEN}",
-                allowed_updates=['message', 'callback_query']
+                allowed_updates=['message', 'callback_query'],
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                secret_token=WEBHOOK_SECRET_TOKEN
             )
         else:
             # Локальная разработка - используем polling
             print("Using polling (local development)")
+            start_metrics_dump(METRICS_FILE, METRICS_DUMP_INTERVAL)
             application.bot.delete_webhook(drop_pending_updates=True)
             application.run_polling(
                 allowed_updates=['message', 'callback_query'],
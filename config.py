@@ -5,8 +5,105 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 ADMIN_IDS = [5874381142]  # Замените на ваш ID телеграм
+ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 10))  # записей на странице в админке
+USER_PAGE_SIZE = int(os.getenv('USER_PAGE_SIZE', 5))  # записей на странице в "Мои записи"
 PORT = int(os.getenv('PORT', 8000))
 
+# Обработка обновлений: сколько обновлений разных чатов обрабатывать одновременно
+# (1 - строго по очереди). Обновления одного чата всегда идут по порядку
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', 32))
+
+# Вебхук: максимум одновременных соединений от Telegram и секрет для проверки запросов
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', 40))
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+
+# Метрики: порт HTTP-сервера /metrics в режиме вебхука (0 - выключен),
+# файл и период записи в режиме polling
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+METRICS_FILE = os.getenv('METRICS_FILE', 'metrics.prom')
+METRICS_DUMP_INTERVAL = int(os.getenv('METRICS_DUMP_INTERVAL', 60))  # секунды
+
+# Адрес Bot API (для нагрузочного теста с локальным фейковым сервером)
+TELEGRAM_BASE_URL = os.getenv('TELEGRAM_BASE_URL')
+
+# Пул соединений с БД
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 5))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # секунды
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # секунды ожидания свободного соединения
+
+# Применять миграции схемы при запуске (иначе: python migrate.py up)
+DB_AUTO_MIGRATE = os.getenv('DB_AUTO_MIGRATE', '1') != '0'
+
+# Журнал медленных запросов: порог в мс и запись плана (EXPLAIN) для каждого такого запроса
+SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))
+SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', '0') == '1'
+
+# Сколько минут слот держится за пользователем, пока он оформляет запись
+SLOT_HOLD_MINUTES = int(os.getenv('SLOT_HOLD_MINUTES', 15))
+
+# Рабочее время: начало и конец дня, длина слота, перерывы ('13:00-14:00,...'),
+# рабочие дни недели (0 - понедельник) и число постов/подъемников
+WORK_DAY_START = os.getenv('WORK_DAY_START', '09:00')
+WORK_DAY_END = os.getenv('WORK_DAY_END', '18:00')
+SLOT_MINUTES = int(os.getenv('SLOT_MINUTES', 60))
+WORK_BREAKS = [tuple(item.split('-')) for item in os.getenv('WORK_BREAKS', '13:00-14:00').split(',') if item]
+WORK_DAYS = [int(day) for day in os.getenv('WORK_DAYS', '0,1,2,3,4').split(',')]
+SERVICE_BAYS = int(os.getenv('SERVICE_BAYS', 1))
+SLOT_CACHE_TTL = int(os.getenv('SLOT_CACHE_TTL', 300))  # секунды до перечитывания дня из БД
+BOOKING_DAYS_AHEAD = int(os.getenv('BOOKING_DAYS_AHEAD', 60))  # на сколько дней вперед можно записаться
+
+# Ограничение исходящих запросов к Bot API: запросов в секунду на бота,
+# на личный чат (и допустимый всплеск), в минуту на группу; повторы после 429
+# и случайная добавка к паузе retry_after (секунды)
+RATE_LIMIT_GLOBAL = float(os.getenv('RATE_LIMIT_GLOBAL', 30))
+RATE_LIMIT_PER_CHAT = float(os.getenv('RATE_LIMIT_PER_CHAT', 1))
+RATE_LIMIT_CHAT_BURST = int(os.getenv('RATE_LIMIT_CHAT_BURST', 3))
+RATE_LIMIT_GROUP_PER_MINUTE = float(os.getenv('RATE_LIMIT_GROUP_PER_MINUTE', 20))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', 3))
+RATE_LIMIT_JITTER = float(os.getenv('RATE_LIMIT_JITTER', 0.5))
+
+# Уведомления администраторам (outbox): период опроса очереди, размер пачки,
+# число попыток отправки, пауза перед первым повтором (удваивается) и срок
+# хранения отправленных уведомлений
+NOTIFY_INTERVAL = float(os.getenv('NOTIFY_INTERVAL', 5))  # секунды
+NOTIFY_BATCH_SIZE = int(os.getenv('NOTIFY_BATCH_SIZE', 100))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', 5))
+NOTIFY_RETRY_SECONDS = int(os.getenv('NOTIFY_RETRY_SECONDS', 30))
+NOTIFY_KEEP_DAYS = int(os.getenv('NOTIFY_KEEP_DAYS', 7))
+
+# Напоминания клиентам: за сколько минут до записи (через запятую), период
+# опроса очереди, размер пачки, насколько напоминание может опоздать (иначе
+# пропускается), через сколько секунд незавершенная отправка возвращается в
+# очередь и число попыток отправки
+REMINDER_OFFSETS = [int(minutes) for minutes in os.getenv('REMINDER_OFFSETS', '1440,120').split(',') if minutes]
+REMINDER_INTERVAL = float(os.getenv('REMINDER_INTERVAL', 30))  # секунды
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 100))
+REMINDER_MAX_LATE_MINUTES = int(os.getenv('REMINDER_MAX_LATE_MINUTES', 60))
+REMINDER_CLAIM_TIMEOUT = int(os.getenv('REMINDER_CLAIM_TIMEOUT', 300))
+REMINDER_MAX_ATTEMPTS = int(os.getenv('REMINDER_MAX_ATTEMPTS', 3))
+
+# Автоотмена неподтвержденных записей: запись, не подтвержденная за
+# PENDING_EXPIRE_HOURS часов до начала, отменяется, а ее слоты освобождаются.
+# Период проверки (секунды) и размер пачки. Срок не должен совпадать с
+# REMINDER_OFFSETS: напоминания о неподтвержденных записях внутри этого срока
+# все равно пропускаются (ReminderWorker._outdated)
+PENDING_EXPIRE_HOURS = float(os.getenv('PENDING_EXPIRE_HOURS', 3))
+PENDING_SWEEP_INTERVAL = float(os.getenv('PENDING_SWEEP_INTERVAL', 300))
+PENDING_SWEEP_BATCH_SIZE = int(os.getenv('PENDING_SWEEP_BATCH_SIZE', 200))
+
+# Отложенная запись профилей пользователей: период сброса и размер пачки
+USER_FLUSH_INTERVAL = float(os.getenv('USER_FLUSH_INTERVAL', 5))  # секунды
+USER_FLUSH_BATCH_SIZE = int(os.getenv('USER_FLUSH_BATCH_SIZE', 500))
+
+# Хранилище данных незавершенной записи: memory, db или redis
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+STATE_TTL = int(os.getenv('STATE_TTL', 3600))  # секунды с последнего шага
+STATE_MAX_ENTRIES = int(os.getenv('STATE_MAX_ENTRIES', 10000))  # только для memory
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')  # для redis нужен пакет redis
+# Как часто шаги диалога записи сохраняются в хранилище (и при остановке бота)
+STATE_PERSIST_INTERVAL = float(os.getenv('STATE_PERSIST_INTERVAL', 2))  # секунды
+
 # Чтобы узнать свой ID:
 # 1. Напишите @userinfobot в Telegram
 # 2. Или добавьте эту команду в бота:
@@ -1,455 +1,760 @@
 import os
+import json
+import asyncio
+import functools
 import logging
-from datetime import datetime, timedelta
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 import psycopg2
-from urllib.parse import urlparse
+
+from config import (
+    ADMIN_IDS, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_AUTO_MIGRATE,
+    SLOT_HOLD_MINUTES, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN,
+    WORK_DAY_START, WORK_DAY_END, SLOT_MINUTES, WORK_BREAKS, WORK_DAYS, SERVICE_BAYS, SLOT_CACHE_TTL,
+    REMINDER_OFFSETS, REMINDER_CLAIM_TIMEOUT
+)
+from db_dialect import PostgresDialect, SqliteDialect
+from db_pool import ConnectionPool
+from db_slowlog import SlowQueryLog
+from migrate import apply_migrations
+from models import Appointment, Reminder, Service
+from slot_engine import SlotEngine, SlotGrid
+
+
+# ==================== ЗАПРОСЫ ====================
+# Каждый запрос описан один раз с плейсхолдерами '?',
+# под конкретный бэкенд его приводит Dialect.sql()
+
+SQL_UPSERT_USER = '''
+    INSERT INTO users (user_id, username, first_name)
+    VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+    username = excluded.username,
+    first_name = excluded.first_name
+'''
+
+# Профиль с данными авто сохраняется вместе с записью на услугу.
+# Имя не затираем, если оно не передано
+SQL_UPSERT_USER_PROFILE = '''
+    INSERT INTO users (user_id, username, first_name, car_brand, car_model, car_year, phone)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+    username = COALESCE(excluded.username, users.username),
+    first_name = COALESCE(excluded.first_name, users.first_name),
+    car_brand = excluded.car_brand,
+    car_model = excluded.car_model,
+    car_year = excluded.car_year,
+    phone = excluded.phone
+'''
+
+# Колонки перечислены в порядке полей записей из models.py
+SQL_GET_SERVICES = 'SELECT id, name, description, price_range, duration_minutes FROM services'
+
+SQL_INSERT_APPOINTMENT = '''
+    INSERT INTO appointments
+    (user_id, service_id, service_name, appointment_date, appointment_time,
+     car_brand, car_model, car_year, phone, comment)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    RETURNING id
+'''
+
+SQL_COUNT_USER_APPOINTMENTS = "SELECT COUNT(*) FROM appointments WHERE user_id = ?"
+
+# Порядок колонок совпадает с полями models.Appointment
+SQL_APPOINTMENT_FIELDS = '''
+    id, user_id, service_id, service_name, appointment_date, appointment_time,
+    car_brand, car_model, car_year, phone, comment, status, created_at
+'''
+SQL_APPOINTMENT_COLUMNS = ', '.join(f"a.{field.strip()}" for field in SQL_APPOINTMENT_FIELDS.split(','))
+
+# Списки записей поддерживают keyset-пагинацию: {filters} - дополнительные
+# условия (в т.ч. курсор), {order} - направление сортировки.
+# Текст для каждой комбинации собирается один раз в paged_query()
+SQL_GET_USER_APPOINTMENTS = '''
+    SELECT ''' + SQL_APPOINTMENT_COLUMNS + '''
+    FROM appointments a
+    WHERE a.user_id = ?{filters}
+    ORDER BY a.appointment_date {order}, a.appointment_time {order}, a.id {order}
+    LIMIT ?
+'''
+
+SQL_GET_APPOINTMENTS_BY_DATE = '''
+    SELECT ''' + SQL_APPOINTMENT_COLUMNS + ''', u.first_name, u.username
+    FROM appointments a
+    LEFT JOIN users u ON a.user_id = u.user_id
+    WHERE a.appointment_date = ? AND a.status != 'cancelled'{filters}
+    ORDER BY a.appointment_time {order}, a.id {order}
+    LIMIT ?
+'''
+
+SQL_GET_ALL_APPOINTMENTS = '''
+    SELECT ''' + SQL_APPOINTMENT_COLUMNS + ''', u.first_name, u.username
+    FROM appointments a
+    LEFT JOIN users u ON a.user_id = u.user_id
+    WHERE a.appointment_date >= ?{filters}
+    ORDER BY a.appointment_date {order}, a.appointment_time {order}, a.id {order}
+    LIMIT ?
+'''
+
+SQL_GET_APPOINTMENT = '''
+    SELECT ''' + SQL_APPOINTMENT_COLUMNS + ''', u.first_name, u.username
+    FROM appointments a
+    LEFT JOIN users u ON a.user_id = u.user_id
+    WHERE a.id = ?
+'''
+
+SQL_GET_APPOINTMENT_STATUS = "SELECT appointment_date, appointment_time, service_name, status FROM appointments WHERE id = ?"
+
+# Статус меняется, только если его никто не успел изменить с момента чтения
+SQL_UPDATE_APPOINTMENT_STATUS = '''
+    UPDATE appointments
+    SET status = ?
+    WHERE id = ? AND status = ?
+'''
+
+# Массовая смена статуса: {ids} - плейсхолдеры списка id (см. bulk_status_query)
+SQL_UPDATE_APPOINTMENTS_STATUS = '''
+    UPDATE appointments
+    SET status = ?
+    WHERE id IN ({ids}) AND status = ?
+    RETURNING ''' + SQL_APPOINTMENT_FIELDS
+
+SQL_RELEASE_APPOINTMENTS_SLOTS = "DELETE FROM slot_reservations WHERE appointment_id IN ({ids}) RETURNING slot_date, slot_time, bay"
+
+# Ожидающие подтверждения записи, начало которых раньше (дата, время) -
+# по частичному индексу idx_appointments_pending
+SQL_GET_STALE_PENDING = '''
+    SELECT id FROM appointments
+    WHERE status = 'pending' AND appointment_date >= ?
+      AND (appointment_date < ? OR (appointment_date = ? AND appointment_time <= ?))
+    ORDER BY appointment_date, appointment_time, id
+    LIMIT ?
+'''
+
+SQL_BUMP_APPOINTMENT_STATS = '''
+    INSERT INTO appointment_stats (stat_date, service_name, status, total)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (stat_date, service_name, status) DO UPDATE SET
+    total = appointment_stats.total + excluded.total
+'''
+
+SQL_GET_APPOINTMENT_STATS = '''
+    SELECT service_name, status, SUM(total)
+    FROM appointment_stats
+    WHERE stat_date >= ?
+    GROUP BY service_name, status
+'''
+
+SQL_COUNT_APPOINTMENTS_BY_DATE = '''
+    SELECT COALESCE(SUM(total), 0)
+    FROM appointment_stats
+    WHERE stat_date = ? AND status != 'cancelled'
+'''
+
+# Занятость всех постов за диапазон дат - для карт занятости SlotEngine
+SQL_GET_RESERVATIONS = '''
+    SELECT slot_date, slot_time, bay, appointment_id, expires_at FROM slot_reservations
+    WHERE slot_date >= ? AND slot_date <= ? AND (appointment_id IS NOT NULL OR expires_at > ?)
+'''
+
+# Удаляющие запросы возвращают освобожденные слоты, чтобы обновить карты занятости.
+# Перед новой временной бронью снимаем прежнюю бронь пользователя и
+# просроченные брони на эту дату
+SQL_RELEASE_HOLDS = '''
+    DELETE FROM slot_reservations
+    WHERE appointment_id IS NULL
+    AND (user_id = ? OR (slot_date = ? AND expires_at <= ?))
+    RETURNING slot_date, slot_time, bay
+'''
+
+SQL_RELEASE_USER_HOLDS = '''
+    DELETE FROM slot_reservations
+    WHERE appointment_id IS NULL AND user_id = ?
+    RETURNING slot_date, slot_time, bay
+'''
+
+# Возвращает id, только если слот удалось занять
+SQL_RESERVE_SLOT = '''
+    INSERT INTO slot_reservations (slot_date, slot_time, bay, user_id, appointment_id, expires_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (slot_date, slot_time, bay) DO NOTHING
+    RETURNING id
+'''
+
+SQL_DELETE_RESERVATION = "DELETE FROM slot_reservations WHERE id = ?"
+
+SQL_CONVERT_HOLD = '''
+    UPDATE slot_reservations
+    SET appointment_id = ?, expires_at = NULL
+    WHERE user_id = ? AND slot_date = ?
+    AND appointment_id IS NULL AND expires_at > ?
+    RETURNING slot_time, bay
+'''
+
+SQL_RELEASE_APPOINTMENT_SLOTS = "DELETE FROM slot_reservations WHERE appointment_id = ? RETURNING slot_date, slot_time, bay"
+
+# Очередь уведомлений администраторам (outbox)
+SQL_ENQUEUE_NOTIFICATION = '''
+    INSERT INTO notification_outbox (chat_id, kind, appointment_id, payload, next_attempt_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+SQL_GET_DUE_NOTIFICATIONS = '''
+    SELECT id, chat_id, kind, appointment_id, payload, attempts FROM notification_outbox
+    WHERE status = 'pending' AND next_attempt_at <= ?
+    ORDER BY next_attempt_at, id
+    LIMIT ?
+'''
+
+SQL_MARK_NOTIFICATIONS_SENT = "UPDATE notification_outbox SET status = 'sent', attempts = attempts + 1 WHERE id IN ({ids})"
+
+SQL_MARK_NOTIFICATIONS_FAILED = '''
+    UPDATE notification_outbox
+    SET status = ?, attempts = attempts + 1, next_attempt_at = ?, last_error = ?
+    WHERE id IN ({ids})
+'''
+
+SQL_PURGE_NOTIFICATIONS = "DELETE FROM notification_outbox WHERE status = 'sent' AND next_attempt_at <= ?"
+
+# Напоминания клиентам о записях
+SQL_INSERT_REMINDER = '''
+    INSERT INTO appointment_reminders (appointment_id, user_id, offset_minutes, remind_at)
+    VALUES (?, ?, ?, ?)
+'''
+
+# Предстоящие записи, которым нужны напоминания (заполнение после миграции 0011)
+SQL_GET_UPCOMING_APPOINTMENTS = '''
+    SELECT id, user_id, appointment_date, appointment_time FROM appointments
+    WHERE status IN ('pending', 'confirmed') AND user_id IS NOT NULL AND appointment_date >= ?
+'''
+
+SQL_CANCEL_REMINDERS = "DELETE FROM appointment_reminders WHERE appointment_id IN ({ids}) AND status = 'pending'"
+
+# Возврат в очередь напоминаний, взятых упавшим обработчиком
+SQL_REQUEUE_STALE_REMINDERS = '''
+    UPDATE appointment_reminders SET status = 'pending', claimed_by = NULL, claimed_at = NULL
+    WHERE status = 'claimed' AND claimed_at <= ?
+'''
+
+# Атомарный захват пачки готовых напоминаний (по индексу idx_appointment_reminders_due).
+# Повторная проверка status во внешнем UPDATE и SKIP LOCKED (Postgres) не дают
+# двум обработчикам взять одно напоминание; в SQLite запись и так одна за раз
+SQL_CLAIM_REMINDERS = '''
+    UPDATE appointment_reminders SET status = 'claimed', claimed_by = ?, claimed_at = ?
+    WHERE status = 'pending' AND id IN (
+        SELECT id FROM appointment_reminders
+        WHERE status = 'pending' AND remind_at <= ?
+        ORDER BY remind_at
+        LIMIT ?{skip_locked}
+    )
+    RETURNING id
+'''
+
+SQL_GET_REMINDERS = '''
+    SELECT r.id, r.user_id, r.offset_minutes, r.remind_at, r.attempts,
+           a.id, a.service_name, a.appointment_date, a.appointment_time, a.status
+    FROM appointment_reminders r JOIN appointments a ON a.id = r.appointment_id
+    WHERE r.id IN ({ids})
+    ORDER BY r.remind_at
+'''
+
+# Завершение только своих напоминаний: если захват истек и напоминание взял
+# другой обработчик, claimed_by уже не совпадет
+SQL_FINISH_REMINDERS = '''
+    UPDATE appointment_reminders SET status = ?, attempts = attempts + 1, claimed_by = NULL, claimed_at = NULL
+    WHERE id IN ({ids}) AND status = 'claimed' AND claimed_by = ?
+'''
+
+SQL_GET_CONVERSATION_STATE = "SELECT data FROM conversation_state WHERE user_id = ? AND expires_at > ?"
+
+SQL_SAVE_CONVERSATION_STATE = '''
+    INSERT INTO conversation_state (user_id, data, expires_at)
+    VALUES (?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+    data = excluded.data,
+    expires_at = excluded.expires_at
+'''
+
+SQL_DELETE_CONVERSATION_STATE = "DELETE FROM conversation_state WHERE user_id = ?"
+
+SQL_PURGE_CONVERSATION_STATES = "DELETE FROM conversation_state WHERE expires_at <= ?"
+
+SQL_GET_HANDLER_STATES = '''
+    SELECT conversation_key, state FROM conversation_handler_state
+    WHERE name = ? AND expires_at > ?
+'''
+
+SQL_SAVE_HANDLER_STATE = '''
+    INSERT INTO conversation_handler_state (name, conversation_key, state, expires_at)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (name, conversation_key) DO UPDATE SET
+    state = excluded.state,
+    expires_at = excluded.expires_at
+'''
+
+SQL_DELETE_HANDLER_STATE = "DELETE FROM conversation_handler_state WHERE name = ? AND conversation_key = ?"
+
+SQL_PURGE_HANDLER_STATES = "DELETE FROM conversation_handler_state WHERE expires_at <= ?"
+
+
+# Формат дат в интерфейсе бота; в БД даты хранятся в ISO-формате
+DATE_FORMAT = "%d.%m.%Y"
+
+
+def to_db_date(value):
+    """Приводит дату ('ДД.ММ.ГГГГ' или date) к ISO-формату для запросов"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, DATE_FORMAT).date()
+    return value.isoformat()
+
+
+def from_db_date(value):
+    """Приводит дату из БД (date или ISO-строка) к формату интерфейса"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.strftime(DATE_FORMAT)
+
+
+def to_db_timestamp(value):
+    """Приводит datetime к строке, одинаково понятной обоим бэкендам"""
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def from_db_timestamp(value):
+    """Приводит время из БД (datetime или строка) к datetime"""
+    if isinstance(value, str):
+        return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def from_db_time(value):
+    """Приводит время из БД (time или строка) к виду 'ЧЧ:ММ'"""
+    if isinstance(value, str):
+        return value[:5]
+    return value.strftime("%H:%M")
+
+
+@functools.lru_cache(maxsize=None)
+def paged_query(template, key, descending, cursor_op=None, active_only=False):
+    """Собирает текст запроса списка записей.
+
+    key - колонки ключа сортировки, cursor_op - '<' или '>' для условия
+    по курсору (значения ключа крайней строки соседней страницы).
+    """
+    filters = ''
+    if active_only:
+        filters += " AND a.status != 'cancelled'"
+    if cursor_op:
+        columns = ', '.join(key)
+        placeholders = ', '.join('?' * len(key))
+        filters += f" AND ({columns}) {cursor_op} ({placeholders})"
+    return template.format(filters=filters, order='DESC' if descending else 'ASC')
+
+
+def id_placeholders(ids):
+    """Возвращает id и плейсхолдеры для условия IN.
+
+    Список дополняется повтором последнего id до степени двойки, чтобы
+    число разных текстов запроса (и записей в кэше диалекта) оставалось малым.
+    """
+    ids = list(ids)
+    size = 1
+    while size < len(ids):
+        size *= 2
+    ids += ids[-1:] * (size - len(ids))
+    return ids, ', '.join('?' * size)
 
 
 class Database:
     def __init__(self):
-        self.connection = None
+        # Диалект определяется один раз при подключении
+        self.dialect = None
+        self.slow_queries = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN)
+        # Карты занятости слотов по дням (кэш для показа свободного времени)
+        self.slots = SlotEngine(
+            SlotGrid(WORK_DAY_START, WORK_DAY_END, SLOT_MINUTES, WORK_BREAKS, WORK_DAYS),
+            SERVICE_BAYS, SLOT_CACHE_TTL
+        )
+        self.pool = self._create_pool()
         self.init_database()
 
-    def get_connection(self):
-        """Создает соединение с PostgreSQL"""
-        if self.connection is None:
-            try:
-                # Получаем DATABASE_URL от Railway
-                database_url = os.getenv('DATABASE_URL')
-
-                # Добавляем подробное логирование
-                logging.info("=== DATABASE CONNECTION DEBUG ===")
-                logging.info(f"DATABASE_URL exists: {bool(database_url)}")
-                if database_url:
-                    logging.info(f"DATABASE_URL length: {len(database_url)}")
-                    # Не логируем полный URL для безопасности, но покажем начало
-                    logging.info(f"DATABASE_URL starts with: {database_url[:20]}...")
-
-                if database_url:
-                    # Подключаемся к PostgreSQL
-                    logging.info("Attempting PostgreSQL connection...")
-                    self.connection = psycopg2.connect(
-                        database_url,
-                        sslmode='require'
-                    )
-                    logging.info("✅ Successfully connected to PostgreSQL")
-
-                else:
-                    # Локальная разработка - используем SQLite
-                    logging.info("No DATABASE_URL, falling back to SQLite")
-                    import sqlite3
-                    self.connection = sqlite3.connect("car_service.db")
-                    self.connection.row_factory = sqlite3.Row
-                    logging.info("✅ Connected to SQLite (fallback)")
+    @staticmethod
+    def _connect_sqlite():
+        """Создает соединение с локальной SQLite"""
+        conn = sqlite3.connect("car_service.db", check_same_thread=False)
+        # WAL позволяет читать параллельно с записью из других соединений пула
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _create_pool(self):
+        """Создает пул соединений с PostgreSQL (или SQLite для локальной разработки)"""
+        pool_options = dict(
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            recycle=DB_POOL_RECYCLE,
+            timeout=DB_POOL_TIMEOUT
+        )
+
+        # Получаем DATABASE_URL от Railway
+        database_url = os.getenv('DATABASE_URL')
+
+        # Добавляем подробное логирование
+        logging.info("=== DATABASE CONNECTION DEBUG ===")
+        logging.info(f"DATABASE_URL exists: {bool(database_url)}")
+        if database_url:
+            logging.info(f"DATABASE_URL length: {len(database_url)}")
+            # Не логируем полный URL для безопасности, но покажем начало
+            logging.info(f"DATABASE_URL starts with: {database_url[:20]}...")
 
+            try:
+                # Подключаемся к PostgreSQL
+                logging.info("Attempting PostgreSQL connection...")
+                pool = ConnectionPool(
+                    functools.partial(psycopg2.connect, database_url, sslmode='require'),
+                    **pool_options
+                )
+                self.dialect = PostgresDialect()
+                logging.info("✅ Successfully connected to PostgreSQL")
+                return pool
             except Exception as e:
                 logging.error(f"❌ Database connection error: {e}")
-                # Fallback на SQLite
-                import sqlite3
-                self.connection = sqlite3.connect("car_service.db")
-                self.connection.row_factory = sqlite3.Row
-                logging.info("✅ Fallback to SQLite successful")
+        else:
+            logging.info("No DATABASE_URL, falling back to SQLite")
 
-        return self.connection
+        # Локальная разработка или fallback - используем SQLite
+        pool = ConnectionPool(self._connect_sqlite, **pool_options)
+        self.dialect = SqliteDialect()
+        logging.info("✅ Connected to SQLite (fallback)")
+        return pool
 
     def init_database(self):
-        """Инициализирует таблицы в базе данных"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        """Применяет к базе данных недостающие миграции"""
+        if not DB_AUTO_MIGRATE:
+            return
 
-            # Проверяем тип базы данных по наличию метода (простой способ)
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                logging.info("Initializing PostgreSQL tables")
-                # Таблица пользователей
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        user_id BIGINT PRIMARY KEY,
-                        username TEXT,
-                        first_name TEXT,
-                        phone TEXT,
-                        car_brand TEXT,
-                        car_model TEXT,
-                        car_year INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-                # Таблица услуг
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS services (
-                        id SERIAL PRIMARY KEY,
-                        name TEXT NOT NULL,
-                        description TEXT,
-                        price_range TEXT
-                    )
-                ''')
-
-                # Таблица записей
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS appointments (
-                        id SERIAL PRIMARY KEY,
-                        user_id BIGINT,
-                        service_id INTEGER,
-                        service_name TEXT,
-                        appointment_date TEXT,
-                        appointment_time TEXT,
-                        car_brand TEXT,
-                        car_model TEXT,
-                        car_year INTEGER,
-                        phone TEXT,
-                        comment TEXT,
-                        status TEXT DEFAULT 'pending',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-            else:  # SQLite
-                logging.info("Initializing SQLite tables")
-                # Таблица пользователей
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        user_id INTEGER PRIMARY KEY,
-                        username TEXT,
-                        first_name TEXT,
-                        phone TEXT,
-                        car_brand TEXT,
-                        car_model TEXT,
-                        car_year INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-                # Таблица услуг
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS services (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        description TEXT,
-                        price_range TEXT
-                    )
-                ''')
-
-                # Таблица записей
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS appointments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        service_id INTEGER,
-                        service_name TEXT,
-                        appointment_date TEXT,
-                        appointment_time TEXT,
-                        car_brand TEXT,
-                        car_model TEXT,
-                        car_year INTEGER,
-                        phone TEXT,
-                        comment TEXT,
-                        status TEXT DEFAULT 'pending',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-
-            # Добавляем базовые услуги
-            self._add_default_services(cursor, is_postgres)
-
-            conn.commit()
-            cursor.close()
-            logging.info("Database initialized successfully")
+        try:
+            with self.pool.connection() as conn:
+                # Если схема актуальна, это один запрос к schema_version
+                applied = apply_migrations(conn, self.dialect, self.data_migrations())
+                if applied:
+                    logging.info(f"Applied {applied} {self.dialect.name} migrations")
+                logging.info("Database initialized successfully")
 
         except Exception as e:
             logging.error(f"Ошибка инициализации БД: {e}")
 
-    def _add_default_services(self, cursor, is_postgres):
-        """Добавляет стандартные услуги в базу"""
-        services = [
-            ('🛢 Техническое обслуживание', 'Замена масла, фильтров, общее ТО', 'от 2000 руб'),
-            ('🔧 Ремонт двигателя', 'Диагностика и ремонт двигателя', 'от 5000 руб'),
-            ('🛞 Шиномонтаж', 'Замена и балансировка шин', 'от 1500 руб'),
-            ('🎨 Кузовные работы', 'Покраска, ремонт вмятин', 'от 3000 руб'),
-            ('⚡ Диагностика', 'Компьютерная диагностика авто', 'от 1000 руб')
+    def data_migrations(self):
+        """Шаги миграций на Python: {версия миграции: функция(cursor)}"""
+        return {11: self.backfill_reminders}
+
+    def backfill_reminders(self, cursor):
+        """Создает напоминания по REMINDER_OFFSETS для предстоящих записей (в транзакции миграции)"""
+        now = datetime.now()
+        self._execute(cursor, SQL_GET_UPCOMING_APPOINTMENTS, (now.date().isoformat(),))
+        appointments = cursor.fetchall()
+        for appointment_id, user_id, db_date, db_time in appointments:
+            starts_at = datetime.strptime(f"{db_date} {from_db_time(db_time)}", "%Y-%m-%d %H:%M")
+            self._schedule_reminders(cursor, appointment_id, user_id, starts_at, now)
+        logging.info(f"Scheduled reminders for {len(appointments)} upcoming appointments")
+
+    def _execute(self, cursor, query, params=()):
+        """Выполняет запрос, приводя его к формату текущего бэкенда.
+
+        Запросы дольше SLOW_QUERY_MS попадают в журнал медленных запросов.
+        """
+        statement = self.dialect.sql(query)
+        started = time.perf_counter()
+        cursor.execute(statement, params)
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.slow_queries.threshold:
+            self._log_slow_query(cursor, statement, params, elapsed)
+
+    def _executemany(self, cursor, query, rows):
+        """Выполняет запрос для каждого набора параметров (с учетом в журнале медленных запросов)"""
+        started = time.perf_counter()
+        self.dialect.executemany(cursor, query, rows)
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.slow_queries.threshold:
+            self.slow_queries.record(query, [f"<{len(rows)} наборов параметров>"], elapsed, cursor.rowcount)
+
+    def _log_slow_query(self, cursor, statement, params, elapsed):
+        plan = None
+        if self.slow_queries.explain:
+            try:
+                plan = self.dialect.explain(cursor.connection, statement, params)
+            except Exception as e:
+                plan = f"EXPLAIN не удался: {e}"
+        self.slow_queries.record(statement, params, elapsed, cursor.rowcount, plan)
+
+    def get_slow_query_stats(self):
+        """Возвращает статистику медленных запросов (см. SlowQueryLog.stats)"""
+        return self.slow_queries.stats()
+
+    def reset_slow_query_stats(self):
+        """Сбрасывает статистику медленных запросов"""
+        self.slow_queries.reset()
+
+    def _bump_stats(self, cursor, db_date, service_name, status, delta):
+        """Изменяет счетчик записей (дата, услуга, статус) на delta"""
+        self._execute(cursor, SQL_BUMP_APPOINTMENT_STATS, (db_date, service_name or '', status, delta))
+
+    @staticmethod
+    def _appointment(row):
+        """Приводит дату и время записи к формату интерфейса"""
+        if row is not None:
+            row.appointment_date = from_db_date(row.appointment_date)
+            row.appointment_time = from_db_time(row.appointment_time)
+        return row
+
+    def _fetch_appointments(self, cursor):
+        return [self._appointment(row) for row in self.dialect.fetch_records(cursor, Appointment)]
+
+    @staticmethod
+    def _date_cursor(cursor):
+        """Переводит дату в курсоре (дата, время, id) в формат БД"""
+        if cursor is None:
+            return None
+        return (to_db_date(cursor[0]),) + tuple(cursor[1:])
+
+    def _enqueue_notifications(self, cursor, kind, appointments, exclude=None):
+        """Ставит уведомления администраторам в outbox в текущей транзакции.
+
+        appointments - [(id записи, данные для текста уведомления), ...];
+        exclude - администратор, который сам выполнил действие.
+        """
+        now = to_db_timestamp(datetime.now())
+        rows = [
+            (chat_id, kind, appointment_id, json.dumps(payload, ensure_ascii=False), now)
+            for appointment_id, payload in appointments
+            for chat_id in ADMIN_IDS if chat_id != exclude
         ]
+        if rows:
+            self._executemany(cursor, SQL_ENQUEUE_NOTIFICATION, rows)
+
+    def _enqueue_client_notifications(self, cursor, kind, appointments):
+        """Ставит в outbox уведомления клиентам о их записях (Appointment) в текущей транзакции"""
+        now = to_db_timestamp(datetime.now())
+        rows = [
+            (appt.user_id, kind, appt.id, json.dumps({
+                'service_name': appt.service_name, 'date': appt.appointment_date, 'time': appt.appointment_time,
+            }, ensure_ascii=False), now)
+            for appt in appointments if appt.user_id
+        ]
+        if rows:
+            self._executemany(cursor, SQL_ENQUEUE_NOTIFICATION, rows)
+
+    def _schedule_reminders(self, cursor, appointment_id, user_id, starts_at, now):
+        """Создает напоминания о записи за REMINDER_OFFSETS минут до начала (кроме уже прошедших)"""
+        rows = [
+            (appointment_id, user_id, offset, to_db_timestamp(starts_at - timedelta(minutes=offset)))
+            for offset in REMINDER_OFFSETS
+            if starts_at - timedelta(minutes=offset) > now
+        ]
+        if rows:
+            self._executemany(cursor, SQL_INSERT_REMINDER, rows)
 
-        # Проверяем, есть ли уже услуги
-        if is_postgres:
-            cursor.execute("SELECT COUNT(*) FROM services")
-        else:
-            cursor.execute("SELECT COUNT(*) FROM services")
-
-        existing = cursor.fetchone()[0]
-
-        if existing == 0:
-            logging.info("Adding default services to database")
-            for service in services:
-                try:
-                    if is_postgres:
-                        cursor.execute(
-                            "INSERT INTO services (name, description, price_range) VALUES (%s, %s, %s)",
-                            service
-                        )
-                    else:
-                        cursor.execute(
-                            "INSERT INTO services (name, description, price_range) VALUES (?, ?, ?)",
-                            service
-                        )
-                except Exception as e:
-                    logging.error(f"Ошибка добавления услуги: {e}")
-
-    def add_user(self, user_id, username, first_name):
-        """Добавляет или обновляет пользователя"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
+    def _cancel_reminders(self, cursor, appointment_ids):
+        ids, placeholders = id_placeholders(appointment_ids)
+        self._execute(cursor, SQL_CANCEL_REMINDERS.format(ids=placeholders), ids)
 
-            if is_postgres:
-                cursor.execute('''
-                    INSERT INTO users (user_id, username, first_name) 
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (user_id) DO UPDATE SET
-                    username = EXCLUDED.username,
-                    first_name = EXCLUDED.first_name
-                ''', (user_id, username, first_name))
-            else:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO users (user_id, username, first_name) 
-                    VALUES (?, ?, ?)
-                ''', (user_id, username, first_name))
+    def add_users(self, users):
+        """Добавляет или обновляет пользователей одной транзакцией.
 
-            conn.commit()
-            cursor.close()
-            logging.info(f"User {user_id} added/updated")
-        except Exception as e:
-            logging.error(f"Ошибка добавления пользователя: {e}")
-
-    def update_user_car_info(self, user_id, car_brand, car_model, car_year, phone):
-        """Обновляет информацию об авто пользователя"""
+        users - список (user_id, username, first_name). Возвращает True при успехе.
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    UPDATE users 
-                    SET car_brand = %s, car_model = %s, car_year = %s, phone = %s
-                    WHERE user_id = %s
-                ''', (car_brand, car_model, car_year, phone, user_id))
-            else:
-                cursor.execute('''
-                    UPDATE users 
-                    SET car_brand = ?, car_model = ?, car_year = ?, phone = ?
-                    WHERE user_id = ?
-                ''', (car_brand, car_model, car_year, phone, user_id))
-
-            conn.commit()
-            cursor.close()
-            logging.info(f"User {user_id} car info updated")
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._executemany(cursor, SQL_UPSERT_USER, users)
+                conn.commit()
+                cursor.close()
+                logging.info(f"{len(users)} users added/updated")
+                return True
         except Exception as e:
-            logging.error(f"Ошибка обновления авто: {e}")
+            logging.error(f"Ошибка добавления пользователей: {e}")
+            return False
 
     def get_services(self):
         """Возвращает список всех услуг"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('SELECT id, name, description, price_range FROM services')
-
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                services = cursor.fetchall()
-                result = []
-                for service in services:
-                    result.append({
-                        'id': service[0],
-                        'name': service[1],
-                        'description': service[2],
-                        'price_range': service[3]
-                    })
-            else:
-                services = cursor.fetchall()
-                result = [dict(service) for service in services]
-
-            cursor.close()
-            logging.info(f"Retrieved {len(result)} services")
-            return result
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_SERVICES)
+                result = self.dialect.fetch_records(cursor, Service)
+                cursor.close()
+                logging.info(f"Retrieved {len(result)} services")
+                return result
         except Exception as e:
             logging.error(f"Ошибка получения услуг: {e}")
             return []
 
     def create_appointment(self, user_id, service_id, service_name, appointment_date,
-                           appointment_time, car_brand, car_model, car_year, phone, comment=""):
-        """Создает новую запись"""
+                           appointment_time, car_brand, car_model, car_year, phone, comment="",
+                           username=None, first_name=None, duration_minutes=None):
+        """Создает новую запись.
+
+        В той же транзакции временная бронь пользователя превращается в занятые
+        слоты (услуга занимает duration_minutes подряд на одном посту), а в профиль
+        пользователя сохраняются данные авто и телефон. Если брони нет (или она
+        истекла), слоты занимаются напрямую - истекшие брони на эту дату при этом
+        снимаются; если слоты уже заняты на всех постах, запись не создается и
+        возвращается None.
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    INSERT INTO appointments 
-                    (user_id, service_id, service_name, appointment_date, appointment_time, 
-                     car_brand, car_model, car_year, phone, comment)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                ''', (user_id, service_id, service_name, appointment_date, appointment_time,
-                      car_brand, car_model, car_year, phone, comment))
-
+            db_date = to_db_date(appointment_date)
+            now = to_db_timestamp(datetime.now())
+            times = self.slots.grid.span(appointment_time, duration_minutes)
+            if times is None:
+                logging.info(f"Service does not fit at {appointment_date} {appointment_time}")
+                return None
+            released = []
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_INSERT_APPOINTMENT, (
+                    user_id, service_id, service_name, db_date, appointment_time,
+                    car_brand, car_model, car_year, phone, comment
+                ))
                 appointment_id = cursor.fetchone()[0]
-            else:
-                cursor.execute('''
-                    INSERT INTO appointments 
-                    (user_id, service_id, service_name, appointment_date, appointment_time, 
-                     car_brand, car_model, car_year, phone, comment)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (user_id, service_id, service_name, appointment_date, appointment_time,
-                      car_brand, car_model, car_year, phone, comment))
-
-                appointment_id = cursor.lastrowid
 
-            conn.commit()
-            cursor.close()
+                self._execute(cursor, SQL_CONVERT_HOLD, (appointment_id, user_id, db_date, now))
+                converted = cursor.fetchall()
+                bays = {bay for _, bay in converted}
+                if len(bays) == 1 and sorted(from_db_time(slot_time) for slot_time, _ in converted) == times:
+                    bay = bays.pop()
+                else:
+                    # Брони нет или она не на это время - занимаем слоты заново.
+                    # Истекшие брони на эту дату (в т.ч. чужие) снимаем, иначе
+                    # они не дадут занять слоты, которые показаны свободными
+                    if converted:
+                        self._execute(cursor, SQL_RELEASE_APPOINTMENT_SLOTS, (appointment_id,))
+                        released = cursor.fetchall()
+                    self._execute(cursor, SQL_RELEASE_HOLDS, (user_id, db_date, now))
+                    released += cursor.fetchall()
+                    bay = self._reserve(cursor, db_date, times, user_id, appointment_id, None)
+                    if bay is None:
+                        conn.rollback()
+                        cursor.close()
+                        logging.info(f"Slot {appointment_date} {appointment_time} is already taken")
+                        return None
+
+                self._bump_stats(cursor, db_date, service_name, 'pending', 1)
+                self._execute(cursor, SQL_UPSERT_USER_PROFILE, (
+                    user_id, username, first_name, car_brand, car_model, car_year, phone
+                ))
+                self._schedule_reminders(
+                    cursor, appointment_id, user_id,
+                    datetime.strptime(f"{appointment_date} {appointment_time}", f"{DATE_FORMAT} %H:%M"),
+                    datetime.now()
+                )
+                self._enqueue_notifications(cursor, 'new', [(appointment_id, {
+                    'service_name': service_name, 'date': appointment_date, 'time': appointment_time,
+                    'car': f"{car_brand} {car_model} ({car_year})", 'phone': phone, 'comment': comment,
+                    'first_name': first_name, 'username': username,
+                })])
+
+                conn.commit()
+                cursor.close()
+
+            self.slots.release(self._slot_rows(released))
+            self.slots.occupy(db_date, bay, times)
             logging.info(f"Appointment created with ID: {appointment_id}")
             return appointment_id
         except Exception as e:
             logging.error(f"Ошибка создания записи: {e}")
             return None
 
-    def get_user_appointments(self, user_id):
-        """Возвращает записи пользователя"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    SELECT * FROM appointments 
-                    WHERE user_id = %s 
-                    ORDER BY appointment_date DESC, appointment_time DESC
-                ''', (user_id,))
-                appointments = cursor.fetchall()
-                result = []
-                for appt in appointments:
-                    result.append({
-                        'id': appt[0], 'user_id': appt[1], 'service_id': appt[2],
-                        'service_name': appt[3], 'appointment_date': appt[4],
-                        'appointment_time': appt[5], 'car_brand': appt[6],
-                        'car_model': appt[7], 'car_year': appt[8], 'phone': appt[9],
-                        'comment': appt[10], 'status': appt[11], 'created_at': appt[12]
-                    })
-            else:
-                cursor.execute('''
-                    SELECT * FROM appointments 
-                    WHERE user_id = ? 
-                    ORDER BY appointment_date DESC, appointment_time DESC
-                ''', (user_id,))
-                appointments = cursor.fetchall()
-                result = [dict(appt) for appt in appointments]
+    def get_user_appointments(self, user_id, limit=None, after=None, before=None):
+        """Возвращает записи пользователя, начиная с самых поздних.
 
-            cursor.close()
+        Для постраничного вывода: limit - размер страницы, after/before -
+        курсор (дата, время, id) последней/первой строки соседней страницы.
+        """
+        try:
+            result = self._fetch_page(
+                SQL_GET_USER_APPOINTMENTS, ('a.appointment_date', 'a.appointment_time', 'a.id'), True,
+                (user_id,), limit, self._date_cursor(after), self._date_cursor(before)
+            )
             logging.info(f"Retrieved {len(result)} appointments for user {user_id}")
             return result
         except Exception as e:
             logging.error(f"Ошибка получения записей: {e}")
             return []
 
-    def get_appointments_by_date(self, date=None):
-        """Возвращает записи на определенную дату"""
+    def count_user_appointments(self, user_id):
+        """Возвращает количество записей пользователя"""
         try:
-            if date is None:
-                date = datetime.now().strftime("%d.%m.%Y")
-
-            conn = self.get_connection()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_COUNT_USER_APPOINTMENTS, (user_id,))
+                result = cursor.fetchone()[0]
+                cursor.close()
+                return result
+        except Exception as e:
+            logging.error(f"Ошибка подсчета записей пользователя: {e}")
+            return 0
+
+    def _fetch_page(self, template, key, descending, params, limit, after, before, active_only=False):
+        """Выполняет запрос списка записей с keyset-пагинацией.
+
+        after - курсор: вернуть строки, идущие после него в порядке сортировки;
+        before - строки перед ним. Результат всегда в порядке сортировки.
+        """
+        backward = before is not None
+        cursor_values = before if backward else after
+        cursor_op = None
+        if cursor_values is not None:
+            # Строки "после" курсора при DESC меньше его, при ASC - больше
+            cursor_op = '<' if descending != backward else '>'
+            params = params + tuple(cursor_values)
+
+        query = paged_query(template, key, descending != backward, cursor_op, active_only)
+        params = params + (limit if limit is not None else self.dialect.no_limit,)
+
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
+            self._execute(cursor, query, params)
+            result = self._fetch_appointments(cursor)
+            cursor.close()
 
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.appointment_date = %s AND a.status != 'cancelled'
-                    ORDER BY a.appointment_time
-                ''', (date,))
-                appointments = cursor.fetchall()
-                result = []
-                for appt in appointments:
-                    result.append({
-                        'id': appt[0], 'user_id': appt[1], 'service_id': appt[2],
-                        'service_name': appt[3], 'appointment_date': appt[4],
-                        'appointment_time': appt[5], 'car_brand': appt[6],
-                        'car_model': appt[7], 'car_year': appt[8], 'phone': appt[9],
-                        'comment': appt[10], 'status': appt[11], 'created_at': appt[12],
-                        'first_name': appt[13], 'username': appt[14]
-                    })
-            else:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.appointment_date = ? AND a.status != 'cancelled'
-                    ORDER BY a.appointment_time
-                ''', (date,))
-                appointments = cursor.fetchall()
-                result = [dict(appt) for appt in appointments]
+        if backward:
+            result.reverse()
+        return result
 
-            cursor.close()
-            return result
+    def get_appointments_by_date(self, date=None, limit=None, after=None, before=None):
+        """Возвращает записи на определенную дату.
+
+        Для постраничного вывода: limit - размер страницы, after/before -
+        курсор (время, id) последней/первой строки соседней страницы.
+        """
+        try:
+            if date is None:
+                date = datetime.now().date()
+
+            return self._fetch_page(
+                SQL_GET_APPOINTMENTS_BY_DATE, ('a.appointment_time', 'a.id'), False,
+                (to_db_date(date),), limit, after, before
+            )
         except Exception as e:
             logging.error(f"Ошибка получения записей на дату: {e}")
             return []
 
-    def get_all_appointments(self, days=7):
-        """Возвращает все записи за последние N дней"""
-        try:
-            start_date = (datetime.now() - timedelta(days=days)).strftime("%d.%m.%Y")
-
-            conn = self.get_connection()
-            cursor = conn.cursor()
+    def get_all_appointments(self, days=7, limit=None, after=None, before=None, active_only=False):
+        """Возвращает все записи за последние N дней.
 
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.appointment_date >= %s 
-                    ORDER BY a.appointment_date DESC, a.appointment_time DESC
-                ''', (start_date,))
-                appointments = cursor.fetchall()
-                result = []
-                for appt in appointments:
-                    result.append({
-                        'id': appt[0], 'user_id': appt[1], 'service_id': appt[2],
-                        'service_name': appt[3], 'appointment_date': appt[4],
-                        'appointment_time': appt[5], 'car_brand': appt[6],
-                        'car_model': appt[7], 'car_year': appt[8], 'phone': appt[9],
-                        'comment': appt[10], 'status': appt[11], 'created_at': appt[12],
-                        'first_name': appt[13], 'username': appt[14]
-                    })
-            else:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.appointment_date >= ? 
-                    ORDER BY a.appointment_date DESC, a.appointment_time DESC
-                ''', (start_date,))
-                appointments = cursor.fetchall()
-                result = [dict(appt) for appt in appointments]
+        Для постраничного вывода: limit - размер страницы, after/before -
+        курсор (дата, время, id) последней/первой строки соседней страницы.
+        """
+        try:
+            start_date = datetime.now().date() - timedelta(days=days)
 
-            cursor.close()
-            return result
+            return self._fetch_page(
+                SQL_GET_ALL_APPOINTMENTS, ('a.appointment_date', 'a.appointment_time', 'a.id'), True,
+                (to_db_date(start_date),), limit, self._date_cursor(after), self._date_cursor(before),
+                active_only
+            )
         except Exception as e:
             logging.error(f"Ошибка получения всех записей: {e}")
             return []
@@ -457,106 +762,567 @@ class Database:
     def get_appointment(self, appointment_id):
         """Возвращает запись по ID"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_APPOINTMENT, (appointment_id,))
+                result = self._appointment(self.dialect.fetch_record(cursor, Appointment))
+                cursor.close()
+                return result
+        except Exception as e:
+            logging.error(f"Ошибка получения записи: {e}")
+            return None
 
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
-
-            if is_postgres:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.id = %s
-                ''', (appointment_id,))
-                appointment = cursor.fetchone()
-                if appointment:
-                    result = {
-                        'id': appointment[0], 'user_id': appointment[1], 'service_id': appointment[2],
-                        'service_name': appointment[3], 'appointment_date': appointment[4],
-                        'appointment_time': appointment[5], 'car_brand': appointment[6],
-                        'car_model': appointment[7], 'car_year': appointment[8], 'phone': appointment[9],
-                        'comment': appointment[10], 'status': appointment[11], 'created_at': appointment[12],
-                        'first_name': appointment[13], 'username': appointment[14]
-                    }
-                else:
-                    result = None
-            else:
-                cursor.execute('''
-                    SELECT a.*, u.first_name, u.username 
-                    FROM appointments a
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE a.id = ?
-                ''', (appointment_id,))
-                appointment = cursor.fetchone()
-                result = dict(appointment) if appointment else None
+    def update_appointment_status(self, appointment_id, status, actor_id=None):
+        """Обновляет статус записи (остальным администраторам уходит уведомление).
 
-            cursor.close()
+        Отмененную запись вернуть нельзя: ее слоты освобождены и могли быть
+        заняты другой записью. Возвращает False, если статус не изменен.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_APPOINTMENT_STATUS, (appointment_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.close()
+                    logging.info(f"Appointment {appointment_id} not found")
+                    return False
+
+                db_date, appointment_time, service_name, old_status = row
+                if old_status == 'cancelled' and status != 'cancelled':
+                    # Слоты отмененной записи уже могли занять - вернуть ее нельзя
+                    cursor.close()
+                    logging.info(f"Appointment {appointment_id} is cancelled, cannot change to {status}")
+                    return False
+
+                released = []
+                if old_status != status:
+                    self._execute(cursor, SQL_UPDATE_APPOINTMENT_STATUS, (status, appointment_id, old_status))
+                    if cursor.rowcount == 0:
+                        # Статус успели изменить параллельно - счетчики не трогаем
+                        conn.rollback()
+                        cursor.close()
+                        logging.info(f"Appointment {appointment_id} status changed concurrently")
+                        return False
+
+                    self._bump_stats(cursor, db_date, service_name, old_status, -1)
+                    self._bump_stats(cursor, db_date, service_name, status, 1)
+                    if status == 'cancelled':
+                        # Отмененная запись освобождает свои слоты
+                        self._execute(cursor, SQL_RELEASE_APPOINTMENT_SLOTS, (appointment_id,))
+                        released = cursor.fetchall()
+                        self._cancel_reminders(cursor, [appointment_id])
+
+                    self._enqueue_notifications(cursor, status, [(appointment_id, {
+                        'service_name': service_name, 'date': from_db_date(db_date),
+                        'time': from_db_time(appointment_time),
+                    })], exclude=actor_id)
+
+                conn.commit()
+                cursor.close()
+
+            self.slots.release(self._slot_rows(released))
+            logging.info(f"Appointment {appointment_id} status updated to {status}")
+            return True
+        except Exception as e:
+            logging.error(f"Ошибка обновления статуса: {e}")
+            return False
+
+    def _update_statuses(self, cursor, appointment_ids, status, old_status, actor_id=None, kind=None):
+        """Меняет статус записей из old_status в status в текущей транзакции.
+
+        Двигает счетчики, при отмене освобождает слоты и напоминания, ставит
+        уведомления администраторам (вида kind, по умолчанию - новый статус).
+        Возвращает измененные записи и освобожденные слоты (дата, время, пост).
+        """
+        ids, placeholders = id_placeholders(appointment_ids)
+        self._execute(
+            cursor, SQL_UPDATE_APPOINTMENTS_STATUS.format(ids=placeholders),
+            (status, *ids, old_status)
+        )
+        result = self._fetch_appointments(cursor)
+
+        # Счетчики двигаем одним изменением на каждую пару (дата, услуга)
+        moved = {}
+        for appt in result:
+            key = (to_db_date(appt.appointment_date), appt.service_name)
+            moved[key] = moved.get(key, 0) + 1
+        for (db_date, service_name), count in moved.items():
+            self._bump_stats(cursor, db_date, service_name, old_status, -count)
+            self._bump_stats(cursor, db_date, service_name, status, count)
+
+        released = []
+        if status == 'cancelled' and result:
+            ids, placeholders = id_placeholders(appt.id for appt in result)
+            self._execute(cursor, SQL_RELEASE_APPOINTMENTS_SLOTS.format(ids=placeholders), ids)
+            released = self._slot_rows(cursor.fetchall())
+            self._cancel_reminders(cursor, ids)
+
+        self._enqueue_notifications(cursor, kind or status, [
+            (appt.id, {'service_name': appt.service_name, 'date': appt.appointment_date,
+                       'time': appt.appointment_time})
+            for appt in result
+        ], exclude=actor_id)
+        return result, released
+
+    def update_appointments_status(self, appointment_ids, status, old_status='pending', actor_id=None):
+        """Меняет статус нескольких записей одним запросом и одной транзакцией.
+
+        Меняются только записи, находящиеся в статусе old_status (остальные
+        пропускаются); отмененные записи не возвращаются (см.
+        update_appointment_status). Возвращает список измененных записей.
+        """
+        if not appointment_ids:
+            return []
+        if old_status == 'cancelled' and status != 'cancelled':
+            logging.info(f"Cancelled appointments cannot change to {status}")
+            return []
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                result, released = self._update_statuses(cursor, appointment_ids, status, old_status, actor_id)
+                conn.commit()
+                cursor.close()
+
+            self.slots.release(released)
+            logging.info(f"{len(result)} of {len(appointment_ids)} appointments updated to {status}")
             return result
         except Exception as e:
-            logging.error(f"Ошибка получения записи: {e}")
-            return None
+            logging.error(f"Ошибка массового обновления статуса: {e}")
+            return []
+
+    def expire_pending_appointments(self, now, deadline, limit):
+        """Отменяет до limit неподтвержденных записей с сегодняшнего дня, начинающихся не позже deadline.
 
-    def update_appointment_status(self, appointment_id, status):
-        """Обновляет статус записи"""
+        Записи прошлых дней не трогаются - это история, а не занятые слоты.
+        Все изменения - одной транзакцией: статус, счетчики, освобождение
+        слотов, уведомления администраторам и клиентам. Возвращает отмененные
+        записи и число освобожденных слотов, которые начинаются позже now.
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                db_date, db_time = deadline.date().isoformat(), deadline.strftime("%H:%M")
+                self._execute(cursor, SQL_GET_STALE_PENDING, (now.date().isoformat(), db_date, db_date, db_time, limit))
+                stale = [row[0] for row in cursor.fetchall()]
+
+                result, released = [], []
+                if stale:
+                    # Подтвержденные тем временем администратором пропустит условие на old_status
+                    result, released = self._update_statuses(cursor, stale, 'cancelled', 'pending', kind='expired')
+                    self._enqueue_client_notifications(cursor, 'client_expired', result)
+                conn.commit()
+                cursor.close()
+
+            self.slots.release(released)
+            current = (now.date().isoformat(), now.strftime("%H:%M"))
+            reclaimed = sum((slot_date, slot_time) > current for slot_date, slot_time, _ in released)
+            if result:
+                logging.info(f"Expired {len(result)} pending appointments, released {reclaimed} future slots")
+            return result, reclaimed
+        except Exception as e:
+            logging.error(f"Ошибка отмены неподтвержденных записей: {e}")
+            return [], 0
 
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
+    def get_appointment_stats(self, days=30):
+        """Возвращает статистику записей за последние N дней (по счетчикам)"""
+        stats = {
+            'total': 0,
+            'by_service': {},
+            'by_status': {'pending': 0, 'confirmed': 0, 'cancelled': 0}
+        }
 
-            if is_postgres:
-                cursor.execute('''
-                    UPDATE appointments 
-                    SET status = %s 
-                    WHERE id = %s
-                ''', (status, appointment_id))
-            else:
-                cursor.execute('''
-                    UPDATE appointments 
-                    SET status = ? 
-                    WHERE id = ?
-                ''', (status, appointment_id))
+        try:
+            start_date = datetime.now().date() - timedelta(days=days)
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_APPOINTMENT_STATS, (to_db_date(start_date),))
+                for service_name, status, total in cursor.fetchall():
+                    total = int(total)
+                    stats['total'] += total
+                    stats['by_service'][service_name] = stats['by_service'].get(service_name, 0) + total
+                    stats['by_status'][status] = stats['by_status'].get(status, 0) + total
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка получения статистики: {e}")
+
+        return stats
 
-            conn.commit()
+    def count_appointments_by_date(self, date=None):
+        """Возвращает количество активных записей на дату (по счетчикам)"""
+        try:
+            if date is None:
+                date = datetime.now().date()
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_COUNT_APPOINTMENTS_BY_DATE, (to_db_date(date),))
+                count = int(cursor.fetchone()[0])
+                cursor.close()
+                return count
+        except Exception as e:
+            logging.error(f"Ошибка подсчета записей: {e}")
+            return 0
+
+    @staticmethod
+    def _slot_rows(rows):
+        """Строки (дата, время, пост) из БД -> ключи SlotEngine"""
+        return [(str(slot_date), from_db_time(slot_time), bay) for slot_date, slot_time, bay in rows]
+
+    def _reserve(self, cursor, db_date, times, user_id, appointment_id, expires_at):
+        """Занимает слоты times подряд на одном посту.
+
+        Посты перебираются начиная со свободных по кэшу; если на посту занят
+        хотя бы один слот, уже вставленные строки удаляются и пробуется
+        следующий. Возвращает номер поста или None, если свободного нет.
+        """
+        for bay in self.slots.bay_order(db_date, times):
+            inserted = []
+            for slot_time in times:
+                self._execute(cursor, SQL_RESERVE_SLOT, (db_date, slot_time, bay, user_id, appointment_id, expires_at))
+                row = cursor.fetchone()
+                if row is None:
+                    break
+                inserted.append((row[0],))
+            else:
+                return bay
+            if inserted:
+                self._executemany(cursor, SQL_DELETE_RESERVATION, inserted)
+        return None
+
+    def _load_slots(self, days):
+        """Загружает в SlotEngine карты занятости дней (ISO-даты), которых нет в кэше"""
+        stale = self.slots.stale(days)
+        if not stale:
+            return
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, SQL_GET_RESERVATIONS, (min(stale), max(stale), to_db_timestamp(datetime.now())))
+            rows = [
+                (str(slot_date), from_db_time(slot_time), bay, appointment_id, from_db_timestamp(expires_at))
+                for slot_date, slot_time, bay, appointment_id, expires_at in cursor.fetchall()
+            ]
             cursor.close()
-            logging.info(f"Appointment {appointment_id} status updated to {status}")
+        self.slots.load(stale, rows)
+
+    def get_free_slots(self, start_date, days=1, duration_minutes=None):
+        """Возвращает свободное время начала услуги на days дней начиная с start_date.
+
+        Результат - {'ДД.ММ.ГГГГ': ['ЧЧ:ММ', ...]} только по рабочим дням.
+        Занятость всех дней читается одним запросом и кэшируется в SlotEngine.
+        """
+        if isinstance(start_date, str):
+            start_date = datetime.strptime(start_date, DATE_FORMAT).date()
+        grid = self.slots.grid
+        days = [
+            day for day in (start_date + timedelta(days=offset) for offset in range(days))
+            if grid.is_working_day(day)
+        ]
+
+        try:
+            self._load_slots([day.isoformat() for day in days])
+            now = datetime.now()
+            return {
+                day.strftime(DATE_FORMAT): self.slots.free_starts(day.isoformat(), duration_minutes, now)
+                for day in days
+            }
+        except Exception as e:
+            logging.error(f"Ошибка получения слотов: {e}")
+            # Без БД показываем все слоты - занятость все равно проверит бронь
+            length = grid.length(duration_minutes)
+            starts = grid.valid_starts(length)
+            all_slots = [slot_time for i, slot_time in enumerate(grid.times) if starts >> i & 1]
+            return {day.strftime(DATE_FORMAT): list(all_slots) for day in days}
+
+    def get_free_slot_counts(self, start_date, days=1, duration_minutes=None):
+        """Возвращает число свободных вариантов начала услуги по рабочим дням диапазона"""
+        return {
+            day: len(slots)
+            for day, slots in self.get_free_slots(start_date, days, duration_minutes).items()
+        }
+
+    def get_available_time_slots(self, date, duration_minutes=None):
+        """Возвращает доступные временные слоты на дату"""
+        return self.get_free_slots(date, 1, duration_minutes).get(date, [])
+
+    def hold_slot(self, user_id, date, time, duration_minutes=None):
+        """Временно бронирует слоты услуги за пользователем на SLOT_HOLD_MINUTES.
+
+        Прежняя бронь пользователя снимается. Возвращает False, если услуга
+        не помещается с этого времени ни на один пост.
+        """
+        try:
+            db_date = to_db_date(date)
+            times = self.slots.grid.span(time, duration_minutes)
+            if times is None:
+                return False
+            now = datetime.now()
+            expires_at = now + timedelta(minutes=SLOT_HOLD_MINUTES)
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_RELEASE_HOLDS, (user_id, db_date, to_db_timestamp(now)))
+                released = cursor.fetchall()
+                bay = self._reserve(cursor, db_date, times, user_id, None, to_db_timestamp(expires_at))
+                conn.commit()
+                cursor.close()
+
+            self.slots.release(self._slot_rows(released))
+            if bay is not None:
+                self.slots.occupy(db_date, bay, times, expires_at)
+            logging.info(f"Slot {date} {time} {'held' if bay else 'is busy'} for user {user_id}")
+            return bay is not None
+        except Exception as e:
+            logging.error(f"Ошибка бронирования слота: {e}")
+            return False
+
+    def release_hold(self, user_id):
+        """Снимает временную бронь пользователя"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_RELEASE_USER_HOLDS, (user_id,))
+                released = cursor.fetchall()
+                conn.commit()
+                cursor.close()
+            self.slots.release(self._slot_rows(released))
+        except Exception as e:
+            logging.error(f"Ошибка снятия брони: {e}")
+
+    def get_due_notifications(self, limit):
+        """Возвращает уведомления, которые пора отправить: [(id, chat_id, вид, id записи, данные, попыток), ...]"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_DUE_NOTIFICATIONS, (to_db_timestamp(datetime.now()), limit))
+                rows = [
+                    (notification_id, chat_id, kind, appointment_id, json.loads(payload), attempts)
+                    for notification_id, chat_id, kind, appointment_id, payload, attempts in cursor.fetchall()
+                ]
+                cursor.close()
+                return rows
+        except Exception as e:
+            logging.error(f"Ошибка получения уведомлений: {e}")
+            return []
+
+    def mark_notifications_sent(self, notification_ids):
+        """Отмечает уведомления отправленными"""
+        try:
+            ids, placeholders = id_placeholders(notification_ids)
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_MARK_NOTIFICATIONS_SENT.format(ids=placeholders), ids)
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            logging.error(f"Ошибка отметки уведомлений: {e}")
+            return False
+
+    def mark_notifications_failed(self, notification_ids, error, retry_at=None):
+        """Откладывает уведомления до retry_at или, если retry_at=None, переводит в dead"""
+        try:
+            ids, placeholders = id_placeholders(notification_ids)
+            status = 'dead' if retry_at is None else 'pending'
+            next_attempt_at = to_db_timestamp(retry_at or datetime.now())
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(
+                    cursor, SQL_MARK_NOTIFICATIONS_FAILED.format(ids=placeholders),
+                    (status, next_attempt_at, str(error)[:500], *ids)
+                )
+                conn.commit()
+                cursor.close()
+                return True
+        except Exception as e:
+            logging.error(f"Ошибка отметки уведомлений: {e}")
+            return False
+
+    def purge_notifications(self, days):
+        """Удаляет отправленные уведомления старше days дней"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_PURGE_NOTIFICATIONS, (to_db_timestamp(datetime.now() - timedelta(days=days)),))
+                purged = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                return purged
+        except Exception as e:
+            logging.error(f"Ошибка очистки уведомлений: {e}")
+            return 0
+
+    def claim_due_reminders(self, worker_id, now, limit):
+        """Захватывает за обработчиком worker_id до limit напоминаний, срок которых наступил к now.
+
+        Напоминания, взятые раньше REMINDER_CLAIM_TIMEOUT секунд назад и не
+        завершенные, сначала возвращаются в очередь. Возвращает список Reminder.
+        """
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                db_now = to_db_timestamp(now)
+                self._execute(cursor, SQL_REQUEUE_STALE_REMINDERS, (
+                    to_db_timestamp(now - timedelta(seconds=REMINDER_CLAIM_TIMEOUT)),
+                ))
+                self._execute(
+                    cursor, SQL_CLAIM_REMINDERS.format(skip_locked=self.dialect.skip_locked),
+                    (worker_id, db_now, db_now, limit)
+                )
+                claimed = [row[0] for row in cursor.fetchall()]
+                conn.commit()
+
+                result = []
+                if claimed:
+                    ids, placeholders = id_placeholders(claimed)
+                    self._execute(cursor, SQL_GET_REMINDERS.format(ids=placeholders), ids)
+                    result = self.dialect.fetch_records(cursor, Reminder)
+                    for reminder in result:
+                        self._appointment(reminder)
+                        reminder.remind_at = from_db_timestamp(reminder.remind_at)
+                cursor.close()
+                return result
+        except Exception as e:
+            logging.error(f"Ошибка получения напоминаний: {e}")
+            return []
+
+    def finish_reminders(self, worker_id, reminder_ids, status):
+        """Завершает напоминания обработчика: sent, skipped, failed или pending (повтор)"""
+        if not reminder_ids:
             return True
+
+        try:
+            ids, placeholders = id_placeholders(reminder_ids)
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_FINISH_REMINDERS.format(ids=placeholders), (status, *ids, worker_id))
+                conn.commit()
+                cursor.close()
+                return True
         except Exception as e:
-            logging.error(f"Ошибка обновления статуса: {e}")
+            logging.error(f"Ошибка обновления напоминаний: {e}")
             return False
 
-    def get_available_time_slots(self, date):
-        """Возвращает доступные временные слоты на дату"""
-        all_slots = ['09:00', '10:00', '11:00', '12:00', '14:00', '15:00', '16:00', '17:00']
+    def get_conversation_state(self, user_id):
+        """Возвращает сохраненные данные записи пользователя (JSON) или None"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_CONVERSATION_STATE, (user_id, to_db_timestamp(datetime.now())))
+                row = cursor.fetchone()
+                cursor.close()
+                return row[0] if row else None
+        except Exception as e:
+            logging.error(f"Ошибка получения состояния: {e}")
+            return None
 
+    def save_conversation_state(self, user_id, data, ttl):
+        """Сохраняет данные записи пользователя (JSON) на ttl секунд"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            expires_at = datetime.now() + timedelta(seconds=ttl)
 
-            is_postgres = hasattr(cursor, 'execute') and not hasattr(conn, 'row_factory')
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_SAVE_CONVERSATION_STATE, (user_id, data, to_db_timestamp(expires_at)))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка сохранения состояния: {e}")
 
-            if is_postgres:
-                cursor.execute('''
-                    SELECT appointment_time FROM appointments 
-                    WHERE appointment_date = %s AND status != 'cancelled'
-                ''', (date,))
-            else:
-                cursor.execute('''
-                    SELECT appointment_time FROM appointments 
-                    WHERE appointment_date = ? AND status != 'cancelled'
-                ''', (date,))
+    def delete_conversation_state(self, user_id):
+        """Удаляет данные записи пользователя"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_DELETE_CONVERSATION_STATE, (user_id,))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка удаления состояния: {e}")
 
-            booked_slots = cursor.fetchall()
-            booked_times = [slot[0] for slot in booked_slots]
-            available_slots = [slot for slot in all_slots if slot not in booked_times]
+    def purge_conversation_states(self):
+        """Удаляет просроченные данные брошенных записей"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                now = to_db_timestamp(datetime.now())
+                self._execute(cursor, SQL_PURGE_CONVERSATION_STATES, (now,))
+                purged = cursor.rowcount
+                self._execute(cursor, SQL_PURGE_HANDLER_STATES, (now,))
+                purged += cursor.rowcount
+                conn.commit()
+                cursor.close()
+                if purged:
+                    logging.info(f"Purged {purged} expired conversation states")
+        except Exception as e:
+            logging.error(f"Ошибка очистки состояний: {e}")
 
-            cursor.close()
-            return available_slots
+    def get_handler_states(self, name):
+        """Возвращает сохраненные шаги диалога name: {ключ диалога: состояние}"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute(cursor, SQL_GET_HANDLER_STATES, (name, to_db_timestamp(datetime.now())))
+                rows = cursor.fetchall()
+                cursor.close()
+                return dict(rows)
         except Exception as e:
-            logging.error(f"Ошибка получения слотов: {e}")
-            return all_slots
+            logging.error(f"Ошибка получения шагов диалога: {e}")
+            return {}
+
+    def save_handler_state(self, name, key, state, ttl):
+        """Сохраняет шаг диалога на ttl секунд (state=None - удаляет)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                if state is None:
+                    self._execute(cursor, SQL_DELETE_HANDLER_STATE, (name, key))
+                else:
+                    expires_at = datetime.now() + timedelta(seconds=ttl)
+                    self._execute(cursor, SQL_SAVE_HANDLER_STATE, (name, key, state, to_db_timestamp(expires_at)))
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            logging.error(f"Ошибка сохранения шага диалога: {e}")
+
+
+class AsyncDatabase:
+    """Асинхронная обертка над Database.
+
+    Синхронные методы Database выполняются в отдельном пуле потоков,
+    поэтому запрос к БД не блокирует цикл событий бота.
+    """
+
+    def __init__(self, database, max_workers=DB_POOL_MAX_SIZE):
+        # Больше потоков, чем соединений в пуле, не имеет смысла
+        self._database = database
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+    def __getattr__(self, name):
+        method = getattr(self._database, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(method, *args, **kwargs)
+            )
+
+        # Кэшируем обертку, чтобы не создавать ее при каждом вызове
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def shutdown(self):
+        """Останавливает пул потоков"""
+        self._executor.shutdown(wait=True)
 
 
 # Создаем глобальный экземпляр базы данных
-db = Database()
\ No newline at end of file
+db = Database()
+async_db = AsyncDatabase(db)
\ No newline at end of file
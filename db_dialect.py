@@ -0,0 +1,102 @@
+import sqlite3
+
+import psycopg2
+import psycopg2.extras
+
+
+class Dialect:
+    """Особенности конкретного бэкенда БД.
+
+    Запросы в database.py пишутся один раз с плейсхолдерами '?'.
+    Диалект один раз переводит текст запроса в формат драйвера и кэширует
+    результат, поэтому при каждом вызове строка не пересобирается.
+    """
+
+    name = None
+    integrity_error = None
+    # Префикс запроса, возвращающего план выполнения
+    explain_prefix = None
+    # Значение LIMIT, означающее "без ограничения"
+    no_limit = None
+    # Суффикс выборки строк под обновление, пропускающей строки, занятые другими транзакциями
+    skip_locked = ''
+
+    def __init__(self):
+        self._statements = {}
+
+    def sql(self, query):
+        """Возвращает текст запроса для драйвера (с кэшированием)"""
+        statement = self._statements.get(query)
+        if statement is None:
+            statement = self._statements[query] = self._prepare(query)
+        return statement
+
+    def _prepare(self, query):
+        return query
+
+    def executemany(self, cursor, query, rows):
+        """Выполняет запрос для каждого набора параметров из rows"""
+        cursor.executemany(self.sql(query), rows)
+
+    def explain(self, conn, statement, params):
+        """Возвращает план выполнения подготовленного запроса одной строкой"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self.explain_prefix + statement, params)
+            return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def fetch_records(cursor, record):
+        """Возвращает строки результата в виде объектов record (см. models.py).
+
+        Колонки в запросе перечисляются явно в порядке полей record,
+        поэтому кортеж строки передается в конструктор без разбора имен.
+        """
+        return [record(*row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def fetch_record(cursor, record):
+        """Возвращает одну строку результата в виде объекта record (или None)"""
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return record(*row)
+
+
+class PostgresDialect(Dialect):
+    name = 'postgres'
+    integrity_error = psycopg2.IntegrityError
+    explain_prefix = 'EXPLAIN '
+    skip_locked = ' FOR UPDATE SKIP LOCKED'
+
+    def _prepare(self, query):
+        # psycopg2 использует %s, а литеральный % нужно экранировать
+        return query.replace('%', '%%').replace('?', '%s')
+
+    def executemany(self, cursor, query, rows):
+        # executemany в psycopg2 ходит в БД за каждой строкой, execute_batch - пачками
+        psycopg2.extras.execute_batch(cursor, self.sql(query), rows)
+
+    def explain(self, conn, statement, params):
+        # Ошибка в PostgreSQL прерывает всю транзакцию - изолируем EXPLAIN точкой сохранения
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SAVEPOINT explain")
+            try:
+                return super().explain(conn, statement, params)
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain")
+                raise
+            finally:
+                cursor.execute("RELEASE SAVEPOINT explain")
+        finally:
+            cursor.close()
+
+
+class SqliteDialect(Dialect):
+    name = 'sqlite'
+    no_limit = -1
+    explain_prefix = 'EXPLAIN QUERY PLAN '
+    integrity_error = sqlite3.IntegrityError
@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Не удалось получить соединение из пула за отведенное время"""
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с БД.
+
+    Работает с любым DB-API драйвером: соединения создаются функцией connect.
+    При выдаче соединение проверяется (SELECT 1) и пересоздается, если оно
+    разорвано или старше recycle секунд.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=5, recycle=1800, timeout=30):
+        if min_size > max_size:
+            raise ValueError("min_size не может быть больше max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle = recycle
+        self.timeout = timeout
+
+        self._idle = deque()  # (connection, created_at)
+        self._size = 0
+        self._cond = threading.Condition()
+
+        for _ in range(min_size):
+            self._idle.append(self._open())
+            self._size += 1
+
+    def _open(self):
+        return self._connect(), time.monotonic()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _is_alive(conn):
+        """Проверяет, что соединение живо"""
+        try:
+            if getattr(conn, 'closed', 0):  # psycopg2
+                return False
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"Нет свободных соединений (max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+            if self._idle:
+                conn, created_at = self._idle.popleft()
+            else:
+                conn, created_at = None, None
+                self._size += 1
+
+        try:
+            if conn is not None:
+                expired = time.monotonic() - created_at > self.recycle
+                if expired or not self._is_alive(conn):
+                    logging.info("Recycling database connection" if expired else "Replacing dead database connection")
+                    self._close(conn)
+                    conn = None
+
+            if conn is None:
+                conn, created_at = self._open()
+        except Exception:
+            self._discard()
+            raise
+
+        return conn, created_at
+
+    def _checkin(self, conn, created_at):
+        with self._cond:
+            self._idle.append((conn, created_at))
+            self._cond.notify()
+
+    def _discard(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Выдает соединение из пула и возвращает его обратно после использования"""
+        conn, created_at = self._checkout()
+        try:
+            yield conn
+        finally:
+            # Сбрасываем незавершенную транзакцию; если не получилось - соединение битое
+            try:
+                conn.rollback()
+            except Exception as e:
+                logging.warning(f"Discarding broken database connection: {e}")
+                self._close(conn)
+                self._discard()
+            else:
+                self._checkin(conn, created_at)
+
+    def close(self):
+        """Закрывает все свободные соединения"""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close(conn)
+                self._size -= 1
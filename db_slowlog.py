@@ -0,0 +1,57 @@
+import re
+import logging
+import threading
+
+# Телефоны хранятся очищенными ('+79161234567'), поэтому ищем длинные серии цифр
+PHONE_RE = re.compile(r'(?<!\d)\+?\d{10,15}(?!\d)')
+
+
+def redact(value):
+    """Скрывает номера телефонов в строковом параметре (кроме двух последних цифр)"""
+    if not isinstance(value, str):
+        return value
+    return PHONE_RE.sub(lambda m: '*' * (len(m.group()) - 2) + m.group()[-2:], value)
+
+
+def normalize(query):
+    """Текст запроса в одну строку - ключ для агрегирования"""
+    return ' '.join(query.split())
+
+
+class SlowQueryLog:
+    """Журнал медленных запросов.
+
+    Каждый запрос дольше threshold_ms пишется в лог с параметрами (телефоны
+    скрыты), числом строк и, если включено, планом выполнения. По каждому
+    тексту запроса копится количество, суммарное и максимальное время.
+    """
+
+    def __init__(self, threshold_ms, explain=False):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._stats = {}  # текст запроса -> [количество, суммарное время, максимум]
+
+    def record(self, query, params, seconds, rowcount, plan=None):
+        query = normalize(query)
+        with self._lock:
+            stats = self._stats.setdefault(query, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+        rows = rowcount if rowcount is not None and rowcount >= 0 else 'n/a'
+        message = f"Slow query {seconds * 1000:.0f} ms, rows={rows}: {query} params={[redact(p) for p in params]}"
+        if plan:
+            message += f"\nPlan: {plan}"
+        logging.warning(message)
+
+    def stats(self):
+        """Возвращает [(запрос, количество, суммарное время, максимум), ...] по убыванию суммарного времени"""
+        with self._lock:
+            items = [(query, *stats) for query, stats in self._stats.items()]
+        return sorted(items, key=lambda item: item[2], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
@@ -2,7 +2,7 @@ import logging
 from datetime import datetime, timedelta
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from telegram.ext import ContextTypes, CallbackQueryHandler, CommandHandler, MessageHandler, filters
-from database import db
+from database import async_db
 from config import ADMIN_IDS
 
 
@@ -20,12 +20,10 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Статистика на сегодня
-    today = datetime.now().strftime("%d.%m.%Y")
-    today_appointments = db.get_appointments_by_date(today)
-    today_count = len(today_appointments)
+    today_count = await async_db.count_appointments_by_date()
 
     # Общая статистика
-    total_appointments = len(db.get_all_appointments(days=30))
+    total_appointments = (await async_db.get_appointment_stats(days=30))['total']
 
     keyboard = [
         [InlineKeyboardButton("📅 Записи на сегодня", callback_data="admin_today")],
@@ -57,7 +55,7 @@ async def admin_today(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     today = datetime.now().strftime("%d.%m.%Y")
-    appointments = db.get_appointments_by_date(today)
+    appointments = await async_db.get_appointments_by_date(today)
 
     if not appointments:
         text = "📅 На сегодня записей нет."
@@ -90,7 +88,7 @@ async def admin_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("❌ У вас нет доступа.")
         return
 
-    appointments = db.get_all_appointments(days=7)
+    appointments = await async_db.get_all_appointments(days=7)
 
     if not appointments:
         text = "📋 За последние 7 дней записей нет."
@@ -139,15 +137,9 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Статистика по услугам (последние 30 дней)
-    appointments = db.get_all_appointments(days=30)
-
-    service_stats = {}
-    status_stats = {'pending': 0, 'confirmed': 0, 'cancelled': 0}
-
-    for appt in appointments:
-        service_name = appt['service_name']
-        service_stats[service_name] = service_stats.get(service_name, 0) + 1
-        status_stats[appt['status']] = status_stats.get(appt['status'], 0) + 1
+    stats = await async_db.get_appointment_stats(days=30)
+    service_stats = stats['by_service']
+    status_stats = stats['by_status']
 
     text = "📊 **Статистика (30 дней)**\n\n"
 
@@ -160,7 +152,7 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text += f"• ✅ Подтверждены: {status_stats['confirmed']}\n"
     text += f"• ❌ Отменены: {status_stats['cancelled']}\n"
 
-    text += f"\n📅 **Всего записей:** {len(appointments)}"
+    text += f"\n📅 **Всего записей:** {stats['total']}"
 
     keyboard = [[InlineKeyboardButton("⬅️ Назад", callback_data="admin_back")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -203,10 +195,8 @@ async def admin_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
         del context.user_data['admin_search']
 
     # Показываем админ-панель
-    today = datetime.now().strftime("%d.%m.%Y")
-    today_appointments = db.get_appointments_by_date(today)
-    today_count = len(today_appointments)
-    total_appointments = len(db.get_all_appointments(days=30))
+    today_count = await async_db.count_appointments_by_date()
+    total_appointments = (await async_db.get_appointment_stats(days=30))['total']
 
     keyboard = [
         [InlineKeyboardButton("📅 Записи на сегодня", callback_data="admin_today")],
@@ -241,7 +231,7 @@ async def handle_admin_search(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     try:
         appointment_id = int(update.message.text.strip())
-        appointment = db.get_appointment(appointment_id)
+        appointment = await async_db.get_appointment(appointment_id)
 
         if not appointment:
             await update.message.reply_text("❌ Запись с таким ID не найдена.")
@@ -309,10 +299,10 @@ async def handle_appointment_action(update: Update, context: ContextTypes.DEFAUL
     appointment_id = int(data.split('_')[-1])
 
     if data.startswith('admin_confirm_'):
-        success = db.update_appointment_status(appointment_id, 'confirmed')
+        success = await async_db.update_appointment_status(appointment_id, 'confirmed')
         action_text = "подтверждена"
     elif data.startswith('admin_cancel_'):
-        success = db.update_appointment_status(appointment_id, 'cancelled')
+        success = await async_db.update_appointment_status(appointment_id, 'cancelled')
         action_text = "отменена"
     else:
         return
@@ -321,7 +311,7 @@ async def handle_appointment_action(update: Update, context: ContextTypes.DEFAUL
         await query.answer(f"✅ Запись {action_text}!")
 
         # Обновляем сообщение
-        appointment = db.get_appointment(appointment_id)
+        appointment = await async_db.get_appointment(appointment_id)
         if appointment:
             status_text = {
                 'pending': '⏳ Ожидает подтверждения',
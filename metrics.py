@@ -0,0 +1,242 @@
+"""Метрики обработчиков и запросов к БД в формате Prometheus.
+
+Для каждого обработчика бота и метода Database считаются вызовы, ошибки
+и гистограмма длительности, для методов Database - еще и число
+возвращенных строк. В режиме вебхука метрики отдаются по HTTP на
+METRICS_PORT (/metrics), в режиме polling - периодически пишутся в файл.
+"""
+import time
+import atexit
+import bisect
+import logging
+import functools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram.ext import ConversationHandler
+
+# Границы корзин гистограммы, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Series:
+    """Показатели одного обработчика или метода"""
+
+    __slots__ = ('calls', 'errors', 'rows', 'total_time', 'buckets')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # последняя - +Inf
+
+
+class Registry:
+    """Потокобезопасное хранилище метрик (методы БД выполняются в потоках)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (вид, имя) -> Series
+
+    def observe(self, kind, name, seconds, error=False, rows=0):
+        with self._lock:
+            series = self._series.get((kind, name))
+            if series is None:
+                series = self._series[(kind, name)] = Series()
+            series.calls += 1
+            series.errors += error
+            series.rows += rows
+            series.total_time += seconds
+            series.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def count_error(self, kind, name):
+        with self._lock:
+            series = self._series.get((kind, name))
+            if series is None:
+                series = self._series[(kind, name)] = Series()
+            series.errors += 1
+
+    def render(self):
+        """Возвращает метрики в текстовом формате Prometheus"""
+        with self._lock:
+            snapshot = sorted(self._series.items())
+
+        lines = []
+        for kind, label in (('handler', 'handler'), ('db', 'method')):
+            prefix = f"carservice_{kind}"
+            items = [(name, series) for (series_kind, name), series in snapshot if series_kind == kind]
+
+            lines.append(f"# TYPE {prefix}_calls_total counter")
+            lines += [f'{prefix}_calls_total{{{label}="{name}"}} {s.calls}' for name, s in items]
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            lines += [f'{prefix}_errors_total{{{label}="{name}"}} {s.errors}' for name, s in items]
+            if kind == 'db':
+                lines.append(f"# TYPE {prefix}_rows_total counter")
+                lines += [f'{prefix}_rows_total{{{label}="{name}"}} {s.rows}' for name, s in items]
+
+            lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+            for name, s in items:
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), s.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_duration_seconds_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_duration_seconds_sum{{{label}="{name}"}} {s.total_time:.6f}')
+                lines.append(f'{prefix}_duration_seconds_count{{{label}="{name}"}} {s.calls}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def count_rows(result):
+    """Сколько строк вернул метод БД: строками считаются только элементы списка.
+
+    Кортежи - это составные результаты вроде (число отмененных, освобожденных),
+    а не строки выборки.
+    """
+    return len(result) if isinstance(result, list) else 0
+
+
+def instrument_handler(callback):
+    """Оборачивает callback обработчика бота сбором метрик"""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        error = False
+        try:
+            return await callback(update, context)
+        except Exception:
+            error = True
+            raise
+        finally:
+            registry.observe('handler', name, time.perf_counter() - started, error)
+
+    return wrapper
+
+
+def instrument_handlers(handlers):
+    for handler in handlers:
+        if isinstance(handler, ConversationHandler):
+            instrument_handlers(handler.entry_points)
+            for state_handlers in handler.states.values():
+                instrument_handlers(state_handlers)
+            instrument_handlers(handler.fallbacks)
+        else:
+            handler.callback = instrument_handler(handler.callback)
+
+
+def instrument_application(application):
+    """Подключает метрики ко всем зарегистрированным обработчикам приложения"""
+    for handlers in application.handlers.values():
+        instrument_handlers(handlers)
+
+
+# Метод Database, выполняющийся в текущем потоке: к нему относятся ошибки запросов
+_current = threading.local()
+
+
+def instrument_database(database):
+    """Оборачивает публичные методы экземпляра Database сбором метрик.
+
+    Методы Database перехватывают ошибки сами, поэтому ошибки считаются
+    в _execute и _executemany и относятся к вызвавшему их методу.
+    """
+    if getattr(database, '_instrumented', False):
+        return
+    database._instrumented = True
+
+    for name in dir(database):
+        method = getattr(database, name)
+        if name.startswith('_') or not callable(method):
+            continue
+        setattr(database, name, _instrument_method(name, method))
+
+    database._execute = _count_db_errors(database._execute)
+    database._executemany = _count_db_errors(database._executemany)
+
+
+def _count_db_errors(execute):
+    """Считает ошибки запросов к БД в метрике метода, который их выполнял"""
+    @functools.wraps(execute)
+    def wrapper(*args, **kwargs):
+        try:
+            return execute(*args, **kwargs)
+        except Exception:
+            registry.count_error('db', getattr(_current, 'method', None) or 'unknown')
+            raise
+
+    return wrapper
+
+
+def _instrument_method(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        # Вложенный вызов (get_available_time_slots -> get_free_slots) уже
+        # учтен во внешнем методе, его запросы и ошибки относятся к нему
+        if getattr(_current, 'method', None) is not None:
+            return method(*args, **kwargs)
+        _current.method = name
+        started = time.perf_counter()
+        error = False
+        result = None
+        try:
+            result = method(*args, **kwargs)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            _current.method = None
+            registry.observe('db', name, time.perf_counter() - started, error, count_rows(result))
+
+    return wrapper
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port):
+    """Запускает HTTP-сервер метрик (/metrics) в фоновом потоке"""
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Metrics server listening on port {port}")
+    return server
+
+
+def write_metrics_file(path):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(registry.render())
+    except OSError as e:
+        logging.error(f"Ошибка записи метрик в {path}: {e}")
+
+
+def start_metrics_dump(path, interval):
+    """Периодически пишет метрики в файл (и еще раз при выходе)"""
+    stop = threading.Event()
+
+    def dump():
+        while not stop.wait(interval):
+            write_metrics_file(path)
+
+    threading.Thread(target=dump, name="metrics-dump", daemon=True).start()
+    atexit.register(write_metrics_file, path)
+    logging.info(f"Metrics will be written to {path} every {interval}s")
+    return stop
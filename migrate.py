@@ -0,0 +1,140 @@
+"""Миграции схемы БД.
+
+Миграции лежат в migrations/<бэкенд>/NNNN_описание.sql и применяются по
+порядку номеров. Номер последней примененной миграции хранится в таблице
+schema_version. Каждая миграция выполняется в своей транзакции.
+
+Использование:
+    python migrate.py status    # текущая версия и неприменённые миграции
+    python migrate.py up        # применить все неприменённые миграции
+"""
+import os
+import sys
+import logging
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+SQL_CREATE_SCHEMA_VERSION = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def load_migrations(dialect):
+    """Возвращает список миграций бэкенда: [(версия, имя, SQL), ...]"""
+    directory = os.path.join(MIGRATIONS_DIR, dialect.name)
+    migrations = []
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.sql'):
+            continue
+        version = int(filename.split('_', 1)[0])
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            migrations.append((version, filename[:-4], f.read()))
+
+    return migrations
+
+
+def split_statements(script):
+    """Разбивает SQL-скрипт на отдельные запросы по ';'.
+
+    Куски только из пробелов и комментариев '--' (например, комментарий
+    после последнего запроса) пропускаются: psycopg2 отвергает пустой запрос.
+    """
+    return [statement.strip() for statement in script.split(';') if not _is_blank(statement)]
+
+
+def _is_blank(statement):
+    """True, если в куске скрипта нет ничего, кроме пробелов и комментариев '--'"""
+    return all(not line.strip() or line.strip().startswith('--') for line in statement.splitlines())
+
+
+def current_version(conn):
+    """Возвращает номер последней примененной миграции (0 - схема пустая)"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchone()[0] or 0
+    except Exception:
+        # Таблицы schema_version еще нет
+        conn.rollback()
+        return 0
+    finally:
+        cursor.close()
+
+
+def pending_migrations(conn, dialect):
+    """Возвращает миграции, которые еще не применены"""
+    version = current_version(conn)
+    return [migration for migration in load_migrations(dialect) if migration[0] > version]
+
+
+def apply_migrations(conn, dialect, data_steps=None):
+    """Применяет все неприменённые миграции. Возвращает их количество.
+
+    data_steps - {версия: функция(cursor)}: заполнение данных на Python
+    (например, по настройкам из config), выполняется в транзакции миграции.
+    """
+    data_steps = data_steps or {}
+    pending = pending_migrations(conn, dialect)
+    if not pending:
+        return 0
+
+    cursor = conn.cursor()
+    cursor.execute(SQL_CREATE_SCHEMA_VERSION)
+    conn.commit()
+
+    for version, name, script in pending:
+        logging.info(f"Applying migration {name}")
+        try:
+            for statement in split_statements(script):
+                cursor.execute(statement)
+            if version in data_steps:
+                data_steps[version](cursor)
+            cursor.execute(dialect.sql("INSERT INTO schema_version (version) VALUES (?)"), (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logging.error(f"Migration {name} failed")
+            raise
+
+    cursor.close()
+    return len(pending)
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'status'
+    if command not in ('status', 'up'):
+        print(__doc__)
+        return 1
+
+    # Не применяем миграции автоматически при подключении
+    os.environ['DB_AUTO_MIGRATE'] = '0'
+    from database import db
+
+    with db.pool.connection() as conn:
+        if command == 'up':
+            applied = apply_migrations(conn, db.dialect, db.data_migrations())
+            print(f"Применено миграций: {applied}")
+
+        print(f"Бэкенд: {db.dialect.name}")
+        print(f"Текущая версия схемы: {current_version(conn)}")
+        pending = pending_migrations(conn, db.dialect)
+        if pending:
+            print("Неприменённые миграции:")
+            for _, name, _ in pending:
+                print(f"  {name}")
+        else:
+            print("Схема актуальна")
+
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    sys.exit(main(sys.argv))
@@ -0,0 +1,9 @@
+-- Индексы для горячих запросов по записям
+
+-- Слоты и записи на дату (get_available_time_slots, get_appointments_by_date)
+CREATE INDEX IF NOT EXISTS idx_appointments_date_status ON appointments (appointment_date, status);
+
+-- Записи пользователя, сразу в порядке сортировки
+CREATE INDEX IF NOT EXISTS idx_appointments_user_date ON appointments (user_id, appointment_date, appointment_time);
+
+CREATE INDEX IF NOT EXISTS idx_appointments_status ON appointments (status);
@@ -0,0 +1,6 @@
+-- Дата и время записи: 'ДД.ММ.ГГГГ' -> DATE/TIME,
+-- чтобы диапазоны и сортировка по дате работали через индекс
+
+ALTER TABLE appointments
+    ALTER COLUMN appointment_date TYPE DATE USING to_date(appointment_date, 'DD.MM.YYYY'),
+    ALTER COLUMN appointment_time TYPE TIME USING appointment_time::time;
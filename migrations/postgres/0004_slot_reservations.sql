@@ -0,0 +1,26 @@
+-- Занятые слоты. Уникальный ключ (дата, время, пост) не дает дважды занять слот.
+-- appointment_id IS NULL - временная бронь на время оформления записи (до expires_at)
+
+CREATE TABLE IF NOT EXISTS slot_reservations (
+    id SERIAL PRIMARY KEY,
+    slot_date DATE NOT NULL,
+    slot_time TIME NOT NULL,
+    bay INTEGER NOT NULL DEFAULT 1,
+    user_id BIGINT NOT NULL,
+    appointment_id INTEGER,
+    expires_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (slot_date, slot_time, bay)
+);
+
+CREATE INDEX IF NOT EXISTS idx_slot_reservations_appointment ON slot_reservations (appointment_id);
+
+CREATE INDEX IF NOT EXISTS idx_slot_reservations_user ON slot_reservations (user_id);
+
+-- Существующие записи занимают свои слоты (дубликаты пропускаются)
+INSERT INTO slot_reservations (slot_date, slot_time, user_id, appointment_id)
+SELECT appointment_date, appointment_time, user_id, id
+FROM appointments
+WHERE status != 'cancelled' AND user_id IS NOT NULL
+ORDER BY id
+ON CONFLICT (slot_date, slot_time, bay) DO NOTHING;
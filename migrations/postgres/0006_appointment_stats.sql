@@ -0,0 +1,18 @@
+-- Счетчики записей по дням, услугам и статусам для админ-панели.
+-- Обновляются вместе с записями, поэтому статистика не сканирует appointments
+
+CREATE TABLE IF NOT EXISTS appointment_stats (
+    stat_date DATE NOT NULL,
+    service_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (stat_date, service_name, status)
+);
+
+DELETE FROM appointment_stats;
+
+INSERT INTO appointment_stats (stat_date, service_name, status, total)
+SELECT appointment_date, COALESCE(service_name, ''), COALESCE(status, 'pending'), COUNT(*)
+FROM appointments
+WHERE appointment_date IS NOT NULL
+GROUP BY appointment_date, COALESCE(service_name, ''), COALESCE(status, 'pending');
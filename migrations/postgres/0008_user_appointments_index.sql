@@ -0,0 +1,4 @@
+-- Записи пользователя постранично: ключ сортировки (дата, время, id) целиком в индексе
+DROP INDEX IF EXISTS idx_appointments_user_date;
+
+CREATE INDEX IF NOT EXISTS idx_appointments_user_date_time_id ON appointments (user_id, appointment_date, appointment_time, id);
@@ -0,0 +1,7 @@
+-- Длительность услуги: сколько подряд идущих слотов она занимает на посту
+
+ALTER TABLE services ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT 60;
+
+UPDATE services SET duration_minutes = 120 WHERE name LIKE '%Ремонт двигателя%';
+
+UPDATE services SET duration_minutes = 180 WHERE name LIKE '%Кузовные работы%';
@@ -0,0 +1,20 @@
+-- Уведомления администраторам о записях (outbox). Строка на каждого получателя
+-- пишется в той же транзакции, что и запись, а отправляет их фоновый обработчик.
+-- status: pending - ждет отправки (не раньше next_attempt_at), sent - отправлено,
+-- dead - отправить не удалось (ошибка Telegram или исчерпаны попытки)
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id SERIAL PRIMARY KEY,
+    chat_id BIGINT NOT NULL,
+    kind TEXT NOT NULL,
+    appointment_id INTEGER,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+ON notification_outbox (next_attempt_at) WHERE status = 'pending';
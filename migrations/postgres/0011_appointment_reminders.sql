@@ -0,0 +1,29 @@
+-- Напоминания клиентам о записи: строка на каждый срок (offset_minutes до начала).
+-- status: pending - ждет remind_at, claimed - взято обработчиком claimed_by,
+-- sent - отправлено, skipped - не актуально (запись отменена или срок прошел),
+-- failed - отправить не удалось
+
+CREATE TABLE IF NOT EXISTS appointment_reminders (
+    id SERIAL PRIMARY KEY,
+    appointment_id INTEGER NOT NULL,
+    user_id BIGINT NOT NULL,
+    offset_minutes INTEGER NOT NULL,
+    remind_at TIMESTAMP NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at TIMESTAMP,
+    UNIQUE (appointment_id, offset_minutes)
+);
+
+-- Очередь на отправку: только ожидающие напоминания, по времени
+CREATE INDEX IF NOT EXISTS idx_appointment_reminders_due
+ON appointment_reminders (remind_at) WHERE status = 'pending';
+
+-- Взятые, но не завершенные (обработчик упал) - для возврата в очередь
+CREATE INDEX IF NOT EXISTS idx_appointment_reminders_claimed
+ON appointment_reminders (claimed_at) WHERE status = 'claimed';
+
+-- Напоминания для уже созданных предстоящих записей добавляет шаг на Python
+-- (Database.backfill_reminders) в той же транзакции - по текущим
+-- REMINDER_OFFSETS, как и для новых записей
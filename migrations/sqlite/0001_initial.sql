@@ -0,0 +1,47 @@
+-- Базовая схема: пользователи, услуги, записи
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    phone TEXT,
+    car_brand TEXT,
+    car_model TEXT,
+    car_year INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT,
+    price_range TEXT
+);
+
+CREATE TABLE IF NOT EXISTS appointments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    service_id INTEGER,
+    service_name TEXT,
+    appointment_date TEXT,
+    appointment_time TEXT,
+    car_brand TEXT,
+    car_model TEXT,
+    car_year INTEGER,
+    phone TEXT,
+    comment TEXT,
+    status TEXT DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Стандартные услуги (только в пустую таблицу)
+INSERT INTO services (name, description, price_range)
+SELECT v.column1, v.column2, v.column3
+FROM (VALUES
+    ('🛢 Техническое обслуживание', 'Замена масла, фильтров, общее ТО', 'от 2000 руб'),
+    ('🔧 Ремонт двигателя', 'Диагностика и ремонт двигателя', 'от 5000 руб'),
+    ('🛞 Шиномонтаж', 'Замена и балансировка шин', 'от 1500 руб'),
+    ('🎨 Кузовные работы', 'Покраска, ремонт вмятин', 'от 3000 руб'),
+    ('⚡ Диагностика', 'Компьютерная диагностика авто', 'от 1000 руб')
+) AS v
+WHERE NOT EXISTS (SELECT 1 FROM services);
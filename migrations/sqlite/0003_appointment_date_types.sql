@@ -0,0 +1,6 @@
+-- Дата записи: 'ДД.ММ.ГГГГ' -> ISO 'ГГГГ-ММ-ДД',
+-- чтобы диапазоны и сортировка по дате работали через индекс
+
+UPDATE appointments
+SET appointment_date = substr(appointment_date, 7, 4) || '-' || substr(appointment_date, 4, 2) || '-' || substr(appointment_date, 1, 2)
+WHERE appointment_date LIKE '__.__.____';
@@ -0,0 +1,9 @@
+-- Данные незавершенной записи пользователя (STATE_BACKEND=db)
+
+CREATE TABLE IF NOT EXISTS conversation_state (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_state_expires ON conversation_state (expires_at);
@@ -0,0 +1,3 @@
+-- Ключ сортировки списков записей для keyset-пагинации
+
+CREATE INDEX IF NOT EXISTS idx_appointments_date_time_id ON appointments (appointment_date, appointment_time, id);
@@ -0,0 +1,5 @@
+-- Поиск неподтвержденных записей для автоматической отмены: индекс только
+-- по ожидающим (их немного), а не по всей истории записей
+
+CREATE INDEX IF NOT EXISTS idx_appointments_pending
+ON appointments (appointment_date, appointment_time) WHERE status = 'pending';
@@ -0,0 +1,12 @@
+-- Шаг диалога записи (состояние ConversationHandler) для STATE_BACKEND=db:
+-- после перезапуска бота пользователь продолжает запись с того же шага
+
+CREATE TABLE IF NOT EXISTS conversation_handler_state (
+    name TEXT NOT NULL,
+    conversation_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (name, conversation_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_handler_state_expires ON conversation_handler_state (expires_at);
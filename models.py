@@ -0,0 +1,93 @@
+class Record:
+    """Строка результата запроса.
+
+    Хранит значения в __slots__ (без словаря на каждый объект) и при этом
+    поддерживает доступ как к словарю: record['name'], record.get('name'),
+    dict(record). Порядок полей в __slots__ совпадает с порядком колонок
+    в запросе, поэтому строка драйвера передается в конструктор как есть.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.__slots__
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={self[key]!r}" for key in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Service(Record):
+    """Услуга автосервиса"""
+
+    __slots__ = ('id', 'name', 'description', 'price_range', 'duration_minutes')
+
+    def __init__(self, id, name, description, price_range, duration_minutes):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.price_range = price_range
+        self.duration_minutes = duration_minutes
+
+
+class Appointment(Record):
+    """Запись на услугу (first_name и username - из users, если запрос их выбирает)"""
+
+    __slots__ = (
+        'id', 'user_id', 'service_id', 'service_name', 'appointment_date', 'appointment_time',
+        'car_brand', 'car_model', 'car_year', 'phone', 'comment', 'status', 'created_at',
+        'first_name', 'username'
+    )
+
+    def __init__(self, id, user_id, service_id, service_name, appointment_date, appointment_time,
+                 car_brand, car_model, car_year, phone, comment, status, created_at,
+                 first_name=None, username=None):
+        self.id = id
+        self.user_id = user_id
+        self.service_id = service_id
+        self.service_name = service_name
+        self.appointment_date = appointment_date
+        self.appointment_time = appointment_time
+        self.car_brand = car_brand
+        self.car_model = car_model
+        self.car_year = car_year
+        self.phone = phone
+        self.comment = comment
+        self.status = status
+        self.created_at = created_at
+        self.first_name = first_name
+        self.username = username
+
+
+class Reminder(Record):
+    """Напоминание о записи вместе с данными самой записи"""
+
+    __slots__ = (
+        'id', 'user_id', 'offset_minutes', 'remind_at', 'attempts',
+        'appointment_id', 'service_name', 'appointment_date', 'appointment_time', 'status'
+    )
+
+    def __init__(self, id, user_id, offset_minutes, remind_at, attempts,
+                 appointment_id, service_name, appointment_date, appointment_time, status):
+        self.id = id
+        self.user_id = user_id
+        self.offset_minutes = offset_minutes
+        self.remind_at = remind_at
+        self.attempts = attempts
+        self.appointment_id = appointment_id
+        self.service_name = service_name
+        self.appointment_date = appointment_date
+        self.appointment_time = appointment_time
+        self.status = status
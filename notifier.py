@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest, Forbidden, InvalidToken
+
+from config import (
+    ADMIN_IDS, NOTIFY_INTERVAL, NOTIFY_BATCH_SIZE, NOTIFY_MAX_ATTEMPTS, NOTIFY_RETRY_SECONDS, NOTIFY_KEEP_DAYS
+)
+from database import async_db
+
+# Предел длины сообщения Telegram
+MESSAGE_LIMIT = 4096
+# Как часто удалять старые отправленные уведомления, секунды
+PURGE_INTERVAL = 3600
+# Ошибки, при которых повтор не поможет (бот заблокирован, чат не найден и т.п.)
+PERMANENT_ERRORS = (BadRequest, Forbidden, InvalidToken)
+
+STATUS_TITLES = {
+    'confirmed': "✅ Запись #{id} подтверждена",
+    'cancelled': "❌ Запись #{id} отменена",
+    'completed': "🏁 Запись #{id} выполнена",
+    'pending': "⏳ Запись #{id} снова ожидает подтверждения",
+    'expired': "⌛ Запись #{id} отменена автоматически: не подтверждена вовремя",
+}
+
+# Уведомления клиентам (вид client_*): без кнопок админ-панели
+CLIENT_TITLES = {
+    'client_expired': (
+        "⌛ Ваша запись не была подтверждена вовремя и отменена.\n"
+        "Пожалуйста, запишитесь на другое время или позвоните нам: +7 (495) 123-45-67"
+    ),
+}
+
+
+def format_notification(kind, appointment_id, payload):
+    """Текст уведомления о записи"""
+    if kind == 'new':
+        text = (
+            f"🆕 Новая запись #{appointment_id}\n"
+            f"🚗 {payload['service_name']}\n"
+            f"📅 {payload['date']} 🕒 {payload['time']}\n"
+        )
+        client = payload.get('first_name') or ''
+        if payload.get('username'):
+            client += f" (@{payload['username']})"
+        if client:
+            text += f"👤 {client.strip()}\n"
+        text += f"🎯 {payload['car']}\n📱 {payload['phone']}"
+        if payload.get('comment'):
+            text += f"\n💬 {payload['comment']}"
+        return text
+
+    if kind in CLIENT_TITLES:
+        return f"{CLIENT_TITLES[kind]}\n🚗 {payload['service_name']}, {payload['date']} {payload['time']}"
+
+    title = STATUS_TITLES.get(kind, f"Запись #{{id}}: {kind}").format(id=appointment_id)
+    return f"{title}\n🚗 {payload['service_name']}, {payload['date']} {payload['time']}"
+
+
+def pack_messages(items):
+    """Склеивает уведомления одного чата в сообщения до MESSAGE_LIMIT символов.
+
+    items - [(id уведомления, текст), ...]; возвращает [([id, ...], текст), ...].
+    """
+    messages = []
+    ids, text = [], ''
+    for notification_id, item in items:
+        item = item[:MESSAGE_LIMIT]
+        if text and len(text) + 2 + len(item) > MESSAGE_LIMIT:
+            messages.append((ids, text))
+            ids, text = [], ''
+        ids.append(notification_id)
+        text = f"{text}\n\n{item}" if text else item
+    if ids:
+        messages.append((ids, text))
+    return messages
+
+
+class NotificationWorker:
+    """Рассылка уведомлений администраторам (и клиентам) из outbox.
+
+    Уведомления пишутся в notification_outbox вместе с записью (см.
+    Database._enqueue_notifications), поэтому не теряются при падении бота.
+    Раз в NOTIFY_INTERVAL секунд (или сразу после wake()) обработчик берет
+    пачку готовых к отправке уведомлений, склеивает их по получателям и
+    отправляет по одному сообщению на администратора - частоту ограничивает
+    rate limiter бота. Неудачная отправка повторяется с удвоением паузы,
+    после NOTIFY_MAX_ATTEMPTS попыток или при постоянной ошибке Telegram
+    уведомление остается в outbox со статусом dead.
+
+    Рассчитан на один процесс бота: уведомления не блокируются на время
+    отправки, два процесса разослали бы их дважды.
+    """
+
+    def __init__(self, interval=NOTIFY_INTERVAL, batch_size=NOTIFY_BATCH_SIZE,
+                 max_attempts=NOTIFY_MAX_ATTEMPTS, retry_seconds=NOTIFY_RETRY_SECONDS):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self._bot = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def wake(self):
+        """Просит отправить уведомления, не дожидаясь очередного опроса"""
+        self._wakeup.set()
+
+    async def _send(self, chat_id, ids, text, attempts):
+        keyboard = None
+        if chat_id in ADMIN_IDS:
+            keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("📅 Записи на сегодня", callback_data="admin_today")]])
+        try:
+            await self._bot.send_message(chat_id=chat_id, text=text, reply_markup=keyboard)
+        except PERMANENT_ERRORS as e:
+            logging.error(f"Уведомления {ids} для {chat_id} не доставлены: {e}")
+            await async_db.mark_notifications_failed(ids, e)
+            return False
+        except Exception as e:
+            retry_at = None
+            if attempts + 1 < self.max_attempts:
+                retry_at = datetime.now() + timedelta(seconds=self.retry_seconds * 2 ** attempts)
+            logging.warning(f"Ошибка отправки уведомлений {ids} для {chat_id} (попытка {attempts + 1}): {e}")
+            await async_db.mark_notifications_failed(ids, e, retry_at)
+            return False
+
+        await async_db.mark_notifications_sent(ids)
+        return True
+
+    async def deliver(self):
+        """Отправляет все готовые уведомления; возвращает число отправленных"""
+        sent = 0
+        while True:
+            rows = await async_db.get_due_notifications(self.batch_size)
+            if not rows:
+                return sent
+
+            by_chat = {}  # chat_id -> [(id уведомления, текст), ...]
+            attempts = {}  # chat_id -> наибольшее число попыток в пачке
+            for notification_id, chat_id, kind, appointment_id, payload, tried in rows:
+                by_chat.setdefault(chat_id, []).append(
+                    (notification_id, format_notification(kind, appointment_id, payload))
+                )
+                attempts[chat_id] = max(attempts.get(chat_id, 0), tried)
+
+            messages = [
+                (chat_id, ids, text)
+                for chat_id, items in by_chat.items()
+                for ids, text in pack_messages(items)
+            ]
+            results = await asyncio.gather(*(
+                self._send(chat_id, ids, text, attempts[chat_id]) for chat_id, ids, text in messages
+            ))
+            delivered = sum(len(ids) for (_, ids, _), ok in zip(messages, results) if ok)
+            sent += delivered
+            # Неполная пачка - очередь разобрана; без успешных отправок не крутимся впустую
+            if len(rows) < self.batch_size or not delivered:
+                return sent
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        purged_at = None
+        while True:
+            if purged_at is None or loop.time() - purged_at >= PURGE_INTERVAL:
+                await async_db.purge_notifications(NOTIFY_KEEP_DAYS)
+                purged_at = loop.time()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.deliver()
+            except Exception as e:
+                logging.error(f"Ошибка рассылки уведомлений: {e}")
+
+    def start(self, bot):
+        """Запускает фоновую рассылку (вызывается после старта приложения)"""
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Notification worker started (every {self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+notifications = NotificationWorker()
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from config import PENDING_EXPIRE_HOURS, PENDING_SWEEP_INTERVAL, PENDING_SWEEP_BATCH_SIZE, SLOT_MINUTES
+from database import async_db
+from notifier import notifications
+
+
+class PendingSweeper:
+    """Автоматическая отмена записей, не подтвержденных вовремя.
+
+    Раз в PENDING_SWEEP_INTERVAL секунд отменяет пачками записи в статусе
+    pending, до начала которых осталось меньше PENDING_EXPIRE_HOURS часов
+    (и уже прошедшие сегодня - записи прошлых дней не трогаются). Слоты
+    освобождаются в той же транзакции, карты занятости обновляются, клиенту
+    и администраторам уходят уведомления через outbox. В stats копится,
+    сколько записей отменено и сколько еще не наступивших слотов (часов
+    работы постов) освобождено с запуска.
+
+    clock - источник текущего времени (benchmarks/pending_check.py
+    подменяет его управляемыми часами).
+    """
+
+    def __init__(self, expire_hours=PENDING_EXPIRE_HOURS, interval=PENDING_SWEEP_INTERVAL,
+                 batch_size=PENDING_SWEEP_BATCH_SIZE, clock=datetime.now):
+        self.expire_after = timedelta(hours=expire_hours)
+        self.interval = interval
+        self.batch_size = batch_size
+        self.clock = clock
+        self.stats = {'expired': 0, 'slots': 0, 'runs': 0}
+        self._task = None
+
+    @property
+    def reclaimed_hours(self):
+        return self.stats['slots'] * SLOT_MINUTES / 60
+
+    async def sweep(self):
+        """Отменяет все просроченные записи; возвращает (отменено записей, освобождено слотов)"""
+        now = self.clock()
+        deadline = now + self.expire_after
+        expired = slots = 0
+        while True:
+            result, reclaimed = await async_db.expire_pending_appointments(now, deadline, self.batch_size)
+            expired += len(result)
+            slots += reclaimed
+            if len(result) < self.batch_size:
+                break
+
+        self.stats['runs'] += 1
+        self.stats['expired'] += expired
+        self.stats['slots'] += slots
+        if expired:
+            logging.info(
+                f"Pending sweep: expired {expired} appointments, reclaimed {slots} slots "
+                f"({slots * SLOT_MINUTES / 60:g} h); since start {self.stats['expired']} / {self.reclaimed_hours:g} h"
+            )
+            notifications.wake()
+        return expired, slots
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logging.error(f"Ошибка автоотмены записей: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Запускает фоновую проверку (вызывается после старта приложения)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Pending sweeper started (every {self.interval}s, deadline {self.expire_after} before start)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pending_sweeper = PendingSweeper()
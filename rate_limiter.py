@@ -0,0 +1,202 @@
+import random
+import asyncio
+import logging
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    RATE_LIMIT_GLOBAL, RATE_LIMIT_PER_CHAT, RATE_LIMIT_CHAT_BURST,
+    RATE_LIMIT_GROUP_PER_MINUTE, RATE_LIMIT_MAX_RETRIES, RATE_LIMIT_JITTER
+)
+
+# Ответы на нажатия кнопок и служебные методы не ограничиваем
+UNLIMITED_ENDPOINTS = frozenset({
+    'answerCallbackQuery', 'answerInlineQuery', 'getMe', 'getUpdates',
+    'setWebhook', 'deleteWebhook', 'getWebhookInfo', 'close', 'logOut',
+})
+
+# Правки сообщения, из которых при очереди достаточно отправить последнюю
+COALESCED_ENDPOINTS = frozenset({
+    'editMessageText', 'editMessageCaption', 'editMessageReplyMarkup', 'editMessageMedia',
+})
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate запросов в секунду, всплеск до capacity.
+
+    Токены резервируются в долг: reserve() сразу возвращает, сколько ждать
+    своей очереди, поэтому блокировка не нужна (все в одном цикле событий).
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'paused_until')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.paused_until = 0.0  # до какого момента Telegram попросил подождать
+
+    def reserve(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self, now):
+        """Бакет полон и не на паузе - его можно забыть"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity and self.paused_until <= now
+
+
+class PendingEdit:
+    """Правка сообщения, ожидающая отправки; более новая правка подменяет запрос"""
+
+    __slots__ = ('request', 'waiters', 'future')
+
+    def __init__(self, request, future):
+        self.request = request  # (callback, args, kwargs)
+        self.waiters = 0
+        self.future = future
+
+
+class FloodControlRateLimiter(BaseRateLimiter):
+    """Ограничение исходящих запросов к Bot API.
+
+    - общий лимит global_rate запросов в секунду на бота;
+    - лимит на чат: chat_rate в секунду (всплеск до chat_burst) для личных
+      чатов и group_per_minute в минуту для групп;
+    - на 429 (RetryAfter) чат (или весь бот, если чата нет) ставится на паузу
+      на retry_after плюс случайную добавку до jitter секунд, чтобы ожидавшие
+      запросы не ушли разом, после чего запрос повторяется до max_retries раз;
+    - если правка сообщения еще ждет очереди, а для того же сообщения пришла
+      новая, отправляется только последняя, оба вызова получают ее результат.
+    """
+
+    def __init__(self, global_rate=RATE_LIMIT_GLOBAL, chat_rate=RATE_LIMIT_PER_CHAT,
+                 chat_burst=RATE_LIMIT_CHAT_BURST, group_per_minute=RATE_LIMIT_GROUP_PER_MINUTE,
+                 max_retries=RATE_LIMIT_MAX_RETRIES, jitter=RATE_LIMIT_JITTER):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_per_minute / 60
+        self.max_retries = max_retries
+        self.jitter = jitter
+        self._global = None
+        self._chats = {}  # chat_id -> TokenBucket
+        self._edits = {}  # (метод, чат, сообщение) -> PendingEdit
+        self.stats = {'throttled': 0, 'retry_after': 0, 'coalesced': 0}
+
+    async def initialize(self):
+        # Общий лимит без всплеска: запросы идут равномерно, не больше global_rate за любую секунду
+        self._global = TokenBucket(self.global_rate, 1, asyncio.get_running_loop().time())
+
+    async def shutdown(self):
+        self._chats.clear()
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 10000:
+                # Забываем чаты, которые давно ничего не получали
+                for idle_id in [key for key, value in self._chats.items() if value.idle(now)]:
+                    del self._chats[idle_id]
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate, 1, now)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    async def _throttle(self, chat_id):
+        """Ждет своей очереди по общему лимиту и лимиту чата, а также конца паузы после 429"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        buckets = [self._global]
+        if chat_id is not None:
+            buckets.append(self._chat_bucket(chat_id, now))
+
+        delay = max(bucket.reserve(now) for bucket in buckets)
+        if delay > 0:
+            self.stats['throttled'] += 1
+            await asyncio.sleep(delay)
+
+        # Пауза могла начаться, пока запрос ждал очереди
+        while True:
+            remaining = max(bucket.paused_until for bucket in buckets) - loop.time()
+            if remaining <= 0:
+                return
+            await asyncio.sleep(remaining)
+
+    def _pause(self, chat_id, retry_after):
+        bucket = self._global if chat_id is None else self._chat_bucket(chat_id, asyncio.get_running_loop().time())
+        until = asyncio.get_running_loop().time() + retry_after + random.uniform(0, self.jitter)
+        bucket.paused_until = max(bucket.paused_until, until)
+
+    async def _send(self, chat_id, callback, args, kwargs, endpoint, max_retries, throttled=False):
+        attempt = 0
+        while True:
+            if not throttled:
+                await self._throttle(chat_id)
+            throttled = False
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                self.stats['retry_after'] += 1
+                attempt += 1
+                if attempt > max_retries:
+                    logging.error(f"{endpoint} to chat {chat_id}: flood control, giving up after {attempt} attempts")
+                    raise
+                logging.warning(f"{endpoint} to chat {chat_id}: flood control, retry in {e.retry_after}s")
+                self._pause(chat_id, e.retry_after)
+
+    async def _send_edit(self, key, chat_id, callback, args, kwargs, endpoint, max_retries):
+        pending = self._edits.get(key)
+        if pending is not None:
+            # Предыдущая правка еще в очереди - отправится эта, вместо нее
+            self.stats['coalesced'] += 1
+            pending.request = (callback, args, kwargs)
+            pending.waiters += 1
+            return await asyncio.shield(pending.future)
+
+        pending = self._edits[key] = PendingEdit((callback, args, kwargs), asyncio.get_running_loop().create_future())
+        try:
+            try:
+                await self._throttle(chat_id)
+            finally:
+                # Правки, пришедшие после этой точки, пойдут отдельным запросом
+                del self._edits[key]
+
+            callback, args, kwargs = pending.request
+            result = await self._send(chat_id, callback, args, kwargs, endpoint, max_retries, throttled=True)
+            if pending.waiters:
+                pending.future.set_result(result)
+            return result
+        except Exception as e:
+            if pending.waiters:
+                pending.future.set_exception(e)
+            raise
+        finally:
+            # Отмена первого вызова (CancelledError) не должна оставить ждущих навсегда
+            if not pending.future.done():
+                pending.future.cancel()
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in UNLIMITED_ENDPOINTS:
+            return await callback(*args, **kwargs)
+
+        # rate_limit_args - число повторов на 429 для конкретного вызова
+        max_retries = self.max_retries if rate_limit_args is None else rate_limit_args
+        chat_id = data.get('chat_id')
+
+        if endpoint in COALESCED_ENDPOINTS:
+            message = data.get('inline_message_id') or data.get('message_id')
+            if message is not None:
+                key = (endpoint, chat_id, message)
+                return await self._send_edit(key, chat_id, callback, args, kwargs, endpoint, max_retries)
+
+        return await self._send(chat_id, callback, args, kwargs, endpoint, max_retries)
+
+
+def create_rate_limiter():
+    return FloodControlRateLimiter()
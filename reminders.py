@@ -0,0 +1,144 @@
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from telegram.error import BadRequest, Forbidden
+
+from config import (
+    REMINDER_INTERVAL, REMINDER_BATCH_SIZE, REMINDER_MAX_LATE_MINUTES, REMINDER_MAX_ATTEMPTS,
+    PENDING_EXPIRE_HOURS
+)
+from database import async_db
+
+# Ошибки, при которых повтор не поможет (клиент заблокировал бота и т.п.)
+PERMANENT_ERRORS = (BadRequest, Forbidden)
+
+
+def format_reminder(reminder):
+    """Текст напоминания клиенту"""
+    if reminder.offset_minutes >= 1440 and reminder.offset_minutes % 1440 == 0:
+        when = "завтра" if reminder.offset_minutes == 1440 else f"через {reminder.offset_minutes // 1440} дн."
+    elif reminder.offset_minutes >= 60:
+        when = f"через {reminder.offset_minutes // 60} ч"
+    else:
+        when = f"через {reminder.offset_minutes} мин"
+
+    return (
+        f"⏰ Напоминаем: {when} у вас запись в автосервис 'АвтоМастер'.\n\n"
+        f"🚗 Услуга: {reminder.service_name}\n"
+        f"📅 Дата: {reminder.appointment_date}\n"
+        f"🕒 Время: {reminder.appointment_time}\n\n"
+        "📞 Для переноса или отмены звоните: +7 (495) 123-45-67"
+    )
+
+
+class ReminderWorker:
+    """Отправка напоминаний клиентам о предстоящих записях.
+
+    Напоминания создаются вместе с записью (Database._schedule_reminders)
+    за REMINDER_OFFSETS минут до начала. Раз в REMINDER_INTERVAL секунд
+    обработчик захватывает пачку наступивших напоминаний (атомарно, поэтому
+    несколько процессов бота не отправят одно напоминание дважды) и
+    рассылает их. Напоминания об отмененных записях и опоздавшие больше чем
+    на REMINDER_MAX_LATE_MINUTES (бот был выключен) пропускаются, как и
+    напоминания о неподтвержденных записях, которые вот-вот отменит
+    автоотмена (за PENDING_EXPIRE_HOURS до начала).
+
+    clock - источник текущего времени, в проверках подменяется управляемыми часами.
+    """
+
+    def __init__(self, interval=REMINDER_INTERVAL, batch_size=REMINDER_BATCH_SIZE,
+                 max_late_minutes=REMINDER_MAX_LATE_MINUTES, max_attempts=REMINDER_MAX_ATTEMPTS,
+                 clock=datetime.now, worker_id=None):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_late = timedelta(minutes=max_late_minutes)
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.worker_id = worker_id or uuid.uuid4().hex[:12]
+        self._bot = None
+        self._task = None
+
+    def _outdated(self, reminder, now):
+        if reminder.status not in ('pending', 'confirmed'):
+            return True
+        starts_at = datetime.strptime(
+            f"{reminder.appointment_date} {reminder.appointment_time}", "%d.%m.%Y %H:%M"
+        )
+        if reminder.status == 'pending' and now >= starts_at - timedelta(hours=PENDING_EXPIRE_HOURS):
+            return True
+        return now >= starts_at or now - reminder.remind_at > self.max_late
+
+    async def _send(self, reminder):
+        """Отправляет напоминание; возвращает новый статус"""
+        try:
+            await self._bot.send_message(chat_id=reminder.user_id, text=format_reminder(reminder))
+            return 'sent'
+        except PERMANENT_ERRORS as e:
+            logging.warning(f"Reminder {reminder.id} to {reminder.user_id} failed: {e}")
+            return 'failed'
+        except Exception as e:
+            logging.warning(f"Reminder {reminder.id} to {reminder.user_id} failed (attempt {reminder.attempts + 1}): {e}")
+            return 'failed' if reminder.attempts + 1 >= self.max_attempts else 'pending'
+
+    async def run_once(self):
+        """Обрабатывает одну пачку напоминаний; возвращает {статус: количество}"""
+        now = self.clock()
+        reminders = await async_db.claim_due_reminders(self.worker_id, now, self.batch_size)
+
+        outcome = {}
+        to_send = []
+        for reminder in reminders:
+            if self._outdated(reminder, now):
+                outcome.setdefault('skipped', []).append(reminder.id)
+            else:
+                to_send.append(reminder)
+
+        statuses = await asyncio.gather(*(self._send(reminder) for reminder in to_send))
+        for reminder, status in zip(to_send, statuses):
+            outcome.setdefault(status, []).append(reminder.id)
+
+        for status, ids in outcome.items():
+            await async_db.finish_reminders(self.worker_id, ids, status)
+        return {status: len(ids) for status, ids in outcome.items()}
+
+    async def run_pending(self):
+        """Обрабатывает пачки, пока очередь наступивших напоминаний не опустеет"""
+        total = {}
+        while True:
+            counts = await self.run_once()
+            for status, count in counts.items():
+                total[status] = total.get(status, 0) + count
+            # Неудачные возвращаются в очередь - их повторим в следующий опрос
+            if sum(counts.values()) < self.batch_size or counts.get('pending'):
+                return total
+
+    async def _run(self):
+        while True:
+            try:
+                counts = await self.run_pending()
+                if counts:
+                    logging.info(f"Reminders processed: {counts}")
+            except Exception as e:
+                logging.error(f"Ошибка рассылки напоминаний: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, bot):
+        """Запускает фоновую рассылку (вызывается после старта приложения)"""
+        self._bot = bot
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Reminder worker {self.worker_id} started (every {self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reminders = ReminderWorker()
@@ -0,0 +1,68 @@
+import logging
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+from database import db, async_db
+
+
+class ServiceCatalog:
+    """Кэш справочника услуг.
+
+    Услуги почти не меняются, поэтому загружаются один раз: список,
+    индекс по id и готовая клавиатура выбора услуги. После изменения
+    таблицы services нужно вызвать invalidate() - кэш перезагрузится
+    при следующем обращении.
+    """
+
+    def __init__(self):
+        self._services = None
+        self._by_id = {}
+        self._keyboard = None
+
+    def _fill(self, services):
+        # Пустой список - скорее всего ошибка БД, не кэшируем его
+        if not services:
+            return
+
+        self._services = services
+        self._by_id = {service['id']: service for service in services}
+        self._keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton(
+                f"{service['name']} ({service['price_range']})",
+                callback_data=f"select_service_{service['id']}"
+            )]
+            for service in services
+        ])
+        logging.info(f"Service catalog loaded: {len(services)} services")
+
+    def load(self):
+        """Загружает услуги синхронно (при запуске бота)"""
+        self._fill(db.get_services())
+        return self._services or []
+
+    async def _ensure_loaded(self):
+        if self._services is None:
+            self._fill(await async_db.get_services())
+
+    def invalidate(self):
+        """Сбрасывает кэш после изменения услуг"""
+        self._services = None
+        self._by_id = {}
+        self._keyboard = None
+
+    async def all(self):
+        """Возвращает список всех услуг"""
+        await self._ensure_loaded()
+        return self._services or []
+
+    async def get(self, service_id):
+        """Возвращает услугу по id или None"""
+        await self._ensure_loaded()
+        return self._by_id.get(service_id)
+
+    async def keyboard(self):
+        """Возвращает клавиатуру выбора услуги"""
+        await self._ensure_loaded()
+        return self._keyboard or InlineKeyboardMarkup([])
+
+
+service_catalog = ServiceCatalog()
@@ -0,0 +1,198 @@
+"""Расчет свободных слотов по битовым картам занятости.
+
+Рабочий день делится на слоты одинаковой длины (SlotGrid). Занятость
+каждого поста за день хранится как целое число: бит i установлен, если
+i-й слот занят записью или действующей временной бронью. Услуга
+длительностью в несколько слотов помещается туда, где на одном посту
+подряд свободно нужное число слотов, - это несколько сдвигов и AND.
+
+SlotEngine кэширует карты по дням. Дни загружаются из slot_reservations
+одним запросом на диапазон дат и обновляются на месте при бронировании,
+записи и отмене. Запись через уникальный ключ slot_reservations остается
+единственным источником истины, кэш нужен только для показа слотов.
+"""
+import math
+import time
+import threading
+from datetime import datetime
+
+
+def to_minutes(value):
+    """'ЧЧ:ММ' -> минуты от начала суток"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class SlotGrid:
+    """Сетка слотов рабочего дня"""
+
+    def __init__(self, day_start, day_end, slot_minutes, breaks=(), work_days=(0, 1, 2, 3, 4)):
+        self.slot_minutes = slot_minutes
+        self.work_days = frozenset(work_days)
+
+        breaks = [(to_minutes(start), to_minutes(end)) for start, end in breaks]
+        start, end = to_minutes(day_start), to_minutes(day_end)
+        # Слот не должен пересекаться с перерывом и выходить за конец дня
+        self.minutes = [
+            minute for minute in range(start, end - slot_minutes + 1, slot_minutes)
+            if not any(minute < break_end and minute + slot_minutes > break_start
+                       for break_start, break_end in breaks)
+        ]
+        self.times = [f"{minute // 60:02d}:{minute % 60:02d}" for minute in self.minutes]
+        self.index = {slot_time: i for i, slot_time in enumerate(self.times)}
+        self.full = (1 << len(self.times)) - 1
+        self._starts = {}
+
+    def length(self, duration_minutes=None):
+        """Сколько слотов занимает услуга"""
+        if not duration_minutes:
+            return 1
+        return max(1, math.ceil(duration_minutes / self.slot_minutes))
+
+    def valid_starts(self, length):
+        """Маска слотов, с которых можно начать работу длиной length слотов без разрыва"""
+        mask = self._starts.get(length)
+        if mask is None:
+            mask = 0
+            for i, minute in enumerate(self.minutes[:len(self.minutes) - length + 1]):
+                if self.minutes[i + length - 1] == minute + (length - 1) * self.slot_minutes:
+                    mask |= 1 << i
+            self._starts[length] = mask
+        return mask
+
+    def span(self, start_time, duration_minutes=None):
+        """Слоты работы, начинающейся в start_time, или None, если она не помещается"""
+        i = self.index.get(start_time)
+        length = self.length(duration_minutes)
+        if i is None or not self.valid_starts(length) >> i & 1:
+            return None
+        return self.times[i:i + length]
+
+    def mask(self, times):
+        """Битовая маска набора слотов (время вне сетки пропускается)"""
+        mask = 0
+        for slot_time in times:
+            i = self.index.get(slot_time)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def is_working_day(self, day):
+        return day.weekday() in self.work_days
+
+
+class DayOccupancy:
+    """Занятость постов за один день"""
+
+    __slots__ = ('booked', 'holds', 'loaded_at')
+
+    def __init__(self, bays):
+        self.booked = [0] * (bays + 1)  # индекс - номер поста (с 1)
+        self.holds = {}  # (пост, номер слота) -> срок временной брони
+        self.loaded_at = time.monotonic()
+
+    def occupied(self, bay, now):
+        mask = self.booked[bay]
+        for (hold_bay, i), expires_at in self.holds.items():
+            if hold_bay == bay and expires_at > now:
+                mask |= 1 << i
+        return mask
+
+
+class SlotEngine:
+    """Кэш карт занятости по дням (ключ - дата в ISO-формате)"""
+
+    def __init__(self, grid, bays=1, ttl=300):
+        self.grid = grid
+        self.bays = bays
+        self.ttl = ttl
+        self._days = {}
+        self._lock = threading.Lock()
+
+    def stale(self, days):
+        """Возвращает дни, которых нет в кэше или которые пора перечитать"""
+        expired_before = time.monotonic() - self.ttl
+        with self._lock:
+            return [day for day in days
+                    if day not in self._days or self._days[day].loaded_at < expired_before]
+
+    def load(self, days, rows):
+        """Заменяет карты дней days строками (дата, время, пост, id записи, срок брони)"""
+        loaded = {day: DayOccupancy(self.bays) for day in days}
+        for slot_date, slot_time, bay, appointment_id, expires_at in rows:
+            occupancy = loaded.get(slot_date)
+            i = self.grid.index.get(slot_time)
+            if occupancy is None or i is None or not 1 <= bay <= self.bays:
+                continue
+            if appointment_id is not None:
+                occupancy.booked[bay] |= 1 << i
+            else:
+                occupancy.holds[(bay, i)] = expires_at
+
+        with self._lock:
+            # Прошедшие дни больше не нужны
+            today = datetime.now().date().isoformat()
+            for day in [day for day in self._days if day < today]:
+                del self._days[day]
+            self._days.update(loaded)
+
+    def free_starts(self, day, duration_minutes=None, now=None):
+        """Время начала, с которого услуга помещается хотя бы на один пост"""
+        length = self.grid.length(duration_minutes)
+        now = now or datetime.now()
+
+        with self._lock:
+            occupancy = self._days.get(day)
+            if occupancy is None:
+                return []
+
+            starts = 0
+            for bay in range(1, self.bays + 1):
+                free = self.grid.full & ~occupancy.occupied(bay, now)
+                runs = free
+                for shift in range(1, length):
+                    runs &= free >> shift
+                starts |= runs
+
+        starts &= self.grid.valid_starts(length)
+        return [slot_time for i, slot_time in enumerate(self.grid.times) if starts >> i & 1]
+
+    def bay_order(self, day, times, now=None):
+        """Посты в порядке попытки брони: сначала свободные по кэшу"""
+        mask = self.grid.mask(times)
+        now = now or datetime.now()
+
+        with self._lock:
+            occupancy = self._days.get(day)
+            if occupancy is None:
+                return list(range(1, self.bays + 1))
+            free = [bay for bay in range(1, self.bays + 1) if not occupancy.occupied(bay, now) & mask]
+
+        return free + [bay for bay in range(1, self.bays + 1) if bay not in free]
+
+    def occupy(self, day, bay, times, expires_at=None):
+        """Отмечает слоты занятыми: записью (expires_at=None) или временной бронью"""
+        with self._lock:
+            occupancy = self._days.get(day)
+            if occupancy is None or not 1 <= bay <= self.bays:
+                return
+            for slot_time in times:
+                i = self.grid.index.get(slot_time)
+                if i is None:
+                    continue
+                if expires_at is None:
+                    occupancy.holds.pop((bay, i), None)
+                    occupancy.booked[bay] |= 1 << i
+                else:
+                    occupancy.holds[(bay, i)] = expires_at
+
+    def release(self, rows):
+        """Освобождает слоты: строки (дата, время, пост)"""
+        with self._lock:
+            for day, slot_time, bay in rows:
+                occupancy = self._days.get(day)
+                i = self.grid.index.get(slot_time)
+                if occupancy is None or i is None or not 1 <= bay <= self.bays:
+                    continue
+                occupancy.booked[bay] &= ~(1 << i)
+                occupancy.holds.pop((bay, i), None)
@@ -0,0 +1,262 @@
+import json
+import time
+import logging
+from collections import OrderedDict
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis - необязательная зависимость
+    aioredis = None
+
+from config import STATE_BACKEND, STATE_TTL, STATE_MAX_ENTRIES, REDIS_URL, STATE_PERSIST_INTERVAL
+
+
+class StateStore:
+    """Хранилище данных незавершенной записи пользователя.
+
+    Данные - JSON-совместимый словарь. Каждая запись живет STATE_TTL секунд
+    с момента последнего сохранения, после чего считается брошенной.
+    """
+
+    def __init__(self, ttl=STATE_TTL):
+        self.ttl = ttl
+
+    async def get(self, user_id):
+        """Возвращает данные пользователя или None"""
+        raise NotImplementedError
+
+    async def set(self, user_id, data):
+        """Сохраняет данные пользователя и продлевает срок их жизни"""
+        raise NotImplementedError
+
+    async def delete(self, user_id):
+        """Удаляет данные пользователя"""
+        raise NotImplementedError
+
+    async def get_handler_states(self, name):
+        """Возвращает шаги диалогов ConversationHandler name: {ключ диалога: состояние}"""
+        raise NotImplementedError
+
+    async def set_handler_state(self, name, key, state):
+        """Сохраняет шаг диалога (state=None - диалог завершен)"""
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """Хранилище в памяти процесса: LRU с ограничением размера и TTL"""
+
+    def __init__(self, ttl=STATE_TTL, max_entries=STATE_MAX_ENTRIES):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, data)
+        self._handler_states = {}  # name -> {ключ диалога: состояние}
+
+    async def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        expires_at, data = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+
+        self._entries.move_to_end(user_id)
+        return data
+
+    async def set(self, user_id, data):
+        self._entries[user_id] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(user_id)
+
+        # Вытесняем самые давно использованные записи
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, user_id):
+        self._entries.pop(user_id, None)
+
+    async def get_handler_states(self, name):
+        return dict(self._handler_states.get(name, {}))
+
+    async def set_handler_state(self, name, key, state):
+        states = self._handler_states.setdefault(name, {})
+        if state is None:
+            states.pop(key, None)
+        else:
+            states[key] = state
+
+
+class DatabaseStateStore(StateStore):
+    """Хранилище в таблице conversation_state (PostgreSQL или SQLite)"""
+
+    def __init__(self, database, ttl=STATE_TTL):
+        super().__init__(ttl)
+        self._database = database
+        self._next_purge = 0
+
+    async def get(self, user_id):
+        raw = await self._database.get_conversation_state(user_id)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, user_id, data):
+        await self._database.save_conversation_state(user_id, json.dumps(data, ensure_ascii=False), self.ttl)
+
+        # Брошенные записи удаляем не чаще раза в TTL
+        now = time.monotonic()
+        if now >= self._next_purge:
+            self._next_purge = now + self.ttl
+            await self._database.purge_conversation_states()
+
+    async def delete(self, user_id):
+        await self._database.delete_conversation_state(user_id)
+
+    async def get_handler_states(self, name):
+        return await self._database.get_handler_states(name)
+
+    async def set_handler_state(self, name, key, state):
+        await self._database.save_handler_state(name, key, state, self.ttl)
+
+
+class RedisStateStore(StateStore):
+    """Хранилище в Redis (или любом сервере с протоколом Redis).
+
+    client - готовый асинхронный клиент (по умолчанию создается по url).
+    """
+
+    key_prefix = 'car_service:state:'
+    handler_prefix = 'car_service:conversation:'
+
+    def __init__(self, url=REDIS_URL, ttl=STATE_TTL, client=None):
+        if client is None:
+            if aioredis is None:
+                raise RuntimeError("Для STATE_BACKEND=redis установите пакет redis")
+            client = aioredis.from_url(url)
+        super().__init__(ttl)
+        self._redis = client
+
+    async def get(self, user_id):
+        raw = await self._redis.get(f"{self.key_prefix}{user_id}")
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, user_id, data):
+        await self._redis.set(f"{self.key_prefix}{user_id}", json.dumps(data, ensure_ascii=False), ex=self.ttl)
+
+    async def delete(self, user_id):
+        await self._redis.delete(f"{self.key_prefix}{user_id}")
+
+    async def get_handler_states(self, name):
+        prefix = f"{self.handler_prefix}{name}:"
+        keys = [key async for key in self._redis.scan_iter(match=f"{prefix}*")]
+        if not keys:
+            return {}
+        values = await self._redis.mget(keys)
+        return {
+            (key.decode() if isinstance(key, bytes) else key)[len(prefix):]:
+                value.decode() if isinstance(value, bytes) else value
+            for key, value in zip(keys, values) if value is not None
+        }
+
+    async def set_handler_state(self, name, key, state):
+        if state is None:
+            await self._redis.delete(f"{self.handler_prefix}{name}:{key}")
+        else:
+            await self._redis.set(f"{self.handler_prefix}{name}:{key}", state, ex=self.ttl)
+
+
+class StatePersistence(BasePersistence):
+    """Persistence PTB поверх хранилища состояний: сохраняет только шаги ConversationHandler.
+
+    Данные записи бот сам пишет в StateStore (update_booking), а здесь
+    хранится шаг диалога - без него после перезапуска PTB не знал бы, что
+    пользователь посреди записи. PTB читает шаги один раз при старте и
+    сохраняет изменения раз в update_interval секунд и при остановке,
+    поэтому процессы бота не видят шагов друг друга: обновления одного
+    чата должны приходить в один процесс.
+
+    states - Enum состояний диалога (в хранилище пишется имя состояния).
+    """
+
+    def __init__(self, store, states, update_interval=STATE_PERSIST_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=False, callback_data=False),
+            update_interval=update_interval
+        )
+        self.store = store
+        self.states = states
+
+    async def get_conversations(self, name):
+        conversations = {}
+        for key, state in (await self.store.get_handler_states(name)).items():
+            try:
+                conversations[tuple(int(part) for part in key.split(':'))] = self.states[state]
+            except (KeyError, ValueError):
+                logging.warning(f"Skipping unknown conversation state {name}/{key}: {state}")
+        logging.info(f"Restored {len(conversations)} '{name}' conversations")
+        return conversations
+
+    async def update_conversation(self, name, key, new_state):
+        await self.store.set_handler_state(
+            name, ':'.join(str(part) for part in key), None if new_state is None else new_state.name
+        )
+
+    # Остальные данные PTB (user_data, chat_data и т.д.) бот не использует
+
+    async def get_user_data(self):
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_user_data(self, user_id, data):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def drop_user_data(self, user_id):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        pass
+
+
+def create_state_store(backend=STATE_BACKEND):
+    """Создает хранилище состояний по настройке STATE_BACKEND"""
+    if backend == 'memory':
+        store = MemoryStateStore()
+    elif backend == 'db':
+        from database import async_db
+        store = DatabaseStateStore(async_db)
+    elif backend == 'redis':
+        store = RedisStateStore()
+    else:
+        raise ValueError(f"Неизвестный STATE_BACKEND: {backend}")
+
+    logging.info(f"Conversation state store: {backend}")
+    return store
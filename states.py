@@ -1,5 +1,7 @@
 from enum import Enum
 
+from state_store import create_state_store, StatePersistence
+
 class AppointmentState(Enum):
     """Состояния процесса записи"""
     SELECT_SERVICE = 1
@@ -12,5 +14,8 @@ class AppointmentState(Enum):
     COMMENT = 8
     CONFIRM = 9
 
-# Временное хранилище данных записи (в продакшене используйте Redis)
-user_data_store = {}
\ No newline at end of file
+# Хранилище данных записи (настраивается через STATE_BACKEND)
+state_store = create_state_store()
+
+# Шаги диалога записи в том же хранилище - переживают перезапуск бота
+persistence = StatePersistence(state_store, AppointmentState)
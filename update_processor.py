@@ -0,0 +1,63 @@
+import logging
+from collections import deque
+
+from telegram.ext import BaseUpdateProcessor
+
+from config import UPDATE_CONCURRENCY
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Параллельная обработка обновлений с сохранением порядка внутри чата.
+
+    Обновления разных чатов обрабатываются одновременно (не больше
+    max_concurrent_updates), поэтому медленный запрос одного пользователя
+    не задерживает остальных. Обновления одного чата выполняются строго
+    по очереди - шаги записи не перепутаются.
+
+    Пока чат обрабатывается, его новые обновления складываются в очередь
+    чата, и их выполняет тот же обработчик. Лимит одновременной обработки
+    при этом занимает только один слот на чат.
+    """
+
+    __slots__ = ('_queues',)
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._queues = {}  # chat_id -> очередь ожидающих обработки корутин
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is None:
+            await coroutine
+            return
+
+        queue = self._queues.get(chat.id)
+        if queue is not None:
+            queue.append(coroutine)
+            return
+
+        queue = self._queues[chat.id] = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue[0]
+                except Exception as e:
+                    logging.error(f"Ошибка обработки обновления чата {chat.id}: {e}")
+                queue.popleft()
+        finally:
+            del self._queues[chat.id]
+            # При остановке приложения невыполненные обновления отбрасываются
+            for pending in queue:
+                pending.close()
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+def create_update_processor(max_concurrent_updates=UPDATE_CONCURRENCY):
+    """Создает обработчик обновлений по настройке UPDATE_CONCURRENCY"""
+    logging.info(f"Update concurrency: {max_concurrent_updates}")
+    return ChatOrderedUpdateProcessor(max(max_concurrent_updates, 1))
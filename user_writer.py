@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from config import USER_FLUSH_INTERVAL, USER_FLUSH_BATCH_SIZE
+from database import async_db
+
+
+class UserWriteQueue:
+    """Отложенная запись профилей пользователей (write-behind).
+
+    Обработчики не ждут БД: add() только запоминает имя пользователя.
+    Повторные обновления одного user_id схлопываются в одно, а накопленные
+    записи раз в USER_FLUSH_INTERVAL секунд (или при наборе
+    USER_FLUSH_BATCH_SIZE) сохраняются одной транзакцией.
+    """
+
+    def __init__(self, interval=USER_FLUSH_INTERVAL, batch_size=USER_FLUSH_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._pending = {}  # user_id -> (username, first_name)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def add(self, user_id, username, first_name):
+        """Ставит профиль пользователя в очередь на запись"""
+        self._pending[user_id] = (username, first_name)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Сохраняет все накопленные профили"""
+        while self._pending:
+            batch = dict(list(self._pending.items())[:self.batch_size])
+            for user_id in batch:
+                del self._pending[user_id]
+
+            rows = [(user_id, username, first_name) for user_id, (username, first_name) in batch.items()]
+            if not await async_db.add_users(rows):
+                # Возвращаем в очередь то, что не успели перезаписать более новые данные
+                for user_id, values in batch.items():
+                    self._pending.setdefault(user_id, values)
+                break
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Запускает фоновую запись (вызывается после старта приложения)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"User write queue started (every {self.interval}s)")
+
+    async def stop(self):
+        """Останавливает фоновую запись и сохраняет остаток очереди"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+user_writes = UserWriteQueue()